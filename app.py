@@ -1,5 +1,8 @@
 import streamlit as st
-from openai import OpenAI
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from openai import OpenAI, RateLimitError, APIConnectionError
+from openai.types.chat import ChatCompletion
 import base64
 import os
 import json
@@ -9,10 +12,26 @@ from bs4 import BeautifulSoup
 from PyPDF2 import PdfReader
 from pptx import Presentation
 from docx import Document
-from PIL import Image
+from PIL import Image, ImageOps
 import pytesseract
 import io
 import time
+import zipfile
+import hashlib
+import math
+import unicodedata
+import xml.etree.ElementTree as ET
+import random
+from email.utils import parsedate_to_datetime
+from html import escape as escape_html
+import sqlite3
+import sys
+import queue
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 
 # 설정
 st.set_page_config(page_title="CAMPER - Final Enhanced", page_icon="📧", layout="wide")
@@ -106,9 +125,36 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# OpenAI 클라이언트 초기화 및 연결 테스트
+# OpenAI 클라이언트 상태 확인 주기 (초)
+OPENAI_HEALTH_TTL = int(os.getenv("EDM_OPENAI_HEALTH_TTL", "300"))
+
+# LLM 백엔드 선택 ("openai": OpenAI API, "local": chat-completions 호환 로컬 서버, 예: mock_llm_server.py)
+LLM_BACKEND = os.getenv("EDM_LLM_BACKEND", "openai").lower()
+LLM_BASE_URL = os.getenv("EDM_LLM_BASE_URL", "")
+LOCAL_LLM_BASE_URL = "http://127.0.0.1:8765/v1"
+
+@st.cache_resource(show_spinner=False)
+def create_openai_client(api_key, base_url=None):
+    """API 키(및 서버 주소)별 OpenAI 클라이언트를 프로세스당 한 번만 생성하여 모든 세션이 공유"""
+    # 재시도는 safe_openai_call의 공용 스케줄러가 담당 (SDK 내부 재시도 비활성화)
+    return OpenAI(api_key=api_key, base_url=base_url or None, max_retries=0)
+
+@st.cache_resource(show_spinner=False)
+def get_openai_health_state():
+    """프로세스 전체에서 공유하는 OpenAI 연결 상태 (실제 호출 결과로 갱신)"""
+    return {"lock": threading.Lock(), "ok": None, "message": "", "checked_at": 0.0}
+
+def record_openai_health(ok, message=""):
+    """실제 API 호출 결과를 연결 상태에 기록"""
+    state = get_openai_health_state()
+    with state["lock"]:
+        state["ok"] = ok
+        state["message"] = message
+        state["checked_at"] = time.time()
+
+# OpenAI 클라이언트 초기화
 def initialize_openai_client():
-    """OpenAI 클라이언트를 초기화하고 연결을 테스트합니다."""
+    """OpenAI 클라이언트를 초기화합니다. (연결 테스트는 check_openai_health에서 지연 수행)"""
     try:
         # API 키 확인 (우선순위: secrets.toml > 환경변수 > .env 파일)
         api_key = None
@@ -142,62 +188,806 @@ def initialize_openai_client():
             """)
             st.stop()
         
-        # OpenAI 클라이언트 초기화
-        client = OpenAI(api_key=api_key)
+        # 매 rerun마다 호출되어도 네트워크 요청 없이 캐시된 클라이언트 반환
+        return create_openai_client(api_key, LLM_BASE_URL)
+            
+    except Exception as e:
+        st.error(f"❌ OpenAI 클라이언트 초기화 실패: {str(e)}")
+        st.stop()
+
+def initialize_local_llm_client():
+    """chat-completions 호환 로컬 서버용 클라이언트 (API 키 불필요, 오프라인 벤치마크/부하 테스트용)"""
+    return create_openai_client("local", LLM_BASE_URL or LOCAL_LLM_BASE_URL)
+
+# 백엔드 이름 -> 클라이언트 초기화 함수 (chat.completions.create / models.retrieve 제공)
+LLM_BACKENDS = {
+    "openai": initialize_openai_client,
+    "local": initialize_local_llm_client
+}
+
+def initialize_llm_client():
+    """EDM_LLM_BACKEND 설정에 따라 LLM 클라이언트 초기화"""
+    if LLM_BACKEND not in LLM_BACKENDS:
+        st.error(f"❌ 지원하지 않는 LLM 백엔드입니다: {LLM_BACKEND} (사용 가능: {', '.join(LLM_BACKENDS)})")
+        st.stop()
+    return LLM_BACKENDS[LLM_BACKEND]()
+
+def llm_chat_completion(**kwargs):
+    """선택된 백엔드로 chat completion 요청 (safe_openai_call의 실제 전송 지점)"""
+    return client.chat.completions.create(**kwargs)
+
+def check_openai_health(max_age=OPENAI_HEALTH_TTL):
+    """OpenAI 연결 상태 확인 (최근 호출 결과가 유효하면 재사용, 만료 시에만 과금 없는 기본 모델 조회로 확인)
+    
+    키/사용량/모델 권한 오류만 실패로 기록하며, 네트워크 오류·타임아웃 같은 일시적 오류는 기록하지 않고
+    통과시켜 실제 호출(safe_openai_call)의 재시도에 맡깁니다.
+    """
+    state = get_openai_health_state()
+    with state["lock"]:
+        if state["ok"] is not None and time.time() - state["checked_at"] < max_age:
+            return state["ok"], state["message"]
+    
+    try:
+        # 설정된 기본 모델(EDM_DEFAULT_MODEL)을 조회 (로컬 백엔드도 같은 /models 엔드포인트 제공)
+        client.models.retrieve(DEFAULT_MODEL)
+        record_openai_health(True)
+        return True, ""
+    except Exception as e:
+        error_msg = str(e)
+        if "invalid_api_key" in error_msg or "authentication" in error_msg.lower():
+            message = "❌ OpenAI API 키가 유효하지 않습니다. API 키를 확인해주세요."
+        elif "insufficient_quota" in error_msg:
+            message = "❌ OpenAI API 사용량 한도를 초과했습니다."
+        elif "model_not_found" in error_msg or "does not exist" in error_msg:
+            message = f"❌ {DEFAULT_MODEL} 모델에 접근할 수 없습니다. API 키 권한을 확인해주세요."
+        else:
+            print(f"OpenAI 상태 확인 실패 (일시적 오류로 보고 계속 진행): {error_msg}")
+            return True, ""
+        record_openai_health(False, message)
+        return False, message
+
+# LLM 클라이언트 초기화 (프로세스당 1회 생성, rerun 시 재사용)
+client = initialize_llm_client()
+
+# LLM 응답 캐시 설정 (환경변수로 조정 가능)
+CACHE_DIR = os.getenv("EDM_CACHE_DIR", ".cache")
+LLM_CACHE_PATH = os.getenv("EDM_LLM_CACHE_PATH", os.path.join(CACHE_DIR, "llm_cache.sqlite3"))
+LLM_CACHE_TTL = int(os.getenv("EDM_LLM_CACHE_TTL", str(7 * 24 * 3600)))  # 초 단위 (기본 7일)
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("EDM_LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("EDM_LLM_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+LLM_CACHE_ENABLED = os.getenv("EDM_LLM_CACHE_DISABLED", "").lower() not in ("1", "true", "yes")
+
+@st.cache_resource(show_spinner=False)
+def get_llm_cache():
+    """프로세스 전체에서 공유하는 디스크 기반 LLM 응답 캐시 (SQLite)"""
+    os.makedirs(os.path.dirname(LLM_CACHE_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(LLM_CACHE_PATH, check_same_thread=False)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache(last_access)")
+    conn.commit()
+    return {
+        "conn": conn,
+        "lock": threading.Lock(),
+        "stats": {"hits": 0, "misses": 0, "stores": 0, "expired": 0, "evictions": 0}
+    }
+
+def make_llm_cache_key(model, messages, temperature, max_tokens, extra=None):
+    """모델, 메시지, temperature, max_tokens (및 tools 등 추가 옵션) 기반 콘텐츠 주소 캐시 키 생성"""
+    request = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+    if extra:
+        request["extra"] = extra
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def llm_cache_get(key):
+    """캐시에서 응답 조회 (만료 항목은 삭제 후 None 반환)"""
+    cache = get_llm_cache()
+    now = time.time()
+    with cache["lock"]:
+        row = cache["conn"].execute(
+            "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+        
+        if row is None:
+            cache["stats"]["misses"] += 1
+            return None
+        
+        if now - row[1] > LLM_CACHE_TTL:
+            cache["conn"].execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            cache["conn"].commit()
+            cache["stats"]["expired"] += 1
+            cache["stats"]["misses"] += 1
+            return None
         
-        # 연결 테스트
-        try:
-            test_response = client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": "Hello"}],
-                max_tokens=5
-            )
+        cache["conn"].execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+        cache["conn"].commit()
+        cache["stats"]["hits"] += 1
+    
+    try:
+        return ChatCompletion.model_validate_json(row[0])
+    except Exception as e:
+        print(f"LLM 캐시 역직렬화 오류: {str(e)}")
+        return None
+
+def llm_cache_put(key, response):
+    """응답을 캐시에 저장하고 용량 한도를 넘으면 LRU 순으로 제거"""
+    try:
+        serialized = response.model_dump_json()
+    except Exception as e:
+        print(f"LLM 캐시 직렬화 오류: {str(e)}")
+        return
+    
+    cache = get_llm_cache()
+    now = time.time()
+    with cache["lock"]:
+        conn = cache["conn"]
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, response, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+            (key, serialized, len(serialized), now, now)
+        )
+        cache["stats"]["stores"] += 1
+        
+        # 만료 항목 정리
+        expired = conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - LLM_CACHE_TTL,)).rowcount
+        cache["stats"]["expired"] += max(expired, 0)
+        
+        # 항목 수 / 전체 크기 기준 LRU 제거
+        count, total_size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        while count > LLM_CACHE_MAX_ENTRIES or total_size > LLM_CACHE_MAX_BYTES:
+            oldest = conn.execute(
+                "SELECT key, size FROM llm_cache ORDER BY last_access ASC LIMIT 1"
+            ).fetchone()
+            if oldest is None:
+                break
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (oldest[0],))
+            cache["stats"]["evictions"] += 1
+            count -= 1
+            total_size -= oldest[1]
+        
+        conn.commit()
+
+def get_llm_cache_stats():
+    """캐시 적중/미스 카운터와 현재 저장 상태 반환"""
+    cache = get_llm_cache()
+    with cache["lock"]:
+        count, total_size = cache["conn"].execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+        ).fetchone()
+        stats = dict(cache["stats"])
+    
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    stats["entries"] = count
+    stats["bytes"] = total_size
+    return stats
+
+# 토큰 예산 계산 (tiktoken이 없으면 문자 종류별 근사치 사용)
+# 설정하지 않으면 모델별 인코딩 사용 (gpt-4o 계열 o200k_base, gpt-4 등 cl100k_base)
+TOKENIZER_ENCODING = os.getenv("EDM_TOKENIZER_ENCODING", "")
+DEFAULT_TOKENIZER_ENCODING = "cl100k_base"
+O200K_MODEL_PREFIXES = ("gpt-4o", "gpt-4.1", "gpt-4.5", "gpt-5", "o1", "o3", "o4")
+
+def get_encoding_name(model=None):
+    """모델에 맞는 tiktoken 인코딩 이름 (EDM_TOKENIZER_ENCODING이 있으면 그 값)"""
+    if TOKENIZER_ENCODING:
+        return TOKENIZER_ENCODING
+    if not model:
+        return DEFAULT_TOKENIZER_ENCODING
+    try:
+        from tiktoken.model import encoding_name_for_model
+        return encoding_name_for_model(model)
+    except Exception:
+        # tiktoken 미설치 또는 모르는 모델 이름
+        return "o200k_base" if model.startswith(O200K_MODEL_PREFIXES) else DEFAULT_TOKENIZER_ENCODING
+
+@st.cache_resource(show_spinner=False)
+def get_token_encoder(encoding_name=DEFAULT_TOKENIZER_ENCODING):
+    """로컬 토크나이저 (인코딩별 1회 생성, tiktoken 미설치 또는 인코딩 파일을 받을 수 없으면 None)"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        print(f"tiktoken 사용 불가 ({encoding_name}), 근사 토큰 계산 사용: {str(e)}")
+        return None
+
+def _approximate_tokens(text):
+    """토크나이저 없이 토큰 수 근사 (ASCII 4자당 1토큰, 한글 등 그 외 문자는 1자당 1토큰)"""
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+def count_tokens(text, model=None):
+    """텍스트의 토큰 수 (model을 주면 해당 모델의 인코딩 기준)"""
+    if not text:
+        return 0
+    encoder = get_token_encoder(get_encoding_name(model))
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return _approximate_tokens(text)
+
+def count_message_tokens(messages, model=None):
+    """메시지 목록의 입력 토큰 수 (메시지당 형식 오버헤드 포함)"""
+    return sum(count_tokens(str(message.get("content") or ""), model) + 4 for message in messages) + 3
+
+def trim_to_token_budget(text, max_tokens, model=None):
+    """텍스트를 max_tokens 토큰 이내로 자르기 (예산 이내면 그대로 반환)"""
+    if not text or max_tokens is None or count_tokens(text, model) <= max_tokens:
+        return text
+    
+    encoder = get_token_encoder(get_encoding_name(model))
+    if encoder is not None:
+        tokens = encoder.encode(text, disallowed_special=())[:max_tokens]
+        # 멀티바이트 문자가 토큰 경계에서 잘린 경우 깨진 글자 제거
+        return encoder.decode(tokens).rstrip("\ufffd")
+    
+    # 근사 계산: 예산에 맞는 최대 길이를 이진 탐색
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if _approximate_tokens(text[:middle]) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low]
+
+# OpenAI 요청 속도 제한 설정 (프로세스 전체 공유, 0이면 해당 제한 비활성화)
+OPENAI_RPM_LIMIT = int(os.getenv("EDM_OPENAI_RPM", "500"))
+OPENAI_TPM_LIMIT = int(os.getenv("EDM_OPENAI_TPM", "40000"))
+OPENAI_BACKOFF_BASE = float(os.getenv("EDM_OPENAI_BACKOFF_BASE", "1.0"))
+OPENAI_BACKOFF_MAX = float(os.getenv("EDM_OPENAI_BACKOFF_MAX", "30"))
 
-            return client
+@st.cache_resource(show_spinner=False)
+def get_rate_limiter():
+    """모든 Streamlit 세션이 공유하는 RPM/TPM 토큰 버킷"""
+    now = time.monotonic()
+    return {
+        "cond": threading.Condition(),
+        "requests": {"capacity": OPENAI_RPM_LIMIT, "level": float(OPENAI_RPM_LIMIT), "rate": OPENAI_RPM_LIMIT / 60.0, "updated": now},
+        "tokens": {"capacity": OPENAI_TPM_LIMIT, "level": float(OPENAI_TPM_LIMIT), "rate": OPENAI_TPM_LIMIT / 60.0, "updated": now},
+        "blocked_until": 0.0,
+        "stats": {"acquired": 0, "throttled": 0, "wait_seconds": 0.0, "rate_limited": 0}
+    }
+
+def _refill_bucket(bucket, now):
+    """경과 시간만큼 버킷 충전"""
+    elapsed = now - bucket["updated"]
+    bucket["level"] = min(bucket["capacity"], bucket["level"] + elapsed * bucket["rate"])
+    bucket["updated"] = now
+
+def estimate_request_tokens(messages, max_tokens=None, model=None):
+    """전송 전 요청 토큰 수 추정 (입력 토큰 + 최대 출력 토큰)"""
+    return count_message_tokens(messages, model) + (max_tokens or 500)
+
+def acquire_rate_limit(estimated_tokens):
+    """RPM/TPM 버킷에 여유가 생길 때까지 대기 후 용량 차감, 대기한 시간(초) 반환"""
+    limiter = get_rate_limiter()
+    requests_bucket = limiter["requests"]
+    tokens_bucket = limiter["tokens"]
+    # 버킷 용량보다 큰 요청은 가득 찼을 때 통과시켜 무한 대기 방지
+    token_cost = min(estimated_tokens, tokens_bucket["capacity"])
+    started = time.monotonic()
+    throttled = False
+    
+    with limiter["cond"]:
+        while True:
+            now = time.monotonic()
+            wait = limiter["blocked_until"] - now
+            
+            if wait <= 0:
+                wait = 0.0
+                if requests_bucket["capacity"] > 0:
+                    _refill_bucket(requests_bucket, now)
+                    if requests_bucket["level"] < 1:
+                        wait = max(wait, (1 - requests_bucket["level"]) / requests_bucket["rate"])
+                if tokens_bucket["capacity"] > 0:
+                    _refill_bucket(tokens_bucket, now)
+                    if tokens_bucket["level"] < token_cost:
+                        wait = max(wait, (token_cost - tokens_bucket["level"]) / tokens_bucket["rate"])
+                
+                if wait == 0:
+                    if requests_bucket["capacity"] > 0:
+                        requests_bucket["level"] -= 1
+                    if tokens_bucket["capacity"] > 0:
+                        tokens_bucket["level"] -= token_cost
+                    limiter["stats"]["acquired"] += 1
+                    # 알림으로 일찍 깨어날 수 있으므로 계획한 대기 시간이 아닌 실제 경과 시간 집계
+                    waited = time.monotonic() - started if throttled else 0.0
+                    if throttled:
+                        limiter["stats"]["throttled"] += 1
+                        limiter["stats"]["wait_seconds"] += waited
+                    return waited
             
+            throttled = True
+            limiter["cond"].wait(wait)
+
+def settle_rate_limit(estimated_tokens, actual_tokens):
+    """실제 사용 토큰으로 TPM 버킷 보정 (추정보다 많이 쓰면 다음 요청이 그만큼 대기,
+    실패한 요청은 actual_tokens=0으로 예약분 전체 반환)"""
+    limiter = get_rate_limiter()
+    tokens_bucket = limiter["tokens"]
+    if tokens_bucket["capacity"] <= 0 or actual_tokens is None:
+        return
+    with limiter["cond"]:
+        estimated = min(estimated_tokens, tokens_bucket["capacity"])
+        tokens_bucket["level"] = min(tokens_bucket["capacity"], tokens_bucket["level"] + estimated - actual_tokens)
+        limiter["cond"].notify_all()
+
+def block_rate_limiter(seconds):
+    """429 응답 시 모든 세션의 요청을 지정 시간 동안 일시 중지"""
+    limiter = get_rate_limiter()
+    with limiter["cond"]:
+        limiter["blocked_until"] = max(limiter["blocked_until"], time.monotonic() + seconds)
+        limiter["stats"]["rate_limited"] += 1
+
+def get_retry_after(error):
+    """OpenAI 오류 응답의 Retry-After(-ms) 헤더를 초 단위로 반환 (없으면 None)"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+    
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            try:
+                return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0)
+            except Exception:
+                return None
+    return None
+
+def compute_backoff_delay(attempt, retry_after=None):
+    """Retry-After가 있으면 그 값을, 없으면 지수 백오프 + 지터로 재시도 대기 시간 계산"""
+    if retry_after is not None:
+        return min(retry_after, OPENAI_BACKOFF_MAX) + random.uniform(0, 0.5)
+    delay = min(OPENAI_BACKOFF_MAX, OPENAI_BACKOFF_BASE * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+def get_rate_limiter_stats():
+    """속도 제한 대기/429 통계 반환"""
+    limiter = get_rate_limiter()
+    with limiter["cond"]:
+        stats = dict(limiter["stats"])
+        stats["requests_available"] = round(limiter["requests"]["level"], 1)
+        stats["tokens_available"] = round(limiter["tokens"]["level"], 1)
+    return stats
+
+# 성능 지표 수집 (Prometheus 텍스트 / JSON으로 노출)
+METRICS_PORT = int(os.getenv("EDM_METRICS_PORT", "0"))  # 0이면 지표 HTTP 서버 비활성화
+METRICS_HOST = os.getenv("EDM_METRICS_HOST", "127.0.0.1")  # 외부 수집기에서 접근하려면 0.0.0.0 등으로 설정
+DEBUG_MODE = os.getenv("EDM_DEBUG", "").lower() in ("1", "true", "yes")
+# ?debug=1 쿼리로 디버그 모드를 켜는 것은 명시적으로 허용한 경우에만 (기본 비활성화, 방문자가 지표를 볼 수 없도록)
+DEBUG_QUERY_ENABLED = os.getenv("EDM_DEBUG_QUERY", "").lower() in ("1", "true", "yes")
+METRICS_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+METRICS_HELP = {
+    "edm_llm_requests_total": "LLM 요청 수 (outcome: ok, error, cache_hit, coalesced, cancelled)",
+    "edm_llm_request_duration_seconds": "LLM API 호출 소요 시간",
+    "edm_llm_tokens_total": "LLM 입력/출력 토큰 수",
+    "edm_llm_retries_total": "LLM 요청 재시도 수 (reason: rate_limit, network)",
+    "edm_stage_duration_seconds": "파이프라인 단계별 소요 시간",
+    "edm_stage_failures_total": "파이프라인 단계별 실패 수"
+}
+
+@st.cache_resource(show_spinner=False)
+def get_metrics_registry():
+    """프로세스 전체에서 공유하는 카운터/히스토그램 저장소"""
+    return {"lock": threading.Lock(), "counters": {}, "histograms": {}}
+
+def metric_inc(name, value=1, **labels):
+    """카운터 증가"""
+    registry = get_metrics_registry()
+    key = (name, tuple(sorted(labels.items())))
+    with registry["lock"]:
+        registry["counters"][key] = registry["counters"].get(key, 0) + value
+
+def metric_observe(name, value, **labels):
+    """히스토그램에 관측값 기록"""
+    registry = get_metrics_registry()
+    key = (name, tuple(sorted(labels.items())))
+    with registry["lock"]:
+        histogram = registry["histograms"].setdefault(
+            key, {"count": 0, "sum": 0.0, "buckets": [0] * len(METRICS_BUCKETS)}
+        )
+        histogram["count"] += 1
+        histogram["sum"] += value
+        for index, bound in enumerate(METRICS_BUCKETS):
+            if value <= bound:
+                histogram["buckets"][index] += 1
+
+def get_calling_function(depth=2):
+    """지표 레이블용 호출 함수 이름 (람다/컴프리헨션/내부 래퍼는 건너뜀)"""
+    frame = sys._getframe(depth)
+    while frame is not None:
+        name = frame.f_code.co_name
+        if not name.startswith("<") and name not in ("safe_openai_call", "_send_openai_request", "run_concurrently"):
+            return name
+        frame = frame.f_back
+    return "unknown"
+
+@contextmanager
+def track_stage(stage):
+    """파이프라인 단계 소요 시간/실패 기록 (with 문 또는 데코레이터로 사용)"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        metric_inc("edm_stage_failures_total", stage=stage)
+        raise
+    finally:
+        metric_observe("edm_stage_duration_seconds", time.perf_counter() - started, stage=stage)
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + list(extra or [])
+    if not items:
+        return ""
+    escaped = [(key, str(value).replace("\\", "\\\\").replace('"', '\\"')) for key, value in items]
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+def render_prometheus_metrics():
+    """수집된 지표를 Prometheus 텍스트 형식으로 변환"""
+    registry = get_metrics_registry()
+    with registry["lock"]:
+        counters = dict(registry["counters"])
+        histograms = {key: {**value, "buckets": list(value["buckets"])} for key, value in registry["histograms"].items()}
+    
+    lines = []
+    for name in sorted({key[0] for key in counters}):
+        lines.append(f"# HELP {name} {METRICS_HELP.get(name, name)}")
+        lines.append(f"# TYPE {name} counter")
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+    
+    for name in sorted({key[0] for key in histograms}):
+        lines.append(f"# HELP {name} {METRICS_HELP.get(name, name)}")
+        lines.append(f"# TYPE {name} histogram")
+        for (metric, labels), histogram in sorted(histograms.items()):
+            if metric != name:
+                continue
+            for bound, count in zip(METRICS_BUCKETS, histogram["buckets"]):
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+    
+    return "\n".join(lines) + "\n"
+
+def get_metrics_snapshot():
+    """수집된 지표와 캐시/레이트 리밋/요청 합치기 상태를 JSON 직렬화 가능한 dict로 반환"""
+    registry = get_metrics_registry()
+    with registry["lock"]:
+        counters = [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(registry["counters"].items())
+        ]
+        histograms = [
+            {"name": name, "labels": dict(labels), "count": value["count"], "sum": round(value["sum"], 6),
+             "avg": round(value["sum"] / value["count"], 6) if value["count"] else 0.0}
+            for (name, labels), value in sorted(registry["histograms"].items())
+        ]
+    
+    snapshot = {"counters": counters, "histograms": histograms}
+    for section, getter in [("tasks", get_task_latency_stats), ("llm_cache", get_llm_cache_stats),
+                            ("rate_limiter", get_rate_limiter_stats), ("coalescing", get_coalescing_stats),
+                            ("translation_memory", get_translation_memory_stats), ("svg_pool", get_svg_pool_stats),
+                            ("svg_optimizer", get_svg_optimizer_stats), ("svg_raster", get_svg_raster_stats),
+                            ("logo_contrast", get_logo_contrast_stats), ("logo_assets", get_logo_asset_stats),
+                            ("image_derivatives", get_image_derivative_stats),
+                            ("background_images", get_background_image_stats),
+                            ("background_store", get_background_store_stats)]:
+        try:
+            snapshot[section] = getter()
         except Exception as e:
-            error_msg = str(e)
-            if "insufficient_quota" in error_msg or "quota" in error_msg.lower():
-                st.error("❌ OpenAI API 사용량 한도를 초과했습니다. 새로운 API 키가 필요합니다.")
-            elif "invalid_api_key" in error_msg or "authentication" in error_msg.lower():
-                st.error("❌ OpenAI API 키가 유효하지 않습니다. API 키를 확인해주세요.")
-            elif "model_not_found" in error_msg:
-                st.error("❌ GPT-4 모델에 접근할 수 없습니다. API 키 권한을 확인해주세요.")
+            snapshot[section] = {"error": str(e)}
+    return snapshot
+
+@st.cache_resource(show_spinner=False)
+def start_metrics_server(port):
+    """/metrics (Prometheus 텍스트), /metrics.json 을 제공하는 백그라운드 HTTP 서버 (프로세스당 1회)"""
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+        
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path == "/metrics":
+                body, content_type = render_prometheus_metrics(), "text/plain; version=0.0.4; charset=utf-8"
+            elif path == "/metrics.json":
+                body, content_type = json.dumps(get_metrics_snapshot(), ensure_ascii=False), "application/json"
             else:
-                st.error(f"❌ OpenAI API 연결 오류: {error_msg}")
-            
-            st.markdown("""
-            **문제 해결 방법:**
-            1. API 키가 유효한지 확인
-            2. API 사용량 한도 확인
-            3. GPT-4 모델 접근 권한 확인
-            4. 인터넷 연결 상태 확인
-            """)
-            st.stop()
-            
-    except Exception as e:
-        st.error(f"❌ OpenAI 클라이언트 초기화 실패: {str(e)}")
-        st.stop()
+                self.send_response(404)
+                self.end_headers()
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+    
+    try:
+        server = ThreadingHTTPServer((METRICS_HOST, port), MetricsHandler)
+    except OSError as e:
+        print(f"지표 서버 시작 실패 (포트 {port}): {str(e)}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"지표 서버 시작: http://{METRICS_HOST}:{port}/metrics")
+    return server
 
-# OpenAI 클라이언트 초기화
-client = initialize_openai_client()
+# 작업별 모델 라우팅 (가벼운 작업은 빠른 소형 모델로)
+DEFAULT_MODEL = os.getenv("EDM_DEFAULT_MODEL", "gpt-4")
+FAST_MODEL = os.getenv("EDM_FAST_MODEL", "gpt-4o-mini")
+
+MODEL_ROUTES = {
+    # 작업: 모델 / 최대 출력 토큰 / 요청 타임아웃(초) / 입력 자료 토큰 예산
+    "icon_select": {"model": FAST_MODEL, "max_tokens": 50, "timeout": 15},
+    "feature_describe": {"model": FAST_MODEL, "max_tokens": 100, "timeout": 20},
+    "title_refine": {"model": FAST_MODEL, "max_tokens": 60, "timeout": 15},
+    "translate_short": {"model": FAST_MODEL, "max_tokens": 500, "timeout": 20},
+    "summarize": {"model": FAST_MODEL, "max_tokens": 300, "timeout": 30, "input_tokens": 2000},
+    "translate_batch": {"model": DEFAULT_MODEL, "max_tokens": 4000, "timeout": 90},
+    "effects_enhance": {"model": DEFAULT_MODEL, "max_tokens": 800, "timeout": 60},
+    "pdf_structure": {"model": DEFAULT_MODEL, "max_tokens": 500, "timeout": 60, "input_tokens": 1500},
+    "content_main": {"model": DEFAULT_MODEL, "max_tokens": 2000, "timeout": 90},  # 잘리면 한도를 늘려 재시도
+    "enrichment": {"model": DEFAULT_MODEL, "max_tokens": 2000, "timeout": 120},
+    "svg_generate": {"model": DEFAULT_MODEL, "max_tokens": 1500, "timeout": 90},
+    "ai_edit": {"model": DEFAULT_MODEL, "max_tokens": 1500, "timeout": 90},
+    "default": {"model": DEFAULT_MODEL, "max_tokens": None, "timeout": 60}
+}
+
+# EDM_MODEL_ROUTES='{"translate_short": {"model": "gpt-4"}}' 형식으로 작업별 설정 덮어쓰기
+try:
+    for _task, _override in json.loads(os.getenv("EDM_MODEL_ROUTES", "") or "{}").items():
+        MODEL_ROUTES[_task] = {**MODEL_ROUTES.get(_task, MODEL_ROUTES["default"]), **_override}
+except (ValueError, AttributeError, TypeError) as e:
+    print(f"EDM_MODEL_ROUTES 설정 오류 (무시): {str(e)}")
+
+def get_model_route(task):
+    """작업 이름에 해당하는 모델/토큰/타임아웃 설정 반환 (없으면 기본값)"""
+    return MODEL_ROUTES.get(task or "default", MODEL_ROUTES["default"])
+
+def trim_task_input(text, task):
+    """작업별 입력 자료 토큰 예산(input_tokens)에 맞게 자르기"""
+    route = get_model_route(task)
+    return trim_to_token_budget(text, route.get("input_tokens"), route["model"])
+
+@st.cache_resource(show_spinner=False)
+def get_task_latency_state():
+    """프로세스 전체 작업별 API 지연 시간 집계"""
+    return {"lock": threading.Lock(), "tasks": {}}
+
+def record_task_latency(task, seconds=None, ok=True, cached=False, tokens_in=0, tokens_out=0):
+    """작업별 API 호출 결과 기록 (캐시 적중은 지연 시간/토큰에 포함하지 않음)"""
+    state = get_task_latency_state()
+    with state["lock"]:
+        entry = state["tasks"].setdefault(task or "default", {
+            "calls": 0, "errors": 0, "cache_hits": 0, "total_seconds": 0.0, "max_seconds": 0.0, "recent": [],
+            "tokens_in": 0, "tokens_out": 0
+        })
+        if cached:
+            entry["cache_hits"] += 1
+            return
+        if not ok:
+            entry["errors"] += 1
+            return
+        entry["calls"] += 1
+        entry["tokens_in"] += tokens_in
+        entry["tokens_out"] += tokens_out
+        entry["total_seconds"] += seconds
+        entry["max_seconds"] = max(entry["max_seconds"], seconds)
+        entry["recent"].append(seconds)
+        del entry["recent"][:-200]
+
+def get_task_latency_stats():
+    """작업별 호출 수, 입력/출력 토큰 합계, 평균/p50/p95/최대 지연 시간(초)과 사용 모델 반환"""
+    state = get_task_latency_state()
+    report = {}
+    with state["lock"]:
+        for task, entry in state["tasks"].items():
+            recent = sorted(entry["recent"])
+            report[task] = {
+                "model": get_model_route(task)["model"],
+                "calls": entry["calls"],
+                "errors": entry["errors"],
+                "cache_hits": entry["cache_hits"],
+                "tokens_in": entry["tokens_in"],
+                "tokens_out": entry["tokens_out"],
+                "avg_seconds": round(entry["total_seconds"] / entry["calls"], 3) if entry["calls"] else 0.0,
+                "p50_seconds": round(recent[len(recent) // 2], 3) if recent else 0.0,
+                "p95_seconds": round(recent[min(len(recent) - 1, int(len(recent) * 0.95))], 3) if recent else 0.0,
+                "max_seconds": round(entry["max_seconds"], 3)
+            }
+    return report
+
+@st.cache_resource(show_spinner=False)
+def get_inflight_requests():
+    """프로세스 전체에서 진행 중인 동일 요청 목록 (요청 키 -> Future)"""
+    return {"lock": threading.Lock(), "futures": {}, "stats": {"leaders": 0, "coalesced": 0, "by_task": {}}}
+
+def join_inflight_request(request_key, task=None):
+    """진행 중인 동일 요청이 있으면 그 Future를, 없으면 새 Future를 등록하여 (Future, 직접 호출 여부) 반환"""
+    inflight = get_inflight_requests()
+    with inflight["lock"]:
+        future = inflight["futures"].get(request_key)
+        if future is not None:
+            inflight["stats"]["coalesced"] += 1
+            by_task = inflight["stats"]["by_task"]
+            by_task[task or "default"] = by_task.get(task or "default", 0) + 1
+            return future, False
+        
+        future = Future()
+        inflight["futures"][request_key] = future
+        inflight["stats"]["leaders"] += 1
+        return future, True
+
+def release_inflight_request(request_key, future):
+    """완료된 요청을 진행 중 목록에서 제거"""
+    inflight = get_inflight_requests()
+    with inflight["lock"]:
+        if inflight["futures"].get(request_key) is future:
+            del inflight["futures"][request_key]
+
+def get_coalescing_stats():
+    """동일 요청 합치기로 절약한 API 호출 수 (전체 / 작업별)"""
+    inflight = get_inflight_requests()
+    with inflight["lock"]:
+        stats = {
+            "leaders": inflight["stats"]["leaders"],
+            "saved_calls": inflight["stats"]["coalesced"],
+            "saved_by_task": dict(inflight["stats"]["by_task"]),
+            "in_flight": len(inflight["futures"])
+        }
+    return stats
+
+def show_llm_notice(kind, message, hint=None):
+    """LLM 호출 경고/오류를 화면에 표시 (세션 실행 컨텍스트가 없는 백그라운드 스레드에서는 로그로만 남김)"""
+    if get_script_run_ctx(suppress_warning=True) is None:
+        print(message)
+        return
+    getattr(st, kind)(message)
+    if hint:
+        st.markdown(hint)
+
+class LLMRequestCancelled(Exception):
+    """on_delta에서 발생시키면 진행 중인 스트리밍 요청을 닫고 재시도 없이 중단 (병렬 후보 중 불필요해진 요청 취소용)"""
 
 # OpenAI API 호출을 위한 안전한 래퍼 함수
-def safe_openai_call(messages, model="gpt-4", max_tokens=None, temperature=0.7, max_retries=3):
+def safe_openai_call(messages, model=None, max_tokens=None, temperature=0.7, max_retries=3, use_cache=True,
+                     task=None, timeout=None, coalesce=True, on_delta=None, **extra):
     """
     OpenAI API를 안전하게 호출하는 래퍼 함수
     
     Args:
         messages: 메시지 리스트
-        model: 사용할 모델 (기본값: gpt-4)
-        max_tokens: 최대 토큰 수
+        model: 사용할 모델 (기본값: 작업 라우팅 설정)
+        max_tokens: 최대 토큰 수 (기본값: 작업 라우팅 설정)
         temperature: 창의성 수준
         max_retries: 최대 재시도 횟수
+        use_cache: 동일 요청의 응답 캐시 사용 여부 (매번 새로운 결과가 필요한 호출은 False)
+        task: MODEL_ROUTES의 작업 이름 (모델, 최대 토큰, 타임아웃 선택 및 지연 시간 집계에 사용)
+        timeout: 요청 타임아웃(초) (기본값: 작업 라우팅 설정)
+        coalesce: 이미 진행 중인 동일 요청이 있으면 새로 호출하지 않고 그 결과를 함께 사용
+                  (같은 프롬프트로 서로 다른 결과가 필요한 호출은 False)
+        on_delta: 지정하면 스트리밍으로 요청하고 응답 텍스트가 늘어날 때마다 누적 텍스트로 호출
+                  (캐시 적중/합치기 시에는 완성된 텍스트로 한 번 호출, 반환값은 동일한 완성 응답)
+        **extra: tools, tool_choice, response_format 등 추가 API 옵션
     
     Returns:
         API 응답 또는 None (실패 시)
     """
+    route = get_model_route(task)
+    model = model or route["model"]
+    max_tokens = max_tokens if max_tokens is not None else route["max_tokens"]
+    timeout = timeout or route["timeout"]
+    caller = get_calling_function()
+    
+    request_key = make_llm_cache_key(model, messages, temperature, max_tokens, extra)
+    cache_key = request_key if use_cache and LLM_CACHE_ENABLED else None
+    if cache_key:
+        try:
+            cached = llm_cache_get(cache_key)
+            if cached is not None:
+                record_task_latency(task, cached=True)
+                metric_inc("edm_llm_requests_total", caller=caller, task=task or "default", model=model, outcome="cache_hit")
+                if on_delta and cached.choices and cached.choices[0].message.content:
+                    on_delta(cached.choices[0].message.content)
+                return cached
+        except Exception as e:
+            print(f"LLM 캐시 조회 오류: {str(e)}")
+    
+    request = (messages, model, max_tokens, temperature, max_retries, task, timeout, extra, cache_key, caller, on_delta)
+    if not coalesce:
+        return _send_openai_request(*request)
+    
+    # 동일 요청이 진행 중이면 먼저 보낸 호출의 결과를 기다림 (중복 클릭, 같은 자료로 동시 생성 등)
+    future, is_leader = join_inflight_request(request_key, task)
+    if not is_leader:
+        metric_inc("edm_llm_requests_total", caller=caller, task=task or "default", model=model, outcome="coalesced")
+        try:
+            response = future.result()
+            if on_delta and response and response.choices and response.choices[0].message.content:
+                on_delta(response.choices[0].message.content)
+            return response
+        except Exception:
+            # 먼저 보낸 쪽이 중단(rerun 등)된 경우 직접 호출
+            return _send_openai_request(*request)
+    
+    try:
+        response = _send_openai_request(*request)
+        future.set_result(response)
+        return response
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        release_inflight_request(request_key, future)
+
+def _collect_stream(stream, on_delta, model):
+    """스트리밍 응답을 누적하며 on_delta 호출, 완료 후 일반 응답(ChatCompletion)으로 변환"""
+    parts = []
+    response_id, created, finish_reason, usage = "", int(time.time()), "stop", None
+    for chunk in stream:
+        response_id = chunk.id or response_id
+        created = chunk.created or created
+        if getattr(chunk, "usage", None):
+            usage = chunk.usage.model_dump()
+        if not chunk.choices:
+            continue
+        choice = chunk.choices[0]
+        if choice.finish_reason:
+            finish_reason = choice.finish_reason
+        if choice.delta and choice.delta.content:
+            parts.append(choice.delta.content)
+            try:
+                on_delta("".join(parts))
+            except LLMRequestCancelled:
+                stream.close()
+                raise
+            except Exception as e:
+                print(f"스트리밍 표시 오류: {str(e)}")
+    
+    completion = {
+        "id": response_id or f"chatcmpl-stream-{int(time.time() * 1000)}",
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "finish_reason": finish_reason,
+            "message": {"role": "assistant", "content": "".join(parts)}
+        }]
+    }
+    if usage:
+        completion["usage"] = usage
+    return ChatCompletion.model_validate(completion)
+
+def _send_openai_request(messages, model, max_tokens, temperature, max_retries, task, timeout, extra, cache_key,
+                         caller="unknown", on_delta=None):
+    """재시도/레이트 리밋/캐시 저장을 포함한 실제 API 호출 (safe_openai_call 내부용)"""
+    labels = {"caller": caller, "task": task or "default"}
     for attempt in range(max_retries):
+        estimated_tokens, settled = None, False
         try:
             kwargs = {
                 "model": model,
@@ -208,43 +998,177 @@ def safe_openai_call(messages, model="gpt-4", max_tokens=None, temperature=0.7,
             if max_tokens:
                 kwargs["max_tokens"] = max_tokens
             
-            response = client.chat.completions.create(**kwargs)
+            if timeout:
+                kwargs["timeout"] = timeout
+            
+            kwargs.update(extra)
+            
+            # 프로세스 공용 RPM/TPM 버킷에서 용량 확보 후 전송
+            estimated_tokens = estimate_request_tokens(messages, max_tokens, model)
+            acquire_rate_limit(estimated_tokens)
+            
+            started = time.perf_counter()
+            if on_delta:
+                stream = llm_chat_completion(stream=True, stream_options={"include_usage": True}, **kwargs)
+                response = _collect_stream(stream, on_delta, model)
+            else:
+                response = llm_chat_completion(**kwargs)
+            elapsed = time.perf_counter() - started
+            record_openai_health(True)
+            
+            # 입력/출력 토큰 (usage가 없는 백엔드는 로컬 토크나이저로 계산)
+            usage = getattr(response, "usage", None)
+            tokens_in = getattr(usage, "prompt_tokens", None) or count_message_tokens(messages, model)
+            tokens_out = getattr(usage, "completion_tokens", None)
+            if tokens_out is None:
+                tokens_out = sum(count_tokens(choice.message.content or "", model) for choice in response.choices)
+            record_task_latency(task, elapsed, tokens_in=tokens_in, tokens_out=tokens_out)
+            metric_inc("edm_llm_requests_total", model=model, outcome="ok", **labels)
+            metric_observe("edm_llm_request_duration_seconds", elapsed, **labels)
+            metric_inc("edm_llm_tokens_total", tokens_in, direction="prompt", **labels)
+            metric_inc("edm_llm_tokens_total", tokens_out, direction="completion", **labels)
+            settle_rate_limit(estimated_tokens, tokens_in + tokens_out)
+            settled = True
+            
+            if cache_key:
+                try:
+                    llm_cache_put(cache_key, response)
+                except Exception as e:
+                    print(f"LLM 캐시 저장 오류: {str(e)}")
+            
             return response
             
+        except LLMRequestCancelled:
+            # 취소된 스트림은 입력 토큰만 사용한 것으로 보고 나머지 예약분 반환
+            if estimated_tokens is not None:
+                settle_rate_limit(estimated_tokens, count_message_tokens(messages, model))
+            metric_inc("edm_llm_requests_total", model=model, outcome="cancelled", **labels)
+            raise
         except Exception as e:
             error_msg = str(e).lower()
+            record_task_latency(task, ok=False)
+            # 실패한 시도(429, 네트워크 오류 등)의 예약 토큰 반환 (성공 후 캐시 저장 오류 등은 이미 정산됨)
+            if estimated_tokens is not None and not settled:
+                settle_rate_limit(estimated_tokens, 0)
+            
+            is_rate_limited = (isinstance(e, RateLimitError) or "rate_limit" in error_msg or "too_many_requests" in error_msg) \
+                and "insufficient_quota" not in error_msg
             
             if attempt < max_retries - 1:  # 마지막 시도가 아닌 경우
-                if "rate_limit" in error_msg or "too_many_requests" in error_msg:
-                    st.warning(f"⚠️ API 요청 한도 초과. {attempt + 1}초 후 재시도... ({attempt + 1}/{max_retries})")
-                    time.sleep(attempt + 1)  # 점진적 대기
+                if is_rate_limited:
+                    # Retry-After 존중 + 다른 세션도 함께 대기하도록 공용 스케줄러 일시 중지
+                    delay = compute_backoff_delay(attempt, get_retry_after(e))
+                    block_rate_limiter(delay)
+                    metric_inc("edm_llm_retries_total", reason="rate_limit", **labels)
+                    show_llm_notice("warning", f"⚠️ API 요청 한도 초과. {delay:.1f}초 후 재시도... ({attempt + 1}/{max_retries})")
                     continue
-                elif "timeout" in error_msg or "connection" in error_msg:
-                    st.warning(f"⚠️ 네트워크 오류. 재시도 중... ({attempt + 1}/{max_retries})")
-                    time.sleep(1)
+                elif isinstance(e, APIConnectionError) or "timeout" in error_msg or "connection" in error_msg:
+                    delay = compute_backoff_delay(attempt)
+                    metric_inc("edm_llm_retries_total", reason="network", **labels)
+                    show_llm_notice("warning", f"⚠️ 네트워크 오류. {delay:.1f}초 후 재시도... ({attempt + 1}/{max_retries})")
+                    time.sleep(delay)
                     continue
             
             # 최종 실패 또는 재시도 불가능한 오류
+            metric_inc("edm_llm_requests_total", model=model, outcome="error", **labels)
             if "insufficient_quota" in error_msg or "quota" in error_msg:
-                st.error("❌ OpenAI API 사용량 한도를 초과했습니다.")
-                st.markdown("**해결방법:** 새로운 API 키를 발급받거나 결제를 진행해주세요.")
+                record_openai_health(False, "❌ OpenAI API 사용량 한도를 초과했습니다.")
+                show_llm_notice("error", "❌ OpenAI API 사용량 한도를 초과했습니다.",
+                                "**해결방법:** 새로운 API 키를 발급받거나 결제를 진행해주세요.")
             elif "invalid_api_key" in error_msg or "authentication" in error_msg:
-                st.error("❌ OpenAI API 키가 유효하지 않습니다.")
-                st.markdown("**해결방법:** API 키를 다시 확인하고 설정해주세요.")
+                record_openai_health(False, "❌ OpenAI API 키가 유효하지 않습니다.")
+                show_llm_notice("error", "❌ OpenAI API 키가 유효하지 않습니다.",
+                                "**해결방법:** API 키를 다시 확인하고 설정해주세요.")
             elif "model_not_found" in error_msg:
-                st.error("❌ 요청한 모델에 접근할 수 없습니다.")
-                st.markdown("**해결방법:** GPT-4 접근 권한이 있는 API 키를 사용해주세요.")
+                show_llm_notice("error", f"❌ 요청한 모델({model})에 접근할 수 없습니다.",
+                                "**해결방법:** 해당 모델 접근 권한이 있는 API 키를 사용하거나 `EDM_MODEL_ROUTES`로 작업별 모델을 변경해주세요.")
             elif "rate_limit" in error_msg:
-                st.error("❌ API 요청 한도를 초과했습니다.")
-                st.markdown("**해결방법:** 잠시 후 다시 시도하거나 API 플랜을 업그레이드해주세요.")
+                show_llm_notice("error", "❌ API 요청 한도를 초과했습니다.",
+                                "**해결방법:** 잠시 후 다시 시도하거나 API 플랜을 업그레이드해주세요.")
             else:
-                st.error(f"❌ OpenAI API 오류: {str(e)}")
-                st.markdown("**해결방법:** 네트워크 연결을 확인하고 다시 시도해주세요.")
+                show_llm_notice("error", f"❌ OpenAI API 오류: {str(e)}",
+                                "**해결방법:** 네트워크 연결을 확인하고 다시 시도해주세요.")
             
             return None
     
     return None
 
+# 동시 LLM 호출 작업 수 상한
+LLM_MAX_WORKERS = int(os.getenv("EDM_LLM_MAX_WORKERS", "6"))
+
+# 작업 스레드별 동시 실행 한도 (중첩된 run_concurrently 호출이 바깥 호출과 같은 한도를 공유)
+_concurrency_local = threading.local()
+
+def run_concurrently(tasks, max_workers=None, on_result=None, on_wait=None):
+    """인자 없는 작업 함수 목록을 제한된 스레드 풀에서 병렬 실행하고 입력 순서대로 결과 반환
+    
+    on_result(index, result)를 주면 작업이 끝날 때마다 호출 스레드에서 호출합니다 (진행 상황 표시용).
+    on_wait()를 주면 작업을 기다리는 동안 호출 스레드에서 주기적으로(0.1초) 호출합니다
+    (작업 스레드가 쌓아 둔 스트리밍 진행 상황을 위젯에 반영하는 용도, 위젯은 호출 스레드에서만 갱신).
+    작업 안에서 다시 호출되면(예: 언어별 번역 안의 배치 번역) 바깥 호출의 실행 슬롯을 함께 사용하여
+    전체 동시 실행 수가 max_workers(기본 LLM_MAX_WORKERS)를 넘지 않으며, 빈 슬롯이 없으면 호출 스레드에서 직접 실행합니다.
+    """
+    tasks = list(tasks)
+    if len(tasks) <= 1:
+        results = []
+        for index, task in enumerate(tasks):
+            results.append(task())
+            if on_wait:
+                on_wait()
+            if on_result:
+                on_result(index, results[-1])
+        return results
+    
+    # 작업 스레드에서도 st.warning 등이 현재 세션에 표시되도록 실행 컨텍스트 전달
+    ctx = get_script_run_ctx()
+    
+    def attach_context():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+    
+    outer_slots = getattr(_concurrency_local, "slots", None)
+    slots = outer_slots or threading.BoundedSemaphore(max_workers or LLM_MAX_WORKERS)
+    
+    def run_in_slot(task, acquire):
+        if acquire:
+            slots.acquire()
+        _concurrency_local.slots = slots
+        try:
+            return task()
+        finally:
+            _concurrency_local.slots = None
+            slots.release()
+    
+    results = [None] * len(tasks)
+    workers = min(max_workers or LLM_MAX_WORKERS, len(tasks))
+    with ThreadPoolExecutor(max_workers=workers, initializer=attach_context) as executor:
+        if outer_slots is None:
+            futures = {executor.submit(run_in_slot, task, True): index for index, task in enumerate(tasks)}
+        else:
+            # 중첩 호출: 빈 슬롯이 있을 때만 새 스레드에 넘기고, 나머지는 이미 슬롯을 가진 현재 스레드에서 실행
+            futures, inline = {}, []
+            for index, task in enumerate(tasks):
+                if slots.acquire(blocking=False):
+                    futures[executor.submit(run_in_slot, task, False)] = index
+                else:
+                    inline.append(index)
+            for index in inline:
+                results[index] = tasks[index]()
+                if on_wait:
+                    on_wait()
+                if on_result:
+                    on_result(index, results[index])
+        remaining = set(futures)
+        while remaining:
+            done, remaining = wait(remaining, timeout=0.1 if on_wait else None, return_when=FIRST_COMPLETED)
+            if on_wait:
+                on_wait()
+            for future in done:
+                results[futures[future]] = future.result()
+                if on_result:
+                    on_result(futures[future], results[futures[future]])
+    return results
+
 import time  # time 모듈 import 추가
 
 os.makedirs("images", exist_ok=True)
@@ -365,8 +1289,7 @@ def select_bootstrap_icon(keyword):
         
         response = safe_openai_call(
             messages=[{"role": "user", "content": prompt}],
-            model="gpt-4",
-            max_tokens=50
+            task="icon_select"
         )
         
         if response:
@@ -412,8 +1335,7 @@ def generate_enhanced_feature_description(feature_name, feature_desc, material_s
     try:
         response = safe_openai_call(
             messages=[{"role": "user", "content": prompt}],
-            model="gpt-4",
-            max_tokens=100
+            task="feature_describe"
         )
         
         if response:
@@ -430,8 +1352,46 @@ def generate_enhanced_feature_description(feature_name, feature_desc, material_s
         print(f"기능 설명 향상 오류: {str(e)}")
         return feature_desc
 
-def generate_enhanced_expected_effects(expected_effects, material_summary):
-    """기대효과를 AI로 향상시키기 (완성형 문장으로 개선)"""
+def format_expected_effects(enhanced_text):
+    """AI가 생성한 기대효과 텍스트 후처리 - 이모티콘 시작, 완성형 문장 보장"""
+    lines = [line.strip() for line in enhanced_text.split('\n') if line.strip()]
+    corrected_lines = []
+    
+    for line in lines:
+        # 이모티콘으로 시작하는지 확인
+        if not re.match(r'^[\U0001F300-\U0001F9FF]', line):
+            # 이모티콘이 없으면 적절한 이모티콘 추가
+            if '효율' in line or '관리' in line:
+                line = f"📈 {line}"
+            elif '비용' in line or '절감' in line:
+                line = f"💰 {line}"
+            elif '데이터' in line or '정보' in line:
+                line = f"📊 {line}"
+            elif '속도' in line or '빠른' in line:
+                line = f"⚡ {line}"
+            elif '품질' in line or '향상' in line:
+                line = f"🎯 {line}"
+            else:
+                line = f"🔧 {line}"
+        
+        # 마침표로 끝나는지 확인
+        if not line.endswith('.') and not line.endswith('다') and not line.endswith('니다'):
+            if line.endswith('습니다') or line.endswith('됩니다') or line.endswith('있습니다'):
+                line += "."
+            elif not line.endswith('.'):
+                line += "."
+        
+        # 콜론 뒤에 공백 확인
+        if ':' in line and not ': ' in line:
+            line = line.replace(':', ': ')
+        
+        corrected_lines.append(line)
+    
+    return '\n'.join(corrected_lines)
+
+@track_stage("generate_enhanced_expected_effects")
+def generate_enhanced_expected_effects(expected_effects, material_summary, on_update=None):
+    """기대효과를 AI로 향상시키기 (완성형 문장으로 개선, on_update(누적 텍스트)로 스트리밍 표시)"""
     if not expected_effects.strip():
         return expected_effects
     
@@ -462,46 +1422,11 @@ def generate_enhanced_expected_effects(expected_effects, material_summary):
         response = safe_openai_call([
             {"role": "system", "content": "당신은 마케팅 전문가입니다. 기대효과를 구체적이고 설득력 있는 완성형 문장으로 작성해주세요."},
             {"role": "user", "content": prompt}
-        ], max_tokens=800)
+        ], task="effects_enhance", on_delta=on_update)
         
         if response and response.choices:
             enhanced_text = response.choices[0].message.content.strip()
-            
-            # 응답 후처리 - 완성형 문장 보장
-            lines = [line.strip() for line in enhanced_text.split('\n') if line.strip()]
-            corrected_lines = []
-            
-            for line in lines:
-                # 이모티콘으로 시작하는지 확인
-                if not re.match(r'^[\U0001F300-\U0001F9FF]', line):
-                    # 이모티콘이 없으면 적절한 이모티콘 추가
-                    if '효율' in line or '관리' in line:
-                        line = f"📈 {line}"
-                    elif '비용' in line or '절감' in line:
-                        line = f"💰 {line}"
-                    elif '데이터' in line or '정보' in line:
-                        line = f"📊 {line}"
-                    elif '속도' in line or '빠른' in line:
-                        line = f"⚡ {line}"
-                    elif '품질' in line or '향상' in line:
-                        line = f"🎯 {line}"
-                    else:
-                        line = f"🔧 {line}"
-                
-                # 마침표로 끝나는지 확인
-                if not line.endswith('.') and not line.endswith('다') and not line.endswith('니다'):
-                    if line.endswith('습니다') or line.endswith('됩니다') or line.endswith('있습니다'):
-                        line += "."
-                    elif not line.endswith('.'):
-                        line += "."
-                
-                # 콜론 뒤에 공백 확인
-                if ':' in line and not ': ' in line:
-                    line = line.replace(':', ': ')
-                
-                corrected_lines.append(line)
-            
-            return '\n'.join(corrected_lines) if corrected_lines else expected_effects
+            return format_expected_effects(enhanced_text) or expected_effects
             
     except Exception as e:
         print(f"기대효과 향상 오류: {str(e)}")
@@ -552,24 +1477,186 @@ def optimize_title_length(title, max_length=20):
     # 여전히 길면 자르기
     return title[:max_length-3] + "..."
 
+# 번역 대상 언어 (화면 표시용 이름)
+TRANSLATION_LANGUAGE_LABELS = {
+    "en": "English",
+    "ja": "일본어",
+    "zh": "중국어",
+    "es": "스페인어",
+    "fr": "프랑스어",
+    "ms": "말레이시아어"
+}
+
+# 번역 대상 언어 (프롬프트용 언어명)
+TRANSLATION_LANGUAGE_NAMES = {
+    "en": "영어",
+    "ja": "일본어", 
+    "zh": "중국어",
+    "es": "스페인어",
+    "fr": "프랑스어",
+    "ms": "말레이시아어"  # 말레이시아어 추가
+}
+
+# 일괄 번역 요청당 최대 세그먼트 수 / 원문 글자 수
+TRANSLATION_BATCH_SIZE = int(os.getenv("EDM_TRANSLATION_BATCH_SIZE", "40"))
+TRANSLATION_BATCH_CHARS = int(os.getenv("EDM_TRANSLATION_BATCH_CHARS", "3000"))
+
+# 번역 메모리 설정 (원문 세그먼트 + 대상 언어 기준 영구 저장)
+TRANSLATION_MEMORY_PATH = os.getenv("EDM_TRANSLATION_MEMORY_PATH", os.path.join(CACHE_DIR, "translation_memory.sqlite3"))
+TRANSLATION_MEMORY_ENABLED = os.getenv("EDM_TRANSLATION_MEMORY_DISABLED", "").lower() not in ("1", "true", "yes")
+
+def normalize_translation_source(text):
+    """번역 메모리 키용 원문 정규화 (유니코드 NFC, 공백 정리)"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+def make_translation_key(text, target_language):
+    """정규화된 원문 해시 + 대상 언어로 번역 메모리 키 생성"""
+    normalized = normalize_translation_source(text)
+    return hashlib.sha256(f"{target_language}\n{normalized}".encode("utf-8")).hexdigest()
+
+@st.cache_resource(show_spinner=False)
+def get_translation_memory():
+    """프로세스 전체에서 공유하는 영구 번역 메모리 (SQLite, 고정 텍스트 번역으로 사전 등록)"""
+    os.makedirs(os.path.dirname(TRANSLATION_MEMORY_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(TRANSLATION_MEMORY_PATH, check_same_thread=False)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS translation_memory (
+            key TEXT PRIMARY KEY,
+            language TEXT NOT NULL,
+            source TEXT NOT NULL,
+            translation TEXT NOT NULL,
+            origin TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL,
+            use_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    
+    # 고정 텍스트 번역 사전 등록 (수동 번역이 항상 우선)
+    now = time.time()
+    for language in TRANSLATION_LANGUAGE_NAMES:
+        for source, translation in get_fixed_translations(language).items():
+            conn.execute(
+                "INSERT OR REPLACE INTO translation_memory "
+                "(key, language, source, translation, origin, created_at, last_used, use_count) "
+                "VALUES (?, ?, ?, ?, 'fixed', ?, ?, 0)",
+                (make_translation_key(source, language), language,
+                 normalize_translation_source(source), translation, now, now)
+            )
+    conn.commit()
+    return {
+        "conn": conn,
+        "lock": threading.Lock(),
+        "stats": {"hits": 0, "misses": 0, "stores": 0}
+    }
+
+def translation_memory_lookup(texts, target_language):
+    """번역 메모리에서 여러 원문을 한 번에 조회하여 {원문: 번역문} 반환 (없는 원문은 제외)"""
+    texts = [text for text in texts if text and text.strip()]
+    if not TRANSLATION_MEMORY_ENABLED or not texts:
+        return {}
+    
+    memory = get_translation_memory()
+    keys = {}
+    for text in texts:
+        keys.setdefault(make_translation_key(text, target_language), []).append(text)
+    
+    found = {}
+    now = time.time()
+    with memory["lock"]:
+        conn = memory["conn"]
+        key_list = list(keys)
+        for start in range(0, len(key_list), 500):
+            chunk = key_list[start:start + 500]
+            rows = conn.execute(
+                f"SELECT key, translation FROM translation_memory WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            for key, translation in rows:
+                for text in keys[key]:
+                    found[text] = translation
+            if rows:
+                conn.executemany(
+                    "UPDATE translation_memory SET last_used = ?, use_count = use_count + 1 WHERE key = ?",
+                    [(now, key) for key, _ in rows]
+                )
+        conn.commit()
+        memory["stats"]["hits"] += len(found)
+        memory["stats"]["misses"] += len(texts) - len(found)
+    
+    return found
+
+def translation_memory_store(translations, target_language, origin="llm"):
+    """{원문: 번역문}을 번역 메모리에 저장 (고정 텍스트 번역은 덮어쓰지 않음)"""
+    if not TRANSLATION_MEMORY_ENABLED:
+        return
+    
+    rows = []
+    now = time.time()
+    for source, translation in translations.items():
+        if source and source.strip() and translation and translation.strip():
+            rows.append((make_translation_key(source, target_language), target_language,
+                         normalize_translation_source(source), translation, origin, now, now))
+    if not rows:
+        return
+    
+    memory = get_translation_memory()
+    with memory["lock"]:
+        memory["conn"].executemany(
+            "INSERT INTO translation_memory "
+            "(key, language, source, translation, origin, created_at, last_used, use_count) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, 0) "
+            "ON CONFLICT(key) DO UPDATE SET translation = excluded.translation, last_used = excluded.last_used "
+            "WHERE translation_memory.origin != 'fixed'",
+            rows
+        )
+        memory["conn"].commit()
+        memory["stats"]["stores"] += len(rows)
+
+def get_translation_memory_stats():
+    """번역 메모리 적중/미스 카운터와 언어별 저장 세그먼트 수 반환"""
+    memory = get_translation_memory()
+    with memory["lock"]:
+        rows = memory["conn"].execute(
+            "SELECT language, COUNT(*) FROM translation_memory GROUP BY language"
+        ).fetchall()
+        stats = dict(memory["stats"])
+    
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    stats["entries"] = dict(rows)
+    return stats
+
+def strip_translation_prefix(translated):
+    """"Translation:", "번역:", "Translated:" 등 접두어 제거"""
+    prefixes_to_remove = [
+        "Translation:", "translation:", "TRANSLATION:",
+        "번역:", "Translated:", "translated:", "TRANSLATED:",
+        "Result:", "result:", "RESULT:"
+    ]
+    
+    for prefix in prefixes_to_remove:
+        if translated.startswith(prefix):
+            translated = translated[len(prefix):].strip()
+    
+    return translated
+
 def translate_text(text, target_language="en"):
     """텍스트를 지정된 언어로 번역 (Translation: 텍스트 제거)"""
     if not text or not text.strip() or target_language == "ko":
         return text
     
-    language_map = {
-        "en": "영어",
-        "ja": "일본어", 
-        "zh": "중국어",
-        "es": "스페인어",
-        "fr": "프랑스어",
-        "ms": "말레이시아어"  # 말레이시아어 추가
-    }
+    language_map = TRANSLATION_LANGUAGE_NAMES
     
     # 지원하지 않는 언어인 경우 원문 반환
     if target_language not in language_map:
         return text
     
+    # 번역 메모리에 있으면 API 호출 없이 재사용
+    remembered = translation_memory_lookup([text], target_language)
+    if text in remembered:
+        return remembered[text]
+    
     prompt = f"""다음 한국어 텍스트를 {language_map.get(target_language, '영어')}로 번역해주세요. 
 비즈니스 마케팅 맥락을 고려하여 전문적이고 자연스럽게 번역하세요.
 
@@ -582,24 +1669,17 @@ def translate_text(text, target_language="en"):
     try:
         response = safe_openai_call(
             messages=[{"role": "user", "content": prompt}],
-            model="gpt-4",
-            max_tokens=500
+            task="translate_short"
         )
         
         if response and response.choices and response.choices[0].message.content:
             translated = response.choices[0].message.content.strip()
             
             # "Translation:", "번역:", "Translated:" 등 접두어 제거
-            prefixes_to_remove = [
-                "Translation:", "translation:", "TRANSLATION:",
-                "번역:", "Translated:", "translated:", "TRANSLATED:",
-                "Result:", "result:", "RESULT:"
-            ]
-            
-            for prefix in prefixes_to_remove:
-                if translated.startswith(prefix):
-                    translated = translated[len(prefix):].strip()
+            translated = strip_translation_prefix(translated)
             
+            if translated:
+                translation_memory_store({text: translated}, target_language)
             return translated if translated else text
         else:
             print(f"번역 실패: {text[:50]}... (원문 유지)")
@@ -608,6 +1688,149 @@ def translate_text(text, target_language="en"):
         print(f"번역 오류: {str(e)}")
         return text
 
+TRANSLATION_ITEM_PATTERN = re.compile(r'\{\s*"id"\s*:\s*(\d+)\s*,\s*"text"\s*:\s*"((?:[^"\\]|\\.)*)"\s*\}')
+
+def _request_translation_batch(batch, target_language, on_item=None):
+    """(id, 원문) 묶음을 JSON 배열로 한 번에 번역 요청하고 {id: 번역문} 반환
+    
+    on_item(id, 번역문)을 주면 스트리밍 응답에서 항목이 완성될 때마다 호출합니다.
+    """
+    payload = json.dumps([{"id": seg_id, "text": text} for seg_id, text in batch], ensure_ascii=False)
+    prompt = f"""다음 JSON 배열의 각 한국어 text를 {TRANSLATION_LANGUAGE_NAMES[target_language]}로 번역해주세요.
+비즈니스 마케팅 맥락을 고려하여 전문적이고 자연스럽게 번역하세요.
+
+규칙:
+- 모든 id에 대해 빠짐없이 번역하고 id 값은 그대로 유지
+- 이모티콘, 숫자, 콜론(:) 등 기호와 문장 구조는 그대로 유지
+- "Translation:" 등의 접두어 없이 번역문만 text에 넣기
+- 설명 없이 [{{"id": 0, "text": "번역문"}}, ...] 형식의 JSON 배열만 응답
+
+{payload}"""
+    
+    streamed_ids = set()
+    
+    def stream_items(partial_text):
+        for match in TRANSLATION_ITEM_PATTERN.finditer(partial_text):
+            seg_id = int(match.group(1))
+            if seg_id in streamed_ids:
+                continue
+            streamed_ids.add(seg_id)
+            try:
+                on_item(seg_id, strip_translation_prefix(json.loads(f'"{match.group(2)}"').strip()))
+            except ValueError:
+                continue
+    
+    route = get_model_route("translate_batch")
+    try:
+        response = safe_openai_call(
+            messages=[{"role": "user", "content": prompt}],
+            task="translate_batch",
+            max_tokens=min(route["max_tokens"], 200 + count_tokens(payload, route["model"]) * 3),
+            temperature=0.3,
+            on_delta=stream_items if on_item else None
+        )
+        if not response or not response.choices or not response.choices[0].message.content:
+            return {}
+        
+        result_text = response.choices[0].message.content
+        array_match = re.search(r"\[[\s\S]*\]", result_text)
+        if not array_match:
+            return {}
+        
+        items = json.loads(array_match.group())
+    except Exception as e:
+        print(f"일괄 번역 요청 오류: {str(e)}")
+        return {}
+    
+    translated = {}
+    for item in items:
+        if isinstance(item, dict) and isinstance(item.get("text"), str) and item["text"].strip():
+            try:
+                translated[int(item.get("id"))] = strip_translation_prefix(item["text"].strip())
+            except (TypeError, ValueError):
+                continue
+    return translated
+
+@track_stage("translate_segments")
+def translate_segments(texts, target_language, max_rounds=2, on_progress=None):
+    """여러 텍스트 세그먼트를 중복 제거 후 일괄(JSON 배열) 번역하여 {원문: 번역문} 반환
+    
+    응답에서 누락된 세그먼트는 다음 라운드에 다시 요청하고, 그래도 남으면 개별 번역으로 처리합니다.
+    on_progress(완료 수, 전체 수, 원문, 번역문)를 주면 스트리밍 응답에서 세그먼트가 완성될 때마다 호출합니다.
+    """
+    unique_texts = []
+    for text in texts:
+        if text and text.strip() and text not in unique_texts:
+            unique_texts.append(text)
+    
+    if target_language == "ko" or target_language not in TRANSLATION_LANGUAGE_NAMES:
+        return {text: text for text in unique_texts}
+    
+    # 번역 메모리에 있는 세그먼트는 API 요청에서 제외
+    translations = translation_memory_lookup(unique_texts, target_language)
+    pending = [(seg_id, text) for seg_id, text in enumerate(unique_texts) if text not in translations]
+    
+    # 스트리밍 진행 상황: 작업 스레드는 완성된 세그먼트를 큐에 넣기만 하고,
+    # on_progress(위젯 갱신)는 호출 스레드에서 큐를 비우며 호출
+    progress_events = queue.SimpleQueue()
+    completed_ids = set(seg_id for seg_id, text in enumerate(unique_texts) if text in translations)
+    
+    def report_item(seg_id, translated):
+        progress_events.put((seg_id, translated))
+    
+    def flush_progress():
+        while True:
+            try:
+                seg_id, translated = progress_events.get_nowait()
+            except queue.Empty:
+                return
+            if not 0 <= seg_id < len(unique_texts) or seg_id in completed_ids:
+                continue
+            completed_ids.add(seg_id)
+            on_progress(len(completed_ids), len(unique_texts), unique_texts[seg_id], translated)
+    
+    for round_index in range(max_rounds):
+        if not pending:
+            break
+        
+        # 세그먼트 수와 글자 수 기준으로 요청 분할
+        batches = []
+        current, current_chars = [], 0
+        for seg_id, text in pending:
+            if current and (len(current) >= TRANSLATION_BATCH_SIZE or current_chars + len(text) > TRANSLATION_BATCH_CHARS):
+                batches.append(current)
+                current, current_chars = [], 0
+            current.append((seg_id, text))
+            current_chars += len(text)
+        if current:
+            batches.append(current)
+        
+        results = run_concurrently([
+            lambda batch=batch: _request_translation_batch(batch, target_language, report_item if on_progress else None)
+            for batch in batches
+        ], on_wait=flush_progress if on_progress else None)
+        
+        for batch_result in results:
+            batch_translations = {
+                unique_texts[seg_id]: translated
+                for seg_id, translated in batch_result.items() if 0 <= seg_id < len(unique_texts)
+            }
+            translations.update(batch_translations)
+            translation_memory_store(batch_translations, target_language)
+        
+        pending = [(seg_id, text) for seg_id, text in pending if text not in translations]
+        if pending:
+            print(f"일괄 번역 누락 {len(pending)}건 재요청 (라운드 {round_index + 1})")
+    
+    # 반복 요청 후에도 누락된 세그먼트는 개별 번역
+    for seg_id, text in pending:
+        translations[text] = translate_text(text, target_language)
+        if on_progress:
+            report_item(seg_id, translations[text])
+            flush_progress()
+    
+    return translations
+
 def translate_all_content(content, target_language):
     """모든 콘텐츠를 완전히 번역"""
     if target_language == "ko":
@@ -750,6 +1973,7 @@ def extract_text_from_pdf(file):
         st.error(f"PDF 처리 오류: {str(e)}")
         return None
 
+@track_stage("extract_pdf_structured_content")
 def extract_pdf_structured_content(pdf_text):
     """PDF 텍스트에서 구조화된 내용 추출 - 문장 끊김 방지"""
     if not pdf_text:
@@ -762,7 +1986,7 @@ def extract_pdf_structured_content(pdf_text):
     prompt = f"""다음 PDF 내용을 분석하여 EDM 작성에 필요한 정보를 구조화해주세요:
 
 PDF 내용:
-{clean_text[:2000]}
+{trim_task_input(clean_text, "pdf_structure")}
 
 다음 형식의 JSON으로 응답해주세요:
 {{
@@ -779,8 +2003,7 @@ PDF 내용:
     try:
         response = safe_openai_call(
             messages=[{"role": "user", "content": prompt}],
-            model="gpt-4",
-            max_tokens=500
+            task="pdf_structure"
         )
         
         if response:
@@ -825,13 +2048,14 @@ def extract_text_from_image(file):
         st.error(f"이미지 처리 오류: {str(e)}")
         return None
 
+@track_stage("summarize_content")
 def summarize_content(text):
     if not text or len(text.strip()) < 50:
         return "요약할 내용이 부족합니다."
     
     prompt = f"""다음 내용을 3줄 이내(최대 250자)로 핵심만 간단히 요약해주세요:
 
-{text[:3000]}
+{trim_task_input(text, "summarize")}
 
 요구사항:
 - 3줄 이내로 압축
@@ -840,63 +2064,662 @@ def summarize_content(text):
 - 최대 250자 제한"""
     
     try:
-        r = client.chat.completions.create(
-            model="gpt-4", 
+        r = safe_openai_call(
             messages=[{"role": "user", "content": prompt}],
-            max_tokens=300
+            temperature=1.0,  # 기존 요약 호출과 같은 샘플링 (API 기본값)
+            task="summarize"
         )
+        if not r:
+            return "요약 처리 중 오류가 발생했습니다."
         return r.choices[0].message.content.strip()
     except Exception as e:
         st.error(f"요약 처리 오류: {str(e)}")
         return "요약 처리 중 오류가 발생했습니다."
 
 # 개선된 이미지 처리 함수들
-def analyze_svg_brightness(svg_content):
-    """SVG 내용을 분석하여 평균 명도 계산"""
+SVG_NAMED_COLORS = {
+    "white": (255, 255, 255), "black": (0, 0, 0), "gray": (128, 128, 128), "grey": (128, 128, 128),
+    "silver": (192, 192, 192), "red": (255, 0, 0), "green": (0, 128, 0), "blue": (0, 0, 255),
+    "navy": (0, 0, 128), "yellow": (255, 255, 0), "orange": (255, 165, 0), "purple": (128, 0, 128)
+}
+# 그려지지 않는 정의용 컨테이너 (안의 도형은 명도 계산에서 제외)
+SVG_NON_RENDERED_TAGS = {"defs", "clipPath", "mask", "pattern", "symbol", "marker", "linearGradient", "radialGradient", "filter"}
+SVG_SCALE_PATTERN = re.compile(r"scale\(([^)]*)\)")
+SVG_NUMBER_LIST_PATTERN = re.compile(r"-?\d*\.?\d+(?:[eE][-+]?\d+)?")
+SVG_PATH_TOKEN_PATTERN = re.compile(r"[MmLlHhVvCcSsQqTtAaZz]|-?\d*\.?\d+(?:[eE][-+]?\d+)?")
+SVG_PATH_ARG_COUNTS = {"m": 2, "l": 2, "h": 1, "v": 1, "c": 6, "s": 4, "q": 4, "t": 2, "a": 7}
+
+def parse_svg_color(value):
+    """SVG 색상 문자열 -> ((r, g, b), alpha), 해석할 수 없으면 None"""
+    value = (value or "").strip().lower()
+    if not value or value in ("none", "transparent", "currentcolor", "inherit"):
+        return None
+    if value in SVG_NAMED_COLORS:
+        return SVG_NAMED_COLORS[value], 1.0
+    if value.startswith("#"):
+        hex_color = value[1:]
+        if len(hex_color) in (3, 4):
+            hex_color = "".join(c * 2 for c in hex_color)
+        if len(hex_color) in (6, 8):
+            try:
+                channels = [int(hex_color[i:i + 2], 16) for i in range(0, len(hex_color), 2)]
+            except ValueError:
+                return None
+            return tuple(channels[:3]), (channels[3] / 255 if len(channels) == 4 else 1.0)
+        return None
+    rgb_match = re.match(r"rgba?\(([^)]*)\)", value)
+    if rgb_match:
+        parts = [part.strip() for part in re.split(r"[\s,/]+", rgb_match.group(1)) if part.strip()]
+        try:
+            channels = [float(part[:-1]) * 2.55 if part.endswith("%") else float(part) for part in parts[:3]]
+            alpha = float(parts[3].rstrip("%")) / (100 if parts[3].endswith("%") else 1) if len(parts) > 3 else 1.0
+        except (ValueError, IndexError):
+            return None
+        return tuple(max(0, min(255, c)) for c in channels), alpha
+    return None
+
+def color_luminance(rgb):
+    return rgb[0] * 0.299 + rgb[1] * 0.587 + rgb[2] * 0.114
+
+def _svg_numbers(value):
+    """속성 문자열의 숫자 목록 (단위, 구분자, 숫자가 아닌 부분은 건너뛰므로 예외가 나지 않음)"""
+    return [float(v) for v in SVG_NUMBER_LIST_PATTERN.findall(value or "")]
+
+def svg_path_points(d):
+    """path의 d 속성 -> 절대 좌표 점 목록 (상대 명령은 현재 점 기준으로 변환)
+    
+    곡선은 제어점과 끝점을, 호(A)는 끝점만 포함하므로 면적/둘레 계산에서는 근사값입니다.
+    잘못된 명령이나 인자가 모자란 부분부터는 무시합니다.
+    """
+    points = []
+    x = y = start_x = start_y = 0.0
+    command = None
+    tokens = SVG_PATH_TOKEN_PATTERN.findall(d or "")
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token.isalpha():
+            command = token
+            index += 1
+            if command in "Zz":
+                x, y = start_x, start_y
+                points.append((x, y))
+            continue
+        lower = (command or "z").lower()
+        if lower == "z":
+            break
+        count = SVG_PATH_ARG_COUNTS[lower]
+        args = tokens[index:index + count]
+        if len(args) < count or any(arg.isalpha() for arg in args):
+            break
+        index += count
+        nums = [float(arg) for arg in args]
+        relative = command.islower()
+        if lower == "h":
+            x = x + nums[0] if relative else nums[0]
+            pairs = [(x, y)]
+        elif lower == "v":
+            y = y + nums[0] if relative else nums[0]
+            pairs = [(x, y)]
+        else:
+            if lower == "a":
+                nums = nums[5:]
+            pairs = list(zip(nums[0::2], nums[1::2]))
+            if relative:
+                pairs = [(x + px, y + py) for px, py in pairs]
+            x, y = pairs[-1]
+        points.extend(pairs)
+        if lower == "m":
+            # 이동 명령 뒤에 이어지는 좌표는 선 명령으로 처리
+            start_x, start_y = x, y
+            command = "l" if relative else "L"
+    return points
+
+def _svg_length(value, reference, default=0.0):
+    value = (value or "").strip()
     try:
-        # SVG에서 색상 정보 추출
-        colors = []
-        
-        # fill 속성에서 색상 추출
-        fill_colors = re.findall(r'fill=["\']([^"\']+)["\']', svg_content, re.IGNORECASE)
-        colors.extend(fill_colors)
-        
-        # stop-color에서 색상 추출 (그라데이션)
-        stop_colors = re.findall(r'stop-color:([^;"\'\s]+)', svg_content, re.IGNORECASE)
-        colors.extend(stop_colors)
-        
-        # stroke 색상 추출
-        stroke_colors = re.findall(r'stroke=["\']([^"\']+)["\']', svg_content, re.IGNORECASE)
-        colors.extend(stroke_colors)
-        
-        if not colors:
-            return 128  # 중간값 반환
-        
-        # 색상별 명도 계산
-        brightness_values = []
-        for color in colors:
-            if color.lower() in ['white', '#ffffff', '#fff']:
-                brightness_values.append(255)
-            elif color.lower() in ['black', '#000000', '#000']:
-                brightness_values.append(0)
-            elif color.startswith('#'):
-                try:
-                    hex_color = color.lstrip('#')
-                    if len(hex_color) == 3:
-                        hex_color = ''.join([c*2 for c in hex_color])
-                    if len(hex_color) == 6:
-                        r, g, b = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-                        brightness = (r * 0.299 + g * 0.587 + b * 0.114)
-                        brightness_values.append(brightness)
-                except:
+        if value.endswith("%"):
+            return float(value[:-1]) / 100 * reference
+        return float(re.sub(r"[a-z]+$", "", value))
+    except ValueError:
+        return default
+
+def analyze_svg(svg_content, base_luminance=255):
+    """SVG를 한 번의 스트리밍 파싱으로 분석 - 효과 근거(요소 수)와 면적 가중 명도를 함께 계산
+    
+    명도는 문서 순서(나중 요소가 위)대로 도형 면적 비율 x 불투명도만큼 아래 색을 덮는 방식으로 합성합니다.
+    base_luminance는 SVG 아래 바탕색 명도 (EDM 컨테이너는 흰색).
+    
+    Returns:
+        dict: valid, width, height, counts(태그별 개수), small_circles, has_blur, has_text,
+              effects(효과별 근거 여부), luminance, coverage, layers
+    """
+    analysis = {
+        "valid": False, "width": 700.0, "height": 200.0, "counts": {}, "small_circles": 0,
+        "has_blur": False, "has_text": False, "effects": {}, "luminance": 128.0, "coverage": 0.0, "layers": 0
+    }
+    svg_match = re.search(r"<svg[\s\S]*?</svg>", svg_content or "", re.IGNORECASE)
+    if not svg_match:
+        return analysis
+    
+    counts = analysis["counts"]
+    gradients = {}  # id -> {"stops": [(rgb, alpha)], "href": id}
+    layers = []  # (면적, 불투명도, 색상(rgb) 또는 그라데이션 id)
+    stack = []  # 요소별 상속 상태 (fill, stroke, opacity, scale, 정의 컨테이너 안 여부)
+    current_gradient = None
+    canvas_area = None
+    
+    try:
+        for event, element in ET.iterparse(io.BytesIO(svg_match.group().encode("utf-8")), events=("start", "end")):
+            name = _svg_local_name(element.tag)
+            if event == "end":
+                if stack:
+                    stack.pop()
+                if name in ("linearGradient", "radialGradient"):
+                    current_gradient = None
+                element.clear()
+                continue
+            
+            counts[name] = counts.get(name, 0) + 1
+            attrs = dict(element.attrib)
+            style = attrs.pop("style", "")
+            for declaration in style.split(";"):
+                if ":" in declaration:
+                    prop, value = (part.strip() for part in declaration.split(":", 1))
+                    attrs[prop] = value
+            
+            parent = stack[-1] if stack else {"fill": "black", "stroke": None, "opacity": 1.0, "scale": 1.0,
+                                              "hidden": False}
+            scale_match = SVG_SCALE_PATTERN.search(attrs.get("transform", ""))
+            scale = parent["scale"]
+            scale_args = _svg_numbers(scale_match.group(1)) if scale_match else []
+            if scale_args:
+                sx = scale_args[0]
+                scale *= abs(sx * (scale_args[1] if len(scale_args) > 1 else sx))
+            try:
+                opacity = parent["opacity"] * float(attrs.get("opacity", 1))
+            except ValueError:
+                opacity = parent["opacity"]
+            state = {
+                "fill": attrs.get("fill", parent["fill"]),
+                "stroke": attrs.get("stroke", parent["stroke"]),
+                "opacity": opacity,
+                "scale": scale,
+                "hidden": parent["hidden"] or name in SVG_NON_RENDERED_TAGS
+            }
+            stack.append(state)
+            
+            if name == "svg" and canvas_area is None:
+                view_box = _svg_numbers(attrs.get("viewBox"))
+                if len(view_box) == 4 and view_box[2] > 0 and view_box[3] > 0:
+                    analysis["width"], analysis["height"] = view_box[2], view_box[3]
+                else:
+                    analysis["width"] = _svg_length(attrs.get("width"), 700, 700) or 700.0
+                    analysis["height"] = _svg_length(attrs.get("height"), 200, 200) or 200.0
+                canvas_area = analysis["width"] * analysis["height"]
+                continue
+            
+            if name in ("linearGradient", "radialGradient"):
+                current_gradient = attrs.get("id")
+                href = attrs.get("href") or attrs.get(f"{{{XLINK_NAMESPACE}}}href") or ""
+                if current_gradient:
+                    gradients[current_gradient] = {"stops": [], "href": href.lstrip("#")}
+                continue
+            if name == "stop" and current_gradient in gradients:
+                color = parse_svg_color(attrs.get("stop-color", "black"))
+                if color:
+                    try:
+                        stop_opacity = float(attrs.get("stop-opacity", 1))
+                    except ValueError:
+                        stop_opacity = 1.0
+                    gradients[current_gradient]["stops"].append((color[0], color[1] * stop_opacity))
+                continue
+            if name == "feGaussianBlur":
+                analysis["has_blur"] = True
+                continue
+            if name == "text":
+                analysis["has_text"] = True
+            
+            if name not in ("rect", "circle", "ellipse", "polygon", "polyline", "path", "line") or state["hidden"]:
+                continue
+            
+            # 도형 면적(채우기)과 둘레(선) 추정
+            width, height = analysis["width"], analysis["height"]
+            if name == "path":
+                points = svg_path_points(attrs.get("d"))
+            else:
+                coords = _svg_numbers(attrs.get("points"))
+                points = list(zip(coords[0::2], coords[1::2]))
+            if name == "rect":
+                w = min(_svg_length(attrs.get("width"), width), width)
+                h = min(_svg_length(attrs.get("height"), height), height)
+                area, perimeter = w * h, 2 * (w + h)
+            elif name == "circle":
+                r = _svg_length(attrs.get("r"), min(width, height))
+                if r <= 8:
+                    analysis["small_circles"] += 1
+                area, perimeter = math.pi * r * r, 2 * math.pi * r
+            elif name == "ellipse":
+                rx, ry = _svg_length(attrs.get("rx"), width), _svg_length(attrs.get("ry"), height)
+                area, perimeter = math.pi * rx * ry, math.pi * (rx + ry)
+            elif name == "line":
+                x1, y1 = _svg_length(attrs.get("x1"), width), _svg_length(attrs.get("y1"), height)
+                x2, y2 = _svg_length(attrs.get("x2"), width), _svg_length(attrs.get("y2"), height)
+                area, perimeter = 0.0, math.hypot(x2 - x1, y2 - y1)
+            else:
+                perimeter = sum(math.hypot(b[0] - a[0], b[1] - a[1]) for a, b in zip(points, points[1:]))
+                if name == "polygon" and len(points) >= 3:
+                    area = abs(sum(a[0] * b[1] - b[0] * a[1] for a, b in zip(points, points[1:] + points[:1]))) / 2
+                elif name == "path" and points:
+                    # 곡선 경로는 경계 상자의 절반으로 근사
+                    xs, ys = [p[0] for p in points], [p[1] for p in points]
+                    area = (max(xs) - min(xs)) * (max(ys) - min(ys)) / 2
+                else:
+                    area = 0.0
+            
+            for paint, paint_area, paint_opacity_attr in (
+                (state["fill"], area, "fill-opacity"),
+                (state["stroke"], perimeter * _svg_length(attrs.get("stroke-width"), width, 1.0), "stroke-opacity")
+            ):
+                if not paint or paint_area <= 0:
                     continue
-        
-        # 평균 명도 반환
-        return sum(brightness_values) / len(brightness_values) if brightness_values else 128
-        
+                try:
+                    paint_opacity = state["opacity"] * float(attrs.get(paint_opacity_attr, 1))
+                except ValueError:
+                    paint_opacity = state["opacity"]
+                url_match = SVG_URL_REF_PATTERN.search(paint)
+                if url_match:
+                    layers.append((paint_area * state["scale"], paint_opacity, url_match.group(1)))
+                else:
+                    color = parse_svg_color(paint)
+                    if color:
+                        layers.append((paint_area * state["scale"], paint_opacity * color[1], color[0]))
+    except ET.ParseError as e:
+        print(f"SVG 분석 파싱 오류: {str(e)}")
+        return analysis
+    
+    analysis["valid"] = True
+    canvas_area = canvas_area or analysis["width"] * analysis["height"]
+    
+    def gradient_paint(gradient_id, depth=0):
+        """그라데이션 정지점 평균 색 (rgb, alpha), href로 정지점을 물려받는 경우 포함"""
+        gradient = gradients.get(gradient_id)
+        if not gradient or depth > 5:
+            return None
+        if not gradient["stops"]:
+            return gradient_paint(gradient["href"], depth + 1)
+        total_alpha = sum(alpha for _, alpha in gradient["stops"])
+        if total_alpha <= 0:
+            return None
+        rgb = tuple(sum(c[i] * alpha for c, alpha in gradient["stops"]) / total_alpha for i in range(3))
+        return rgb, total_alpha / len(gradient["stops"])
+    
+    # 화가 알고리즘 순서로 합성 (면적 비율 x 불투명도 = 덮는 비율)
+    luminance, coverage = float(base_luminance), 0.0
+    for area, opacity, paint in layers:
+        if isinstance(paint, str):
+            resolved = gradient_paint(paint)
+            if not resolved:
+                continue
+            paint, alpha = resolved
+            opacity *= alpha
+        cover = max(0.0, min(area / canvas_area, 1.0) * min(opacity, 1.0))
+        luminance = luminance * (1 - cover) + color_luminance(paint) * cover
+        coverage = min(coverage + cover, 1.0)
+        analysis["layers"] += 1
+    
+    if analysis["layers"]:
+        analysis["luminance"] = luminance
+    analysis["coverage"] = coverage
+    analysis["effects"] = {
+        "gradient": bool(counts.get("linearGradient") or counts.get("radialGradient")),
+        "sparkles": bool(analysis["small_circles"] or counts.get("polygon")),
+        "bokeh": bool((counts.get("filter") or analysis["has_blur"]) and counts.get("circle")),
+        "lines": bool(counts.get("path")),
+        "abstract": bool(counts.get("rect") or counts.get("polygon") or counts.get("circle"))
+    }
+    return analysis
+
+def analyze_svg_brightness(svg_content):
+    """SVG 배경의 평균 명도 (0~255) - 저해상도 래스터 명도 맵 평균, 렌더링할 수 없으면 면적 가중 추정값"""
+    luminance_map = rasterize_svg_luminance(svg_content)
+    if luminance_map is not None:
+        return float(luminance_map.mean())
+    return analyze_svg(svg_content)["luminance"]
+
+# 배경 SVG 저해상도 명도 맵 (로고 선택/대비 검사용, 700x200 배너 비율)
+SVG_RASTER_SIZE = (64, 18)  # (가로, 세로) 픽셀
+SVG_RASTER_SUPERSAMPLE = 2  # 픽셀당 가로/세로 샘플 수
+SVG_RASTER_CACHE_SIZE = 256
+SVG_TRANSFORM_PATTERN = re.compile(r"(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)")
+
+@st.cache_resource(show_spinner=False)
+def get_svg_raster_cache():
+    """SVG 해시 -> 명도 맵 (프로세스 공용, LRU)"""
+    return {"lock": threading.Lock(), "entries": OrderedDict(), "stats": {"hits": 0, "misses": 0, "failed": 0, "render_ms": 0.0}}
+
+def get_svg_raster_stats():
+    cache = get_svg_raster_cache()
+    with cache["lock"]:
+        stats = dict(cache["stats"])
+        stats["entries"] = len(cache["entries"])
+    stats["avg_render_ms"] = stats["render_ms"] / stats["misses"] if stats["misses"] else 0.0
+    return stats
+
+def _multiply_affine(m1, m2):
+    """2D 아핀 행렬 (a, b, c, d, e, f) 곱 m1 x m2"""
+    a1, b1, c1, d1, e1, f1 = m1
+    a2, b2, c2, d2, e2, f2 = m2
+    return (a1 * a2 + c1 * b2, b1 * a2 + d1 * b2, a1 * c2 + c1 * d2, b1 * c2 + d1 * d2,
+            a1 * e2 + c1 * f2 + e1, b1 * e2 + d1 * f2 + f1)
+
+def parse_svg_transform(value):
+    """transform 속성 -> 아핀 행렬 (a, b, c, d, e, f)"""
+    matrix = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+    for name, args in SVG_TRANSFORM_PATTERN.findall(value or ""):
+        nums = _svg_numbers(args)
+        if not nums:
+            continue
+        if name == "matrix" and len(nums) == 6:
+            step = tuple(nums)
+        elif name == "translate":
+            step = (1, 0, 0, 1, nums[0], nums[1] if len(nums) > 1 else 0)
+        elif name == "scale":
+            step = (nums[0], 0, 0, nums[1] if len(nums) > 1 else nums[0], 0, 0)
+        elif name == "rotate":
+            angle = math.radians(nums[0])
+            cx, cy = (nums[1], nums[2]) if len(nums) >= 3 else (0, 0)
+            cos_a, sin_a = math.cos(angle), math.sin(angle)
+            step = (cos_a, sin_a, -sin_a, cos_a, cx - cos_a * cx + sin_a * cy, cy - sin_a * cx - cos_a * cy)
+        elif name == "skewX":
+            step = (1, 0, math.tan(math.radians(nums[0])), 1, 0, 0)
+        elif name == "skewY":
+            step = (1, math.tan(math.radians(nums[0])), 0, 1, 0, 0)
+        else:
+            continue
+        matrix = _multiply_affine(matrix, step)
+    return matrix
+
+def rasterize_svg_luminance(svg_content, size=SVG_RASTER_SIZE):
+    """배경 SVG를 저해상도 명도 맵(세로 x 가로, 0~255)으로 렌더링 - SVG 해시별 캐시
+    
+    우리가 생성하는 SVG 범위(rect, circle, ellipse, polygon, path 근사, 선형/원형 그라데이션,
+    불투명도, transform)를 흰 바탕 위에 문서 순서대로 합성합니다. 블러 필터는 무시합니다.
+    numpy가 없거나 파싱할 수 없으면 None.
+    """
+    if not svg_content:
+        return None
+    key = hashlib.sha256(f"{size}|{svg_content}".encode("utf-8")).hexdigest()
+    cache = get_svg_raster_cache()
+    with cache["lock"]:
+        if key in cache["entries"]:
+            cache["entries"].move_to_end(key)
+            cache["stats"]["hits"] += 1
+            return cache["entries"][key]
+    
+    started = time.perf_counter()
+    try:
+        luminance_map = _render_svg_luminance(svg_content, size)
     except Exception as e:
-        print(f"SVG 명도 분석 오류: {str(e)}")
-        return 128
+        print(f"SVG 래스터 명도 계산 오류: {str(e)}")
+        luminance_map = None
+    
+    with cache["lock"]:
+        if luminance_map is None:
+            cache["stats"]["failed"] += 1
+            return None
+        cache["stats"]["misses"] += 1
+        cache["stats"]["render_ms"] += (time.perf_counter() - started) * 1000
+        cache["entries"][key] = luminance_map
+        while len(cache["entries"]) > SVG_RASTER_CACHE_SIZE:
+            cache["entries"].popitem(last=False)
+    return luminance_map
+
+def _render_svg_luminance(svg_content, size):
+    import numpy as np
+    
+    svg_match = re.search(r"<svg[\s\S]*?</svg>", svg_content, re.IGNORECASE)
+    if not svg_match:
+        return None
+    try:
+        root = ET.fromstring(svg_match.group())
+    except ET.ParseError:
+        return None
+    
+    # 캔버스(viewBox) 좌표의 샘플 격자
+    view_box = _svg_numbers(root.get("viewBox"))
+    if len(view_box) == 4 and view_box[2] > 0 and view_box[3] > 0:
+        vx, vy, vw, vh = view_box
+    else:
+        vx, vy = 0.0, 0.0
+        vw = _svg_length(root.get("width"), 700, 700) or 700.0
+        vh = _svg_length(root.get("height"), 200, 200) or 200.0
+    width, height = size
+    ss = SVG_RASTER_SUPERSAMPLE
+    xs = vx + (np.arange(width * ss) + 0.5) / (width * ss) * vw
+    ys = vy + (np.arange(height * ss) + 0.5) / (height * ss) * vh
+    X, Y = np.meshgrid(xs, ys)
+    pixel = max(vw / (width * ss), vh / (height * ss))  # 샘플 간격 (캔버스 단위)
+    canvas = np.full(X.shape, 255.0)
+    
+    gradients = {}
+    for element in root.iter():
+        if _svg_local_name(element.tag) in ("linearGradient", "radialGradient") and element.get("id"):
+            gradients[element.get("id")] = element
+    
+    def gradient_attr(element, name, default, depth=0):
+        """그라데이션 속성 (href로 연결된 그라데이션에서 상속)"""
+        if element.get(name) is not None or depth > 5:
+            return element.get(name, default)
+        href = (element.get("href") or element.get(f"{{{XLINK_NAMESPACE}}}href") or "").lstrip("#")
+        return gradient_attr(gradients[href], name, default, depth + 1) if href in gradients else default
+    
+    def gradient_stops(element, depth=0):
+        stops = []
+        for stop in element:
+            if _svg_local_name(stop.tag) != "stop":
+                continue
+            declarations = dict(
+                (part.strip() for part in item.split(":", 1)) for item in stop.get("style", "").split(";") if ":" in item
+            )
+            color = parse_svg_color(declarations.get("stop-color", stop.get("stop-color", "black")))
+            if not color:
+                continue
+            try:
+                stop_opacity = float(declarations.get("stop-opacity", stop.get("stop-opacity", 1)))
+            except ValueError:
+                stop_opacity = 1.0
+            offset = stop.get("offset", "0").strip()
+            offset = float(offset[:-1]) / 100 if offset.endswith("%") else float(offset or 0)
+            stops.append((min(max(offset, 0.0), 1.0), color_luminance(color[0]), color[1] * stop_opacity))
+        if not stops and depth <= 5:
+            href = (element.get("href") or element.get(f"{{{XLINK_NAMESPACE}}}href") or "").lstrip("#")
+            if href in gradients:
+                return gradient_stops(gradients[href], depth + 1)
+        return stops
+    
+    def paint_values(paint, lx, ly, bbox):
+        """칠하기 값 -> (명도, 알파) 스칼라 또는 샘플별 배열"""
+        url_match = SVG_URL_REF_PATTERN.search(paint or "")
+        if not url_match:
+            color = parse_svg_color(paint)
+            return (color_luminance(color[0]), color[1]) if color else None
+        gradient = gradients.get(url_match.group(1))
+        stops = gradient_stops(gradient) if gradient is not None else []
+        if not stops:
+            return None
+        offsets = np.maximum.accumulate(np.array([stop[0] for stop in stops]))
+        if gradient_attr(gradient, "gradientUnits", "objectBoundingBox") == "userSpaceOnUse":
+            u, v, ref_w, ref_h = lx, ly, vw, vh
+        else:
+            bx, by, bw, bh = bbox
+            u, v, ref_w, ref_h = (lx - bx) / (bw or 1), (ly - by) / (bh or 1), 1.0, 1.0
+        if _svg_local_name(gradient.tag) == "linearGradient":
+            x1 = _svg_length(gradient_attr(gradient, "x1", "0%"), ref_w)
+            y1 = _svg_length(gradient_attr(gradient, "y1", "0%"), ref_h)
+            x2 = _svg_length(gradient_attr(gradient, "x2", "100%"), ref_w)
+            y2 = _svg_length(gradient_attr(gradient, "y2", "0%"), ref_h)
+            dx, dy = x2 - x1, y2 - y1
+            t = ((u - x1) * dx + (v - y1) * dy) / ((dx * dx + dy * dy) or 1)
+        else:
+            cx = _svg_length(gradient_attr(gradient, "cx", "50%"), ref_w)
+            cy = _svg_length(gradient_attr(gradient, "cy", "50%"), ref_h)
+            r = _svg_length(gradient_attr(gradient, "r", "50%"), math.hypot(ref_w, ref_h) / math.sqrt(2)) or 1
+            t = np.hypot(u - cx, v - cy) / r
+        t = np.clip(t, 0.0, 1.0)
+        return (np.interp(t, offsets, [stop[1] for stop in stops]),
+                np.interp(t, offsets, [stop[2] for stop in stops]))
+    
+    def splat(lx, ly, cx, cy, area, local_pixel):
+        """샘플 간격보다 작은 도형: 중심에 면적만큼 텐트 필터로 분산 (전체 합 = 면적 비율)"""
+        weight = np.maximum(0, 1 - np.abs(lx - cx) / local_pixel) * np.maximum(0, 1 - np.abs(ly - cy) / local_pixel)
+        return np.minimum(weight * area / (local_pixel * local_pixel), 1.0)
+    
+    def polygon_coverage(lx, ly, points):
+        inside = np.zeros(lx.shape, dtype=bool)
+        for (xi, yi), (xj, yj) in zip(points, points[1:] + points[:1]):
+            if yi == yj:
+                continue
+            crosses = (yi > ly) != (yj > ly)
+            inside ^= crosses & (lx < (xj - xi) * (ly - yi) / (yj - yi) + xi)
+        return inside.astype(float)
+    
+    def stroke_coverage(lx, ly, points, stroke_width, local_pixel):
+        """폴리라인 선: 선분까지 거리 기반 텐트 필터 (가는 선도 면적만큼 반영)"""
+        distance = np.full(lx.shape, np.inf)
+        for (x1, y1), (x2, y2) in zip(points, points[1:]):
+            dx, dy = x2 - x1, y2 - y1
+            t = np.clip(((lx - x1) * dx + (ly - y1) * dy) / ((dx * dx + dy * dy) or 1), 0, 1)
+            distance = np.minimum(distance, np.hypot(lx - (x1 + t * dx), ly - (y1 + t * dy)))
+        if stroke_width >= local_pixel:
+            return np.clip((stroke_width / 2 - distance) / local_pixel + 0.5, 0, 1)
+        return np.maximum(0, 1 - distance / local_pixel) * stroke_width / local_pixel
+    
+    def composite(window, coverage, paint, opacity):
+        if paint is None:
+            return
+        luminance, alpha = paint
+        weight = coverage * alpha * opacity
+        canvas[window] = canvas[window] * (1 - weight) + luminance * weight
+    
+    def draw(element, inherited):
+        name = _svg_local_name(element.tag)
+        if name in SVG_NON_RENDERED_TAGS or name in ("text", "image", "use", "title", "desc", "metadata", "style"):
+            return
+        attrs = dict(element.attrib)
+        for item in attrs.pop("style", "").split(";"):
+            if ":" in item:
+                prop, value = (part.strip() for part in item.split(":", 1))
+                attrs[prop] = value
+        matrix = _multiply_affine(inherited["matrix"], parse_svg_transform(attrs.get("transform")))
+        try:
+            opacity = inherited["opacity"] * float(attrs.get("opacity", 1))
+        except ValueError:
+            opacity = inherited["opacity"]
+        state = {"matrix": matrix, "opacity": opacity,
+                 "fill": attrs.get("fill", inherited["fill"]), "stroke": attrs.get("stroke", inherited["stroke"]),
+                 "stroke-width": attrs.get("stroke-width", inherited["stroke-width"])}
+        
+        if name not in ("rect", "circle", "ellipse", "polygon", "polyline", "path", "line"):
+            for child in element:
+                draw(child, state)
+            return
+        a, b, c, d, e, f = matrix
+        det = a * d - b * c
+        if opacity <= 0 or abs(det) < 1e-9:
+            return
+        local_pixel = pixel / math.sqrt(abs(det))
+        
+        # 도형 기하 정보 (로컬 좌표)
+        outline = []
+        if name == "rect":
+            x, y = _svg_length(attrs.get("x"), vw), _svg_length(attrs.get("y"), vh)
+            w, h = _svg_length(attrs.get("width"), vw), _svg_length(attrs.get("height"), vh)
+            bbox = (x, y, w, h)
+            outline = [(x, y), (x + w, y), (x + w, y + h), (x, y + h), (x, y)]
+        elif name in ("circle", "ellipse"):
+            cx, cy = _svg_length(attrs.get("cx"), vw), _svg_length(attrs.get("cy"), vh)
+            if name == "circle":
+                rx = ry = _svg_length(attrs.get("r"), math.hypot(vw, vh) / math.sqrt(2))
+            else:
+                rx, ry = _svg_length(attrs.get("rx"), vw), _svg_length(attrs.get("ry"), vh)
+            if rx <= 0 or ry <= 0:
+                return
+            bbox = (cx - rx, cy - ry, 2 * rx, 2 * ry)
+        else:
+            if name == "path":
+                # path는 명령의 좌표점(절대 좌표, 곡선 제어점 포함)을 잇는 폴리곤으로 근사
+                outline = svg_path_points(attrs.get("d"))
+            else:
+                if name == "line":
+                    coords = [_svg_length(attrs.get(k), vw if k.startswith("x") else vh) for k in ("x1", "y1", "x2", "y2")]
+                else:
+                    coords = _svg_numbers(attrs.get("points"))
+                outline = list(zip(coords[0::2], coords[1::2]))
+            if not outline:
+                return
+            xs_, ys_ = [p[0] for p in outline], [p[1] for p in outline]
+            bbox = (min(xs_), min(ys_), max(xs_) - min(xs_), max(ys_) - min(ys_))
+        has_fill = state["fill"] not in (None, "none") and (name in ("rect", "circle", "ellipse") or len(outline) >= 3)
+        has_stroke = state["stroke"] not in (None, "none") and len(outline) >= 2
+        if not (has_fill or has_stroke):
+            return
+        stroke_width = _svg_length(state["stroke-width"], vw, 1.0) or 1.0
+        
+        # 도형이 닿는 샘플 범위만 계산 (변환된 경계 상자 + 여유)
+        margin = local_pixel + (stroke_width / 2 if has_stroke else 0)
+        bx, by, bw, bh = bbox
+        corners = [(bx - margin, by - margin), (bx + bw + margin, by - margin),
+                   (bx - margin, by + bh + margin), (bx + bw + margin, by + bh + margin)]
+        canvas_x = [a * px + c * py + e for px, py in corners]
+        canvas_y = [b * px + d * py + f for px, py in corners]
+        c0, c1 = np.searchsorted(xs, min(canvas_x)), np.searchsorted(xs, max(canvas_x), side="right")
+        r0, r1 = np.searchsorted(ys, min(canvas_y)), np.searchsorted(ys, max(canvas_y), side="right")
+        if c0 >= c1 or r0 >= r1:
+            return
+        window = (slice(r0, r1), slice(c0, c1))
+        
+        # 샘플 좌표를 도형의 로컬 좌표로 역변환
+        WX, WY = X[window], Y[window]
+        lx = (d * (WX - e) - c * (WY - f)) / det
+        ly = (-b * (WX - e) + a * (WY - f)) / det
+        
+        if has_fill:
+            if name == "rect":
+                if max(bw, bh) < local_pixel:
+                    fill_coverage = splat(lx, ly, bx + bw / 2, by + bh / 2, bw * bh, local_pixel)
+                else:
+                    fill_coverage = ((lx >= bx) & (lx < bx + bw) & (ly >= by) & (ly < by + bh)).astype(float)
+            elif name in ("circle", "ellipse"):
+                if 2 * max(rx, ry) < local_pixel:
+                    fill_coverage = splat(lx, ly, cx, cy, math.pi * rx * ry, local_pixel)
+                else:
+                    distance = np.hypot((lx - cx) / rx, (ly - cy) / ry)
+                    fill_coverage = np.clip((1 - distance) * min(rx, ry) / local_pixel + 0.5, 0, 1)
+            elif max(bw, bh) < local_pixel:
+                area = abs(sum(p[0] * q[1] - q[0] * p[1] for p, q in zip(outline, outline[1:] + outline[:1]))) / 2
+                fill_coverage = splat(lx, ly, bx + bw / 2, by + bh / 2, area, local_pixel)
+            else:
+                fill_coverage = polygon_coverage(lx, ly, outline)
+            composite(window, fill_coverage, paint_values(state["fill"], lx, ly, bbox),
+                      opacity * _svg_opacity(attrs, "fill-opacity"))
+        if has_stroke:
+            composite(window, stroke_coverage(lx, ly, outline, stroke_width, local_pixel),
+                      paint_values(state["stroke"], lx, ly, bbox), opacity * _svg_opacity(attrs, "stroke-opacity"))
+    
+    draw(root, {"matrix": (1.0, 0.0, 0.0, 1.0, 0.0, 0.0), "opacity": 1.0, "fill": "black", "stroke": None,
+                "stroke-width": "1"})
+    
+    # 슈퍼샘플 평균 -> (세로, 가로) 명도 맵
+    luminance_map = canvas.reshape(height, ss, width, ss).mean(axis=(1, 3))
+    luminance_map.setflags(write=False)
+    return luminance_map
+
+def _svg_opacity(attrs, name):
+    try:
+        return min(max(float(attrs.get(name, 1)), 0.0), 1.0)
+    except ValueError:
+        return 1.0
 
 def analyze_image_brightness(image_path):
     """업로드된 이미지의 평균 명도 분석"""
@@ -927,13 +2750,601 @@ def analyze_image_brightness(image_path):
         print(f"이미지 명도 분석 오류: {str(e)}")
         return 128
 
-def select_logo_by_background_analysis(theme_color, bg_svg_code, bg_image_path, company_logo_light, company_logo_dark):
-    """개선된 배경 분석 기반 로고 선택"""
+# 회사 로고 (저장소에 함께 배포되는 파일을 우선 사용, 원격 URL은 캐시 키 겸 최초 다운로드 주소)
+COMPANY_LOGO_LIGHT_URL = "https://raw.githubusercontent.com/Gina-cloud/edm-generator/main/woongjinit_logo1.png"  # 어두운 배경용 (밝은 로고)
+COMPANY_LOGO_DARK_URL = "https://raw.githubusercontent.com/Gina-cloud/edm-generator/main/woongjinit_logo2.png"   # 밝은 배경용 (어두운 로고)
+LOGO_BUNDLE_URL_PREFIX = "https://raw.githubusercontent.com/Gina-cloud/edm-generator/main/"
+LOGO_BUNDLE_DIR = os.path.dirname(os.path.abspath(__file__))
+LOGO_CACHE_DIR = os.getenv("EDM_LOGO_CACHE_DIR", os.path.join(CACHE_DIR, "logos"))
+LOGO_REVALIDATE_SECONDS = float(os.getenv("EDM_LOGO_REVALIDATE_SECONDS", "86400"))
+
+@st.cache_resource(show_spinner=False)
+def get_logo_asset_store():
+    """로고 URL -> {data, etag, last_modified, checked_at, source} (프로세스 공용 메모리 캐시)"""
+    return {"lock": threading.Lock(), "assets": {}, "revalidating": set(),
+            "stats": {"memory_hits": 0, "bundled": 0, "disk_hits": 0, "downloads": 0,
+                      "revalidated": 0, "not_modified": 0, "failed": 0}}
+
+def get_logo_asset_stats():
+    store = get_logo_asset_store()
+    with store["lock"]:
+        stats = dict(store["stats"])
+        stats["assets"] = len(store["assets"])
+    return stats
+
+def _logo_cache_paths(url):
+    name = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return os.path.join(LOGO_CACHE_DIR, name + ".bin"), os.path.join(LOGO_CACHE_DIR, name + ".json")
+
+def _write_logo_cache(url, asset):
+    """디스크 캐시에 원자적으로 기록 (임시 파일 작성 후 교체)"""
+    try:
+        os.makedirs(LOGO_CACHE_DIR, exist_ok=True)
+        data_path, meta_path = _logo_cache_paths(url)
+        meta = {"url": url, "etag": asset.get("etag"), "last_modified": asset.get("last_modified"),
+                "checked_at": asset["checked_at"]}
+        for path, payload in ((data_path, asset["data"]), (meta_path, json.dumps(meta).encode("utf-8"))):
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(payload)
+            os.replace(temp_path, path)
+    except OSError as e:
+        print(f"로고 캐시 저장 오류: {str(e)}")
+
+def _read_logo_cache(url):
+    data_path, meta_path = _logo_cache_paths(url)
     try:
-        background_brightness = 128  # 기본값
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(data_path, "rb") as f:
+            data = f.read()
+    except (OSError, ValueError):
+        return None
+    return {"data": data, "etag": meta.get("etag"), "last_modified": meta.get("last_modified"),
+            "checked_at": meta.get("checked_at", 0), "source": "disk"}
+
+def _fetch_logo(url, asset=None):
+    """로고 다운로드 (asset이 있으면 ETag/Last-Modified 조건부 요청), 304면 기존 asset 갱신"""
+    headers = {}
+    if asset:
+        if asset.get("etag"):
+            headers["If-None-Match"] = asset["etag"]
+        if asset.get("last_modified"):
+            headers["If-Modified-Since"] = asset["last_modified"]
+    response = requests.get(url, headers=headers, timeout=10)
+    if asset and response.status_code == 304:
+        return dict(asset, checked_at=time.time()), False
+    response.raise_for_status()
+    return {"data": response.content, "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "checked_at": time.time(), "source": "remote"}, True
+
+def _revalidate_logo(url, asset):
+    store = get_logo_asset_store()
+    try:
+        refreshed, changed = _fetch_logo(url, asset)
+        _write_logo_cache(url, refreshed)
+        with store["lock"]:
+            store["assets"][url] = refreshed
+            store["stats"]["revalidated" if changed else "not_modified"] += 1
+        if changed:
+            print(f"🔄 로고 갱신: {url}")
+    except Exception as e:
+        # 재검증 실패 시 기존 캐시를 계속 사용
+        print(f"로고 재검증 오류: {str(e)}")
+    finally:
+        with store["lock"]:
+            store["revalidating"].discard(url)
+
+def resolve_logo_bytes(url):
+    """로고 URL -> 원본 바이트 (저장소 배포 파일 -> 메모리 -> 디스크 캐시 -> 최초 1회 다운로드 순), 실패하면 None
+    
+    캐시된 원격 로고는 EDM_LOGO_REVALIDATE_SECONDS가 지나면 백그라운드에서 조건부 요청으로 재검증하며,
+    렌더링 중에는 재검증을 기다리지 않습니다.
+    """
+    if not url:
+        return None
+    store = get_logo_asset_store()
+    with store["lock"]:
+        asset = store["assets"].get(url)
+        if asset:
+            store["stats"]["memory_hits"] += 1
+    
+    if asset is None and url.startswith(LOGO_BUNDLE_URL_PREFIX):
+        bundled_path = os.path.join(LOGO_BUNDLE_DIR, url[len(LOGO_BUNDLE_URL_PREFIX):])
+        if os.path.isfile(bundled_path):
+            with open(bundled_path, "rb") as f:
+                asset = {"data": f.read(), "source": "bundled", "checked_at": time.time()}
+            with store["lock"]:
+                store["assets"][url] = asset
+                store["stats"]["bundled"] += 1
+    
+    if asset is None:
+        asset = _read_logo_cache(url)
+        if asset:
+            with store["lock"]:
+                store["assets"][url] = asset
+                store["stats"]["disk_hits"] += 1
+    
+    if asset is None:
+        try:
+            asset, _ = _fetch_logo(url)
+        except Exception as e:
+            print(f"로고 다운로드 오류: {str(e)}")
+            with store["lock"]:
+                store["stats"]["failed"] += 1
+            return None
+        _write_logo_cache(url, asset)
+        with store["lock"]:
+            store["assets"][url] = asset
+            store["stats"]["downloads"] += 1
+        return asset["data"]
+    
+    if asset["source"] != "bundled" and time.time() - asset["checked_at"] > LOGO_REVALIDATE_SECONDS:
+        with store["lock"]:
+            start = url not in store["revalidating"]
+            store["revalidating"].add(url)
+        if start:
+            threading.Thread(target=_revalidate_logo, args=(url, asset), daemon=True).start()
+    return asset["data"]
+
+# EDM 헤더 로고 배치 (get_enhanced_css_styles 기준: 700px 폭, 30px 패딩, 높이 50px 로고 영역, 로고 최대 150x50)
+HERO_SIZE = (700, 220)
+HERO_PADDING = 30
+LOGO_SECTION_HEIGHT = 50
+LOGO_MAX_SIZE = (150, 50)
+HERO_LUMINANCE_SIZE = (140, 44)  # 업로드 이미지/테마 배경 명도 맵 해상도 (헤더의 1/5)
+LOGO_CONTRAST_CACHE_SIZE = 512
+
+@st.cache_resource(show_spinner=False)
+def get_logo_contrast_cache():
+    """(배경 해시, 로고 해시, 위치) -> 대비 점수, 배경 해시 -> 명도 맵 (프로세스 공용, LRU)"""
+    return {"lock": threading.Lock(), "scores": OrderedDict(), "backgrounds": OrderedDict(),
+            "stats": {"hits": 0, "misses": 0, "failed": 0}}
+
+def get_logo_contrast_stats():
+    cache = get_logo_contrast_cache()
+    with cache["lock"]:
+        stats = dict(cache["stats"])
+        stats["scores"] = len(cache["scores"])
+        stats["backgrounds"] = len(cache["backgrounds"])
+    return stats
+
+def _lru_put(entries, key, value, limit=LOGO_CONTRAST_CACHE_SIZE):
+    entries[key] = value
+    entries.move_to_end(key)
+    while len(entries) > limit:
+        entries.popitem(last=False)
+
+def read_logo_bytes(source):
+    """로고 원본 바이트 (URL, 파일 경로, 업로드 파일 객체), 읽을 수 없으면 None"""
+    try:
+        if isinstance(source, str):
+            if source.startswith(("http://", "https://")):
+                return resolve_logo_bytes(source)
+            if os.path.exists(source):
+                with open(source, "rb") as f:
+                    return f.read()
+            return None
+        source.seek(0)
+        data = source.read()
+        source.seek(0)
+        return data
+    except Exception as e:
+        print(f"로고 이미지 로드 오류: {str(e)}")
+        return None
+
+# 업로드 배경 이미지 처리 (헤더 크기로 잘라 축소, 용량 예산 내 인코딩)
+BG_IMAGE_FORMAT = os.getenv("EDM_BG_IMAGE_FORMAT", "jpeg").lower()  # "jpeg" 또는 "webp" (일부 메일 클라이언트는 WebP 미지원)
+BG_IMAGE_MAX_BYTES = int(os.getenv("EDM_BG_IMAGE_MAX_BYTES", str(150 * 1024)))
+BG_IMAGE_SCALE = 2  # 고해상도 화면용 헤더 2배 크기
+BG_IMAGE_QUALITIES = (85, 75, 65, 55, 45)
+BG_IMAGE_CACHE_SIZE = 16
+
+@st.cache_resource(show_spinner=False)
+def get_background_image_cache():
+    """(원본 해시, 형식, 용량 예산, 바탕색) -> 준비된 배경 이미지 (프로세스 공용, LRU)"""
+    return {"lock": threading.Lock(), "entries": OrderedDict(),
+            "stats": {"hits": 0, "misses": 0, "source_bytes": 0, "output_bytes": 0, "prepare_ms": 0.0}}
+
+def get_background_image_stats():
+    cache = get_background_image_cache()
+    with cache["lock"]:
+        stats = dict(cache["stats"])
+        stats["entries"] = len(cache["entries"])
+    return stats
+
+def _smart_crop_box(luminance, target_ratio):
+    """명도 배열에서 목표 비율로 잘라낼 영역 (x0, y0, x1, y1) - 디테일(명도 변화)이 많은 구간을 고르되 가운데를 선호"""
+    import numpy as np
+    
+    height, width = luminance.shape
+    gradient_y, gradient_x = np.gradient(luminance)
+    energy = np.hypot(gradient_x, gradient_y)
+    horizontal = width / height > target_ratio
+    profile = energy.sum(axis=0) if horizontal else energy.sum(axis=1)
+    window = int(round(height * target_ratio)) if horizontal else int(round(width / target_ratio))
+    window = min(max(window, 1), len(profile))
+    
+    totals = np.concatenate(([0.0], np.cumsum(profile)))
+    sums = totals[window:] - totals[:-window]
+    offsets = np.arange(len(sums))
+    center = (len(profile) - window) / 2
+    # 가운데에서 멀어질수록 감점 (CSS 기본 가운데 배치와 크게 어긋나지 않도록)
+    bias = 1 - 0.5 * np.abs(offsets - center) / max(center, 1)
+    start = int(np.argmax(sums * bias)) if sums.max() > 0 else int(round(center))
+    if horizontal:
+        return start, 0, start + window, height
+    return 0, start, width, start + window
+
+def prepare_background_image(data, matte_color=None):
+    """업로드 배경 이미지 바이트 -> 헤더용 이미지 (한 번 디코딩한 배열로 잘라내기·축소·인코딩·명도 계산)
+    
+    반환: {"hash", "data", "mime", "b64", "size", "quality", "brightness", "luminance", "source_bytes"}
+    투명 영역은 matte_color(기본 흰색)로 채우며, 같은 원본은 프로세스 캐시에서 재사용합니다.
+    """
+    import numpy as np
+    
+    source_hash = hashlib.sha256(data).hexdigest()
+    key = (source_hash, BG_IMAGE_FORMAT, BG_IMAGE_MAX_BYTES, matte_color)
+    cache = get_background_image_cache()
+    with cache["lock"]:
+        if key in cache["entries"]:
+            cache["entries"].move_to_end(key)
+            cache["stats"]["hits"] += 1
+            return cache["entries"][key]
+    
+    started = time.perf_counter()
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    if image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info):
+        matte = parse_svg_color(matte_color) if matte_color else None
+        rgba = image.convert("RGBA")
+        canvas = Image.new("RGB", image.size, matte[0] if matte else (255, 255, 255))
+        canvas.paste(rgba, mask=rgba.getchannel("A"))
+        image = canvas
+    image = image.convert("RGB")
+    
+    # 축소본으로 잘라낼 영역을 정하고 원본 좌표로 환산
+    preview = image.copy()
+    preview.thumbnail((256, 256))
+    preview_luminance = np.asarray(preview, dtype=float) @ np.array([0.299, 0.587, 0.114])
+    x0, y0, x1, y1 = _smart_crop_box(preview_luminance, HERO_SIZE[0] / HERO_SIZE[1])
+    ratio_x, ratio_y = image.width / preview.width, image.height / preview.height
+    box = (x0 * ratio_x, y0 * ratio_y, x1 * ratio_x, y1 * ratio_y)
+    
+    # 원본이 작으면 확대하지 않음
+    target_width = max(min(HERO_SIZE[0] * BG_IMAGE_SCALE, int(box[2] - box[0])), 1)
+    target_size = (target_width, max(int(round(target_width * HERO_SIZE[1] / HERO_SIZE[0])), 1))
+    hero = image.resize(target_size, Image.Resampling.LANCZOS, box=box)
+    
+    pixels = np.asarray(hero, dtype=np.float32)
+    luminance = pixels @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    luminance_map = np.asarray(Image.fromarray(luminance, "F").resize(HERO_LUMINANCE_SIZE, Image.Resampling.BOX), dtype=float)
+    luminance_map.setflags(write=False)
+    
+    image_format, mime = ("WEBP", "image/webp") if BG_IMAGE_FORMAT == "webp" else ("JPEG", "image/jpeg")
+    encoded, quality, candidate = None, None, hero
+    for scale in (1.0, 0.75, 0.5):
+        if scale < 1.0:
+            candidate = hero.resize((max(int(hero.width * scale), 1), max(int(hero.height * scale), 1)),
+                                    Image.Resampling.LANCZOS)
+        for quality in BG_IMAGE_QUALITIES:
+            output = io.BytesIO()
+            if image_format == "JPEG":
+                candidate.save(output, format="JPEG", quality=quality, optimize=True, progressive=True)
+            else:
+                candidate.save(output, format="WEBP", quality=quality, method=4)
+            encoded = output.getvalue()
+            if len(encoded) <= BG_IMAGE_MAX_BYTES:
+                break
+        if len(encoded) <= BG_IMAGE_MAX_BYTES:
+            break
+    
+    result = {"hash": source_hash, "data": encoded, "mime": mime, "b64": base64.b64encode(encoded).decode(),
+              "size": candidate.size, "quality": quality, "brightness": float(luminance.mean()),
+              "luminance": luminance_map, "source_bytes": len(data)}
+    prepare_ms = (time.perf_counter() - started) * 1000
+    print(f"🖼️ 배경 이미지 준비: {len(data) / 1024:.0f}KB -> {len(encoded) / 1024:.0f}KB "
+          f"({candidate.width}x{candidate.height} {image_format} q{quality}, {prepare_ms:.0f}ms)")
+    
+    with cache["lock"]:
+        cache["stats"]["misses"] += 1
+        cache["stats"]["source_bytes"] += len(data)
+        cache["stats"]["output_bytes"] += len(encoded)
+        cache["stats"]["prepare_ms"] += prepare_ms
+        _lru_put(cache["entries"], key, result, limit=BG_IMAGE_CACHE_SIZE)
+    return result
+
+# 업로드 배경 원본 저장소 (SHA-256 이름으로 중복 없이 저장, 세션 참조 중인 파일은 보존, 크기·기간 기준 정리)
+BG_STORE_DIR = os.getenv("EDM_BG_STORE_DIR", os.path.join(CACHE_DIR, "backgrounds"))
+BG_STORE_MAX_BYTES = int(os.getenv("EDM_BG_STORE_MAX_BYTES", str(200 * 1024 * 1024)))
+BG_STORE_MAX_AGE = float(os.getenv("EDM_BG_STORE_MAX_AGE", str(7 * 86400)))
+BG_STORE_GC_INTERVAL = 60  # 정리 최소 간격(초)
+
+@st.cache_resource(show_spinner=False)
+def get_background_store():
+    """배경 해시 -> {세션 id: 마지막 사용 시각} 참조와 저장/정리 통계 (프로세스 공용)
+    
+    잠금은 참조 표와 통계만 보호하고 파일 입출력은 잠금 밖에서 수행합니다.
+    "deleting"은 정리 작업이 지우는 중인 파일 이름 (같은 배경을 등록하려는 세션은 삭제가 끝날 때까지 대기)
+    """
+    lock = threading.Lock()
+    return {"lock": lock, "changed": threading.Condition(lock), "refs": {}, "deleting": set(), "last_gc": 0.0,
+            "stats": {"writes": 0, "dedup_hits": 0, "gc_runs": 0, "gc_removed": 0, "gc_freed_bytes": 0,
+                      "expired_refs": 0}}
+
+def get_background_store_stats():
+    store = get_background_store()
+    with store["lock"]:
+        stats = dict(store["stats"])
+        stats["referenced"] = len(store["refs"])
+    files, total = 0, 0
+    if os.path.isdir(BG_STORE_DIR):
+        for entry in os.scandir(BG_STORE_DIR):
+            if entry.is_file():
+                files += 1
+                total += entry.stat().st_size
+    stats["files"], stats["bytes"] = files, total
+    return stats
+
+def _current_session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "default"
+
+def _is_session_active(session_id):
+    """Streamlit 런타임에 아직 연결된 세션인지 확인 (런타임 밖에서 실행 중이면 항상 True)"""
+    if session_id == "default" or not runtime.exists():
+        return True
+    return runtime.get_instance().is_active_session(session_id)
+
+def touch_background_ref(digest):
+    """현재 세션이 사용하는 배경으로 등록 (세션당 하나, 이전 배경 참조는 해제)"""
+    session_id = _current_session_id()
+    store = get_background_store()
+    with store["changed"]:
+        # 정리 작업이 같은 파일을 지우는 중이면 끝난 뒤 등록 (등록 후에는 정리 대상에서 제외됨)
+        store["changed"].wait_for(lambda: digest not in store["deleting"])
+        for other, sessions in list(store["refs"].items()):
+            if other != digest and sessions.pop(session_id, None) is not None and not sessions:
+                del store["refs"][other]
+        store["refs"].setdefault(digest, {})[session_id] = time.time()
+
+def store_background_asset(data, digest=None):
+    """업로드 원본을 BG_STORE_DIR/<sha256>에 저장하고 현재 세션 참조로 등록, 경로 반환 (저장 실패 시 None)
+    
+    같은 내용은 한 번만 기록하며(수정 시각만 갱신) 임시 파일 작성 후 교체하므로
+    동시에 같은 파일 이름을 올린 세션끼리도 서로 덮어쓰지 않습니다.
+    참조를 먼저 등록하므로 기록하는 동안 정리 작업이 파일을 지우지 않습니다.
+    """
+    digest = digest or hashlib.sha256(data).hexdigest()
+    path = os.path.join(BG_STORE_DIR, digest)
+    store = get_background_store()
+    touch_background_ref(digest)
+    try:
+        os.makedirs(BG_STORE_DIR, exist_ok=True)
+        try:
+            os.utime(path, None)
+            written = False
+        except FileNotFoundError:
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+            written = True
+    except OSError as e:
+        print(f"배경 이미지 저장 오류: {str(e)}")
+        return None
+    with store["lock"]:
+        store["stats"]["writes" if written else "dedup_hits"] += 1
+    collect_background_store()
+    return path
+
+def collect_background_store(force=False):
+    """참조되지 않은 배경 원본 정리 - BG_STORE_MAX_AGE보다 오래된 파일을 지우고,
+    전체 크기가 BG_STORE_MAX_BYTES를 넘으면 오래된 순으로 삭제 (BG_STORE_GC_INTERVAL마다 최대 1회)
+    
+    종료된 세션의 참조는 먼저 해제하므로, 보존되는 파일은 현재 연결된 세션이 쓰는 배경뿐입니다.
+    """
+    store = get_background_store()
+    now = time.time()
+    with store["lock"]:
+        if not force and now - store["last_gc"] < BG_STORE_GC_INTERVAL:
+            return
+        store["last_gc"] = now
+        sessions_by_digest = {digest: list(sessions) for digest, sessions in store["refs"].items()}
+    
+    # 종료된 세션과 마지막 사용 후 BG_STORE_MAX_AGE가 지난 참조는 만료 (세션 확인은 잠금 밖에서)
+    inactive = {session_id for sessions in sessions_by_digest.values() for session_id in sessions
+                if not _is_session_active(session_id)}
+    expired = 0
+    with store["lock"]:
+        for digest, sessions in list(store["refs"].items()):
+            for session_id, used_at in list(sessions.items()):
+                if session_id in inactive or now - used_at > BG_STORE_MAX_AGE:
+                    del sessions[session_id]
+                    expired += 1
+            if not sessions:
+                del store["refs"][digest]
+        store["stats"]["expired_refs"] += expired
+    
+    files = []
+    try:
+        for entry in os.scandir(BG_STORE_DIR):
+            if entry.is_file():
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.name, entry.path))
+    except OSError:
+        return
+    total = sum(size for _, size, _, _ in files)
+    
+    removed, freed = 0, 0
+    for mtime, size, name, path in sorted(files):
+        # 기록 중인 임시 파일은 오래된 경우에만 정리
+        if not (now - mtime > BG_STORE_MAX_AGE or (total > BG_STORE_MAX_BYTES and not name.endswith(".tmp"))):
+            continue
+        digest = name.split(".")[0]
+        with store["lock"]:
+            if digest in store["refs"] or digest in store["deleting"]:
+                continue
+            store["deleting"].add(digest)
+        try:
+            os.remove(path)
+            total -= size
+            removed += 1
+            freed += size
+        except OSError:
+            pass
+        finally:
+            with store["changed"]:
+                store["deleting"].discard(digest)
+                store["changed"].notify_all()
+    
+    with store["lock"]:
+        store["stats"]["gc_runs"] += 1
+        store["stats"]["gc_removed"] += removed
+        store["stats"]["gc_freed_bytes"] += freed
+    if removed:
+        print(f"🧹 배경 저장소 정리: {removed}개 삭제 ({freed / 1024:.0f}KB), 남은 용량 {total / 1024:.0f}KB")
+
+def get_hero_background_luminance(theme_color, bg_svg_code=None, bg_image_path=None, bg_image=None):
+    """EDM 헤더 배경 명도 맵 -> {"key": 배경 해시, "map": 헤더 전체를 덮는 (세로, 가로) 배열}, 계산할 수 없으면 None
+    
+    업로드 이미지는 prepare_background_image가 잘라낸 결과의 명도 맵,
+    SVG는 래스터 명도 맵, 배경이 없으면 테마 컬러 135도 그라데이션을 사용합니다.
+    """
+    import numpy as np
+    
+    if bg_image is None and bg_image_path and os.path.exists(bg_image_path):
+        with open(bg_image_path, "rb") as f:
+            bg_image = prepare_background_image(f.read(), theme_color)
+    if bg_image is not None:
+        return {"key": "image:" + bg_image["hash"], "map": bg_image["luminance"]}
+    
+    key = ("svg:" + hashlib.sha256(bg_svg_code.encode("utf-8")).hexdigest()) if bg_svg_code else f"theme:{theme_color}"
+    cache = get_logo_contrast_cache()
+    with cache["lock"]:
+        if key in cache["backgrounds"]:
+            cache["backgrounds"].move_to_end(key)
+            return {"key": key, "map": cache["backgrounds"][key]}
+    
+    if bg_svg_code:
+        luminance_map = rasterize_svg_luminance(bg_svg_code)
+        if luminance_map is None:
+            return None
+    else:
+        color = parse_svg_color(theme_color)
+        if not color:
+            return None
+        # linear-gradient(135deg, theme, theme + "aa") 을 흰 바탕 위에 합성
+        start = color_luminance(color[0])
+        end = start * (0xaa / 255) + 255 * (1 - 0xaa / 255)
+        columns, rows = np.meshgrid(np.linspace(0, 1, HERO_LUMINANCE_SIZE[0]), np.linspace(0, 1, HERO_LUMINANCE_SIZE[1]))
+        t = (columns * HERO_SIZE[0] + rows * HERO_SIZE[1]) / (HERO_SIZE[0] + HERO_SIZE[1])
+        luminance_map = start + (end - start) * t
+    
+    with cache["lock"]:
+        _lru_put(cache["backgrounds"], key, luminance_map)
+    return {"key": key, "map": luminance_map}
+
+def get_logo_box(display_size, position="right"):
+    """헤더 안 로고 표시 영역 (x0, y0, 폭, 높이) - 회사 로고만 있으면 우측, 솔루션 로고가 있으면 좌측"""
+    width, height = display_size
+    x0 = HERO_PADDING if position == "left" else HERO_SIZE[0] - HERO_PADDING - width
+    y0 = HERO_PADDING + (LOGO_SECTION_HEIGHT - height) / 2
+    return x0, y0, width, height
+
+def _relative_luminance(luminance):
+    return (luminance / 255.0) ** 2.2
+
+def score_logo_contrast(background, logo, position="right"):
+    """로고 알파 마스크와 바로 뒤 헤더 영역의 대비 점수 (알파 가중 평균 대비율 1~21), 로고를 읽을 수 없으면 None"""
+    import numpy as np
+    
+    logo_bytes = read_logo_bytes(logo)
+    if not logo_bytes:
+        return None
+    key = (background["key"], hashlib.sha256(logo_bytes).hexdigest(), position)
+    cache = get_logo_contrast_cache()
+    with cache["lock"]:
+        if key in cache["scores"]:
+            cache["scores"].move_to_end(key)
+            cache["stats"]["hits"] += 1
+            return cache["scores"][key]
+    
+    try:
+        image = Image.open(io.BytesIO(logo_bytes)).convert("RGBA")
+    except Exception as e:
+        print(f"로고 이미지 분석 오류: {str(e)}")
+        with cache["lock"]:
+            cache["stats"]["failed"] += 1
+        return None
+    
+    # CSS max-width/max-height와 같이 비율을 유지하며 축소한 표시 크기
+    scale = min(1.0, LOGO_MAX_SIZE[0] / image.width, LOGO_MAX_SIZE[1] / image.height)
+    display_size = (image.width * scale, image.height * scale)
+    x0, y0, width, height = get_logo_box(display_size, position)
+    
+    # 표시 크기 2px당 1샘플로 로고와 배경 영역을 같은 격자에 맞춤
+    sample_w, sample_h = max(int(width / 2), 1), max(int(height / 2), 1)
+    logo_pixels = np.asarray(image.resize((sample_w, sample_h), Image.Resampling.BILINEAR), dtype=float)
+    alpha = logo_pixels[..., 3] / 255.0
+    logo_luminance = logo_pixels[..., :3] @ np.array([0.299, 0.587, 0.114])
+    
+    luminance_map = background["map"]
+    map_h, map_w = luminance_map.shape
+    cols = ((x0 + (np.arange(sample_w) + 0.5) * width / sample_w) / HERO_SIZE[0] * map_w).astype(int).clip(0, map_w - 1)
+    rows = ((y0 + (np.arange(sample_h) + 0.5) * height / sample_h) / HERO_SIZE[1] * map_h).astype(int).clip(0, map_h - 1)
+    behind = luminance_map[np.ix_(rows, cols)]
+    
+    logo_rel, behind_rel = _relative_luminance(logo_luminance), _relative_luminance(behind)
+    contrast = (np.maximum(logo_rel, behind_rel) + 0.05) / (np.minimum(logo_rel, behind_rel) + 0.05)
+    score = float((alpha * contrast).sum() / alpha.sum()) if alpha.sum() > 0 else 1.0
+    
+    with cache["lock"]:
+        cache["stats"]["misses"] += 1
+        _lru_put(cache["scores"], key, score)
+    return score
+
+def select_logo_by_background_analysis(theme_color, bg_svg_code, bg_image_path, company_logo_light, company_logo_dark,
+                                       logo_position="right", bg_image=None):
+    """개선된 배경 분석 기반 로고 선택 - 로고가 놓일 헤더 영역과 각 로고의 대비가 가장 큰 로고 선택
+    
+    로고 이미지를 읽을 수 없으면 로고 영역 평균 명도(140 기준)로, 배경 명도 맵을 만들 수 없으면 전체 평균으로 판단합니다.
+    """
+    try:
+        background = None
+        try:
+            background = get_hero_background_luminance(theme_color, bg_svg_code, bg_image_path, bg_image)
+        except Exception as e:
+            print(f"배경 명도 맵 계산 오류: {str(e)}")
+        
+        if background is not None:
+            candidates = {"어두운 로고 (밝은 배경용)": company_logo_dark, "밝은 로고 (어두운 배경용)": company_logo_light}
+            scores = {}
+            for logo_type, logo in candidates.items():
+                if logo:
+                    score = score_logo_contrast(background, logo, logo_position)
+                    if score is not None:
+                        scores[logo_type] = score
+            if scores:
+                logo_type = max(scores, key=scores.get)
+                print(f"✅ 선택된 로고: {logo_type} (로고 영역 대비: "
+                      + ", ".join(f"{name} {score:.2f}" for name, score in scores.items()) + ")")
+                return candidates[logo_type]
+            
+            # 로고 이미지를 불러오지 못한 경우 기본 크기 로고 영역의 평균 명도 사용
+            x0, y0, width, height = get_logo_box(LOGO_MAX_SIZE, logo_position)
+            map_h, map_w = background["map"].shape
+            region = background["map"][int(y0 / HERO_SIZE[1] * map_h):max(int((y0 + height) / HERO_SIZE[1] * map_h), int(y0 / HERO_SIZE[1] * map_h) + 1),
+                                       int(x0 / HERO_SIZE[0] * map_w):max(int((x0 + width) / HERO_SIZE[0] * map_w), int(x0 / HERO_SIZE[0] * map_w) + 1)]
+            background_brightness = float(region.mean())
+            print(f"🎯 로고 영역 명도: {background_brightness:.1f} (전체 평균 {background['map'].mean():.1f})")
         
         # 1. 업로드된 이미지가 있는 경우
-        if bg_image_path and os.path.exists(bg_image_path):
+        elif bg_image is not None:
+            background_brightness = bg_image["brightness"]
+            print(f"📸 업로드 이미지 명도: {background_brightness:.1f}")
+        elif bg_image_path and os.path.exists(bg_image_path):
             background_brightness = analyze_image_brightness(bg_image_path)
             print(f"📸 업로드 이미지 명도: {background_brightness:.1f}")
             
@@ -944,6 +3355,7 @@ def select_logo_by_background_analysis(theme_color, bg_svg_code, bg_image_path,
             
         # 3. 기본 테마 컬러 사용
         else:
+            background_brightness = 128  # 기본값
             hex_color = theme_color.lstrip('#')
             if len(hex_color) == 6:
                 r, g, b = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
@@ -988,33 +3400,81 @@ def select_logo_by_brightness(theme_color, light_logo, dark_logo):
     except Exception:
         return light_logo if light_logo else dark_logo
 
+# 이미지 파생본(축소·재인코딩한 base64) 캐시
+IMAGE_MAX_SIZE = (800, 600)
+IMAGE_JPEG_QUALITY = 85
+IMAGE_CACHE_MAX_ENTRIES = int(os.getenv("EDM_IMAGE_CACHE_MAX_ENTRIES", "128"))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("EDM_IMAGE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+@st.cache_resource(show_spinner=False)
+def get_image_derivative_cache():
+    """(원본 해시, 최대 크기, 형식, 품질) -> {"b64", "encode_ms"} (프로세스 공용, LRU)"""
+    return {"lock": threading.Lock(), "entries": OrderedDict(), "bytes": 0,
+            "stats": {"hits": 0, "misses": 0, "evictions": 0, "encode_ms": 0.0, "saved_ms": 0.0}}
+
+def get_image_derivative_stats():
+    cache = get_image_derivative_cache()
+    with cache["lock"]:
+        stats = dict(cache["stats"])
+        stats["entries"] = len(cache["entries"])
+        stats["bytes"] = cache["bytes"]
+    return stats
+
+def encode_image_base64(data, max_size=IMAGE_MAX_SIZE, quality=IMAGE_JPEG_QUALITY):
+    """이미지 바이트를 최대 크기로 축소해 base64로 변환 (투명 이미지는 PNG, 그 외 JPEG)
+    
+    같은 원본·크기·형식·품질의 결과는 캐시에서 바로 반환하며, 캐시 적중 시 절약한 인코딩 시간을 집계합니다.
+    """
+    image = Image.open(io.BytesIO(data))
+    image_format = "PNG" if image.mode in ('RGBA', 'LA') else "JPEG"
+    key = (hashlib.sha256(data).hexdigest(), tuple(max_size), image_format, quality)
+    
+    cache = get_image_derivative_cache()
+    with cache["lock"]:
+        entry = cache["entries"].get(key)
+        if entry:
+            cache["entries"].move_to_end(key)
+            cache["stats"]["hits"] += 1
+            cache["stats"]["saved_ms"] += entry["encode_ms"]
+            return entry["b64"]
+    
+    started = time.perf_counter()
+    if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
+        image.thumbnail(max_size, Image.Resampling.LANCZOS)
+    
+    output = io.BytesIO()
+    if image_format == "PNG":
+        image.save(output, format='PNG', optimize=True)
+    else:
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.save(output, format='JPEG', quality=quality, optimize=True)
+    encoded = base64.b64encode(output.getvalue()).decode()
+    encode_ms = (time.perf_counter() - started) * 1000
+    
+    with cache["lock"]:
+        cache["stats"]["misses"] += 1
+        cache["stats"]["encode_ms"] += encode_ms
+        if key not in cache["entries"]:
+            cache["entries"][key] = {"b64": encoded, "encode_ms": encode_ms}
+            cache["bytes"] += len(encoded)
+        while cache["entries"] and (len(cache["entries"]) > IMAGE_CACHE_MAX_ENTRIES
+                                    or cache["bytes"] > IMAGE_CACHE_MAX_BYTES):
+            _, evicted = cache["entries"].popitem(last=False)
+            cache["bytes"] -= len(evicted["b64"])
+            cache["stats"]["evictions"] += 1
+    return encoded
+
 def load_image_from_url(url):
-    """URL에서 이미지를 다운로드하고 base64로 변환"""
+    """URL 이미지를 base64로 변환 (로고 자산 캐시 사용)"""
     if not url:
         return ""
     
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        
-        image = Image.open(io.BytesIO(response.content))
-        
-        max_size = (800, 600)
-        if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
-            image.thumbnail(max_size, Image.Resampling.LANCZOS)
-        
-        if image.mode in ('RGBA', 'LA'):
-            output = io.BytesIO()
-            image.save(output, format='PNG', optimize=True)
-            output.seek(0)
-            return base64.b64encode(output.getvalue()).decode()
-        else:
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            output = io.BytesIO()
-            image.save(output, format='JPEG', quality=85, optimize=True)
-            output.seek(0)
-            return base64.b64encode(output.getvalue()).decode()
+        data = resolve_logo_bytes(url)
+        if data is None:
+            return ""
+        return encode_image_base64(data)
             
     except Exception as e:
         print(f"URL 이미지 로드 오류: {str(e)}")
@@ -1032,24 +3492,7 @@ def load_image_base64(file_obj_or_url):
     # 파일 객체인 경우
     try:
         file_obj_or_url.seek(0)
-        image = Image.open(file_obj_or_url)
-        
-        max_size = (800, 600)
-        if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
-            image.thumbnail(max_size, Image.Resampling.LANCZOS)
-        
-        if image.mode in ('RGBA', 'LA'):
-            output = io.BytesIO()
-            image.save(output, format='PNG', optimize=True)
-            output.seek(0)
-            return base64.b64encode(output.getvalue()).decode()
-        else:
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            output = io.BytesIO()
-            image.save(output, format='JPEG', quality=85, optimize=True)
-            output.seek(0)
-            return base64.b64encode(output.getvalue()).decode()
+        return encode_image_base64(file_obj_or_url.read())
             
     except Exception as e:
         print(f"이미지 처리 오류: {str(e)}")
@@ -1059,351 +3502,523 @@ def load_image_base64(file_obj_or_url):
         except:
             return ""
 
-def generate_enhanced_banner_svg(tone, color1, color2, bg_elements):
-    """AI 학습 개선된 배너 SVG 생성 (배경 효과별 전문 프롬프트)"""
-    
-    # 배경 효과별 전문 프롬프트 템플릿
-    effect_templates = {
-        "gradient": {
-            "description": "smooth linear and radial gradients with subtle color transitions",
-            "technical_specs": """
-            - Use linearGradient and radialGradient elements
-            - Apply multiple color stops with opacity variations
-            - Create depth with overlapping gradients
-            - Use transform attributes for dynamic angles
-            """,
-            "example_code": f"""
-            <defs>
-                <linearGradient id="grad1" x1="0%" y1="0%" x2="100%" y2="100%">
-                    <stop offset="0%" style="stop-color:{color1};stop-opacity:1" />
-                    <stop offset="50%" style="stop-color:{color1};stop-opacity:0.8" />
-                    <stop offset="100%" style="stop-color:{color2};stop-opacity:1" />
-                </linearGradient>
-                <radialGradient id="grad2" cx="30%" cy="30%">
-                    <stop offset="0%" style="stop-color:{color1};stop-opacity:0.3" />
-                    <stop offset="100%" style="stop-color:{color2};stop-opacity:0.1" />
-                </radialGradient>
-            </defs>
-            """
-        },
-        "sparkles": {
-            "description": "small sparkling star-like elements scattered across the background",
-            "technical_specs": """
-            - Use <circle> and <polygon> elements for sparkle shapes
-            - Apply random positioning with transform translate
-            - Use opacity and scale animations if needed
-            - Size range: 2-8px for sparkles
-            - Density: 15-25 sparkles total
-            """,
-            "example_code": f"""
-            <circle cx="50" cy="30" r="2" fill="{color1}" opacity="0.8"/>
-            <polygon points="100,20 102,26 108,26 103,30 105,36 100,32 95,36 97,30 92,26 98,26" 
-                     fill="{color2}" opacity="0.6" transform="scale(0.5)"/>
-            """
-        },
-        "bokeh": {
-            "description": "soft, blurred circular light effects with varying sizes and opacity",
-            "technical_specs": """
-            - Use <circle> elements with blur filters
-            - Apply Gaussian blur filter (stdDeviation: 3-8)
-            - Varying circle sizes: 20-80px radius
-            - Opacity range: 0.1-0.4
-            - Overlapping circles for depth effect
-            """,
-            "example_code": f"""
-            <defs>
-                <filter id="blur1">
-                    <feGaussianBlur stdDeviation="5"/>
-                </filter>
-            </defs>
-            <circle cx="150" cy="50" r="40" fill="{color1}" opacity="0.3" filter="url(#blur1)"/>
-            <circle cx="300" cy="120" r="25" fill="{color2}" opacity="0.2" filter="url(#blur1)"/>
-            """
-        },
-        "lines": {
-            "description": "flowing curved lines and smooth wave patterns",
-            "technical_specs": """
-            - Use <path> elements with smooth curves (cubic bezier)
-            - Apply stroke-width: 2-4px
-            - Use stroke-linecap: round
-            - Create flowing S-curves and wave patterns
-            - Vary opacity: 0.2-0.6
-            """,
-            "example_code": f"""
-            <path d="M0,100 Q175,50 350,100 T700,100" 
-                  stroke="{color1}" stroke-width="3" fill="none" opacity="0.4" stroke-linecap="round"/>
-            <path d="M0,150 Q200,80 400,150 T700,120" 
-                  stroke="{color2}" stroke-width="2" fill="none" opacity="0.3" stroke-linecap="round"/>
-            """
-        },
-        "abstract": {
-            "description": "geometric shapes with subtle glow effects and modern composition",
-            "technical_specs": """
-            - Use <rect>, <circle>, <polygon> with rounded corners
-            - Apply subtle drop-shadow filters
-            - Use transform: rotate() for dynamic angles
-            - Opacity: 0.1-0.3 for subtlety
-            - Geometric harmony with golden ratio proportions
-            """,
-            "example_code": f"""
-            <defs>
-                <filter id="glow">
-                    <feGaussianBlur stdDeviation="3"/>
-                    <feColorMatrix values="1 0 0 0 0  0 1 0 0 0  0 0 1 0 0  0 0 0 1 0"/>
-                </filter>
-            </defs>
-            <rect x="500" y="20" width="120" height="80" rx="10" 
-                  fill="{color1}" opacity="0.2" transform="rotate(15 560 60)" filter="url(#glow)"/>
-            """
-        }
-    }
-    
-    # 선택된 배경 효과 분석
-    selected_effects = []
-    for element in bg_elements:
-        if "gradient" in element.lower():
-            selected_effects.append("gradient")
-        elif "sparkles" in element.lower():
-            selected_effects.append("sparkles")
-        elif "bokeh" in element.lower():
-            selected_effects.append("bokeh")
-        elif "lines" in element.lower():
-            selected_effects.append("lines")
-        elif "abstract" in element.lower():
-            selected_effects.append("abstract")
-    
-    # 기본값 설정
-    if not selected_effects:
-        selected_effects = ["gradient"]
-    
-    # 선택된 효과들의 상세 설명 조합
-    combined_description = []
-    combined_specs = []
-    combined_examples = []
-    
-    for effect in selected_effects:
-        if effect in effect_templates:
-            template = effect_templates[effect]
-            combined_description.append(template["description"])
-            combined_specs.append(template["technical_specs"])
-            combined_examples.append(template["example_code"])
-    
-    # Few-Shot Learning 프롬프트 구성
-    prompt = f"""You are an expert SVG designer specializing in professional B2B marketing backgrounds. 
-Create a sophisticated banner SVG (700x200px) for business email headers.
+# 배너 SVG 후보 생성 방식
+# "sequential": 실패 시 프롬프트를 보강하여 순차 재시도 (기존 방식, 기본값)
+# "parallel": 시차 헤지 요청 - 후보 k가 SVG_HEDGE_CHARS자 이상 스트리밍되었는데 아직 끝나지 않았거나,
+#             실패했거나, SVG_HEDGE_DELAY초 동안 진행이 없으면 후보 k+1을 동시에 보내
+#             먼저 검증을 통과한 것을 사용, 나머지는 취소 (빠르게 끝나는 정상 경로는 호출 1회,
+#             후보가 계속 실패해도 요청이 겹쳐 진행되므로 지연은 호출 1회 + 후보별 시차 정도)
+# "n": 한 번의 요청에서 n개 선택지를 받아 첫 번째로 통과한 것을 사용 (최악의 경우에도 호출 1회인 유일한 방식, 출력 토큰 n배)
+SVG_CANDIDATE_MODE = os.getenv("EDM_SVG_CANDIDATE_MODE", "sequential").lower()
+SVG_CANDIDATES = max(int(os.getenv("EDM_SVG_CANDIDATES", "3")), 1)
+SVG_HEDGE_DELAY = float(os.getenv("EDM_SVG_HEDGE_DELAY", "20"))
+SVG_HEDGE_CHARS = int(os.getenv("EDM_SVG_HEDGE_CHARS", "800"))
 
-DESIGN BRIEF:
-- Theme: {tone}
-- Primary color: {color1}
-- Secondary color: {color2}
-- Effects requested: {', '.join(selected_effects)}
+def svg_candidate_temperature(index):
+    """후보별 temperature (첫 후보는 기존과 같은 0.3, 이후 후보는 조금씩 다양하게 -> 캐시/합치기 키도 서로 다름)"""
+    return min(0.3 + 0.2 * index, 1.0)
 
-DETAILED REQUIREMENTS:
-{chr(10).join(combined_description)}
+# SVG 최적화 (공백 제거, 좌표 반올림, style -> 속성, 중복 그라데이션/필터 병합, 짧은 id)
+SVG_OPTIMIZE_ENABLED = os.getenv("EDM_SVG_OPTIMIZE_DISABLED", "").lower() not in ("1", "true", "yes")
+SVG_PRECISION = int(os.getenv("EDM_SVG_PRECISION", "1"))  # 좌표 소수점 자릿수
 
-TECHNICAL SPECIFICATIONS:
-{chr(10).join(combined_specs)}
+SVG_NAMESPACE = "http://www.w3.org/2000/svg"
+XLINK_NAMESPACE = "http://www.w3.org/1999/xlink"
+ET.register_namespace("", SVG_NAMESPACE)
+ET.register_namespace("xlink", XLINK_NAMESPACE)
 
-REFERENCE EXAMPLES:
-{chr(10).join(combined_examples)}
+# style="..."에서 같은 이름의 속성으로 옮길 수 있는 표현 속성
+SVG_PRESENTATION_ATTRIBUTES = {
+    "fill", "fill-opacity", "fill-rule", "stroke", "stroke-width", "stroke-opacity", "stroke-linecap",
+    "stroke-linejoin", "stroke-dasharray", "stroke-dashoffset", "opacity", "stop-color", "stop-opacity",
+    "filter", "clip-path", "mask", "mix-blend-mode"
+}
+# 숫자를 반올림할 속성 (불투명도/오프셋은 0~1 값이므로 최소 소수점 2자리 유지)
+SVG_NUMERIC_ATTRIBUTES = {
+    "x", "y", "x1", "y1", "x2", "y2", "cx", "cy", "r", "rx", "ry", "fx", "fy", "dx", "dy", "width", "height",
+    "d", "points", "transform", "gradientTransform", "viewBox", "stdDeviation", "stroke-width"
+}
+SVG_FRACTION_ATTRIBUTES = {"opacity", "fill-opacity", "stroke-opacity", "stop-opacity", "offset"}
+# 내용이 같으면 하나로 합칠 수 있는 정의 요소
+SVG_DEDUPE_TAGS = {"linearGradient", "radialGradient", "filter", "pattern", "clipPath", "mask"}
+SVG_DROP_TAGS = {"title", "desc", "metadata"}
 
-CRITICAL RULES:
-1. NO TEXT ELEMENTS - Pure visual design only
-2. Professional B2B aesthetic - avoid childish or overly decorative elements
-3. Maintain visual hierarchy - background should not overpower content
-4. Use provided colors as primary palette
-5. Ensure scalability and clean rendering
-6. Output complete, valid SVG code only
+SVG_NUMBER_PATTERN = re.compile(r"-?\d*\.\d+(?:[eE][-+]?\d+)?")
+SVG_URL_REF_PATTERN = re.compile(r"url\(\s*['\"]?#([^)'\"\s]+)['\"]?\s*\)")
+SVG_HREF_ATTRIBUTES = ("href", f"{{{XLINK_NAMESPACE}}}href")
 
-QUALITY STANDARDS:
-- Clean, semantic SVG structure
-- Optimized for email rendering
-- Cross-browser compatibility
-- Elegant and minimalist approach
+@st.cache_resource(show_spinner=False)
+def get_svg_optimizer_state():
+    """프로세스 전체 SVG 최적화 통계 (처리 수, 입력/출력 바이트)"""
+    return {"lock": threading.Lock(), "stats": {"optimized": 0, "failed": 0, "bytes_in": 0, "bytes_out": 0}}
 
-Generate the complete SVG code now:"""
+def get_svg_optimizer_stats():
+    state = get_svg_optimizer_state()
+    with state["lock"]:
+        stats = dict(state["stats"])
+    stats["saved_ratio"] = 1 - stats["bytes_out"] / stats["bytes_in"] if stats["bytes_in"] else 0.0
+    return stats
+
+def _format_svg_number(value, precision):
+    text = f"{round(value, precision):.{precision}f}".rstrip("0").rstrip(".") if precision > 0 else str(int(round(value)))
+    if text.startswith("0."):
+        text = text[1:]
+    elif text.startswith("-0."):
+        text = "-" + text[2:]
+    return "0" if text in ("", "-0", "-") else text
 
+def _svg_local_name(tag):
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+def optimize_svg(svg_content, precision=None, id_prefix="s"):
+    """배경 SVG 크기 줄이기 - 공백/주석/메타데이터 제거, 좌표 반올림, style을 속성으로 변환,
+    중복 그라데이션·필터 병합, id를 짧게 변경
+    
+    id_prefix: 새 id 접두어 (SVG를 넣을 문서 안에서 겹치지 않도록 호출한 쪽에서 지정).
+    새 id가 기존 id보다 짧을 때만 바꾸며, 파싱할 수 없는 SVG는 태그 사이 공백만 제거합니다.
+    """
+    if not svg_content:
+        return svg_content
+    precision = SVG_PRECISION if precision is None else precision
+    fraction_precision = max(precision, 2)
+    
+    state = get_svg_optimizer_state()
     try:
-        # 최대 3번 시도로 품질 향상
-        max_attempts = 3
-        best_svg = None
+        root = ET.fromstring(svg_content)
+    except ET.ParseError as e:
+        print(f"SVG 최적화 건너뜀 (파싱 오류: {str(e)})")
+        optimized = re.sub(r">\s+<", "><", svg_content.strip())
+        with state["lock"]:
+            state["stats"]["failed"] += 1
+        return optimized
+    
+    parents = {child: parent for parent in root.iter() for child in parent}
+    has_style_sheet = any(_svg_local_name(element.tag) == "style" for element in root.iter())
+    
+    def round_numbers(value, digits):
+        return SVG_NUMBER_PATTERN.sub(lambda m: _format_svg_number(float(m.group()), digits), value)
+    
+    for element in list(root.iter()):
+        name = _svg_local_name(element.tag)
+        if name in SVG_DROP_TAGS and element in parents:
+            parents[element].remove(element)
+            continue
+        
+        # 공백만 있는 텍스트 제거 (<style> 내용은 공백 축약)
+        if element.text is not None:
+            element.text = re.sub(r"\s+", " ", element.text).strip() if name == "style" else (element.text.strip() or None)
+        element.tail = None
+        
+        # style="a:b;c:d" -> 표현 속성
+        style = element.attrib.pop("style", None)
+        if style:
+            remaining = []
+            for declaration in style.split(";"):
+                if ":" not in declaration:
+                    continue
+                prop, value = (part.strip() for part in declaration.split(":", 1))
+                if prop in SVG_PRESENTATION_ATTRIBUTES and "!important" not in value:
+                    element.set(prop, value)
+                elif prop:
+                    remaining.append(f"{prop}:{value}")
+            if remaining:
+                element.set("style", ";".join(remaining))
+        
+        for attr, value in list(element.attrib.items()):
+            if attr in SVG_FRACTION_ATTRIBUTES and not value.endswith("%"):
+                element.set(attr, round_numbers(value, fraction_precision))
+            elif attr in SVG_NUMERIC_ATTRIBUTES:
+                value = round_numbers(value, precision)
+                if attr in ("d", "points"):
+                    value = re.sub(r"\s*,\s*", ",", re.sub(r"\s+", " ", value)).strip()
+                    value = re.sub(r"\s*([A-Za-z])\s*", r"\1", value)
+                element.set(attr, value)
+    
+    # 내용이 같은 그라데이션/필터는 처음 것만 남기고 참조를 합침
+    renamed = {}
+    signatures = {}
+    for element in list(root.iter()):
+        if _svg_local_name(element.tag) not in SVG_DEDUPE_TAGS or not element.get("id"):
+            continue
+        element_id = element.attrib.pop("id")
+        signature = ET.tostring(element, encoding="unicode")
+        element.set("id", element_id)
+        if signature in signatures and element in parents:
+            renamed[element_id] = signatures[signature]
+            parents[element].remove(element)
+        else:
+            signatures[signature] = element_id
+    
+    # 참조되는 id만 짧은 이름으로 변경, 참조되지 않는 id는 제거 (<style>이 있으면 선택자 보호를 위해 유지)
+    referenced = []
+    for element in root.iter():
+        for attr, value in element.attrib.items():
+            found = SVG_URL_REF_PATTERN.findall(value)
+            if attr in SVG_HREF_ATTRIBUTES and value.startswith("#"):
+                found.append(value[1:])
+            for ref in found:
+                ref = renamed.get(ref, ref)
+                if ref not in referenced:
+                    referenced.append(ref)
+    short_ids = {ref: ref for ref in referenced}
+    if not has_style_sheet:
+        taken = set(referenced)
+        index = 0
+        for ref in referenced:
+            while f"{id_prefix}{index:x}" in taken:
+                index += 1
+            short_id = f"{id_prefix}{index:x}"
+            if len(short_id) < len(ref):
+                short_ids[ref] = short_id
+                taken.add(short_id)
+                index += 1
+    
+    def resolve(ref):
+        ref = renamed.get(ref, ref)
+        return short_ids.get(ref, ref)
+    
+    # 아무도 참조하지 않는 그라데이션/필터 정의는 그려지지 않으므로 제거
+    if not has_style_sheet:
+        for element in list(root.iter()):
+            if _svg_local_name(element.tag) in SVG_DEDUPE_TAGS and element.get("id") not in short_ids \
+                    and element in parents:
+                parents[element].remove(element)
+    
+    for element in root.iter():
+        element_id = element.get("id")
+        if element_id is not None and not has_style_sheet:
+            if element_id in short_ids:
+                element.set("id", short_ids[element_id])
+            else:
+                del element.attrib["id"]
+        for attr, value in list(element.attrib.items()):
+            if attr in SVG_HREF_ATTRIBUTES and value.startswith("#"):
+                element.set(attr, "#" + resolve(value[1:]))
+            elif "url(" in value:
+                element.set(attr, SVG_URL_REF_PATTERN.sub(lambda m: f"url(#{resolve(m.group(1))})", value))
+    
+    # 비어 있는 <defs> 제거
+    for element in list(root.iter()):
+        if _svg_local_name(element.tag) == "defs" and len(element) == 0 and element in parents:
+            parents[element].remove(element)
+    
+    optimized = ET.tostring(root, encoding="unicode").replace(" />", "/>")
+    before, after = len(svg_content.encode("utf-8")), len(optimized.encode("utf-8"))
+    with state["lock"]:
+        state["stats"]["optimized"] += 1
+        state["stats"]["bytes_in"] += before
+        state["stats"]["bytes_out"] += after
+    print(f"SVG 최적화: {before:,} -> {after:,} bytes ({(after / before - 1) * 100 if before else 0:+.1f}%)")
+    return optimized
+
+def extract_valid_svg(svg_content, selected_effects):
+    """품질 검증을 통과한 응답에서 텍스트 요소를 제거한 <svg> 코드 반환 (실패 시 None, 최적화는 최종 선택된 SVG에만 적용)"""
+    if not svg_content or not validate_svg_quality(svg_content, selected_effects):
+        return None
+    svg_content = re.sub(r'<text[^>]*>.*?</text>', '', svg_content, flags=re.IGNORECASE | re.DOTALL)
+    svg_content = re.sub(r'your text here', '', svg_content, flags=re.IGNORECASE)
+    svg_match = re.search(r"<svg[\s\S]*?</svg>", svg_content)
+    if not svg_match:
+        return None
+    return svg_match.group()
+
+def generate_svg_sequential(messages, selected_effects):
+    """실패할 때마다 프롬프트를 보강하여 최대 SVG_CANDIDATES번 순차 시도"""
+    prompt = messages[-1]["content"]
+    for attempt in range(SVG_CANDIDATES):
+        response = safe_openai_call(
+            messages=messages[:-1] + [{"role": "user", "content": prompt}],
+            task="svg_generate",
+            temperature=0.3  # 낮은 temperature로 일관성 향상
+        )
         
-        for attempt in range(max_attempts):
-            response = safe_openai_call(
-                messages=[
-                    {"role": "system", "content": "You are a professional SVG designer with expertise in B2B marketing visuals. Focus on creating clean, elegant, and technically sound SVG code."},
-                    {"role": "user", "content": prompt}
-                ],
-                model="gpt-4",
-                max_tokens=1500,
-                temperature=0.3  # 낮은 temperature로 일관성 향상
-            )
+        if response and response.choices:
+            svg_content = response.choices[0].message.content or ""
+            print(f"SVG 생성 시도 {attempt + 1}: 효과={selected_effects}, 길이={len(svg_content)}")
             
-            if response and response.choices:
-                svg_content = response.choices[0].message.content
-                
-                # 생성 로그 기록
-                print(f"SVG 생성 시도 {attempt + 1}: 효과={selected_effects}, 길이={len(svg_content)}")
-                
-                # SVG 품질 검증
-                if validate_svg_quality(svg_content, selected_effects):
-                    # 텍스트 요소 제거
-                    svg_content = re.sub(r'<text[^>]*>.*?</text>', '', svg_content, flags=re.IGNORECASE | re.DOTALL)
-                    svg_content = re.sub(r'your text here', '', svg_content, flags=re.IGNORECASE)
-                    
-                    svg_match = re.search(r"<svg[\s\S]*?</svg>", svg_content)
-                    if svg_match:
-                        best_svg = svg_match.group()
-                        print(f"✅ SVG 품질 검증 통과 (시도 {attempt + 1})")
-                        break  # 품질 검증 통과 시 즉시 반환
-                else:
-                    print(f"❌ SVG 품질 검증 실패 (시도 {attempt + 1})")
-                
-                # 재시도를 위한 프롬프트 개선
-                if attempt < max_attempts - 1:
-                    prompt += f"\n\nPREVIOUS ATTEMPT FAILED QUALITY CHECK. Please focus more on: {', '.join(selected_effects)} effects with higher precision."
-        
-        if best_svg:
-            return best_svg
+            svg = extract_valid_svg(svg_content, selected_effects)
+            if svg:
+                print(f"✅ SVG 품질 검증 통과 (시도 {attempt + 1})")
+                return svg
+            print(f"❌ SVG 품질 검증 실패 (시도 {attempt + 1})")
             
-    except Exception as e:
-        print(f"배너 SVG 생성 오류: {str(e)}")
+            # 재시도를 위한 프롬프트 개선
+            prompt += f"\n\nPREVIOUS ATTEMPT FAILED QUALITY CHECK. Please focus more on: {', '.join(selected_effects)} effects with higher precision."
+    return None
+
+def generate_svg_single_request(messages, selected_effects):
+    """한 번의 요청으로 n개 선택지를 받아 첫 번째로 검증을 통과한 SVG 반환"""
+    response = safe_openai_call(
+        messages=messages,
+        task="svg_generate",
+        temperature=0.7,  # 선택지끼리 서로 다르도록
+        n=SVG_CANDIDATES
+    )
+    if not response or not response.choices:
+        return None
     
-    # 고품질 기본 배너 반환 (효과별 맞춤형)
-    return generate_fallback_svg(color1, color2, selected_effects)
+    for choice in response.choices:
+        svg = extract_valid_svg(choice.message.content, selected_effects)
+        if svg:
+            print(f"✅ SVG 품질 검증 통과 (선택지 {choice.index + 1}/{len(response.choices)})")
+            return svg
+    print(f"❌ SVG 품질 검증 실패 (선택지 {len(response.choices)}개 모두)")
+    return None
 
-def validate_svg_quality(svg_content, expected_effects):
-    """SVG 품질 검증 - 요청된 효과가 제대로 구현되었는지 확인"""
-    if not svg_content or len(svg_content.strip()) < 100:
-        return False
+def generate_svg_parallel(messages, selected_effects):
+    """시차 헤지 요청: 첫 후보를 보내고, 가장 최근 후보가 SVG_HEDGE_CHARS자 넘게 스트리밍되었거나
+    실패했거나 SVG_HEDGE_DELAY초가 지나면 다음 후보를 동시에 추가 (최대 SVG_CANDIDATES개)
     
-    if not re.search(r'<svg[^>]*>', svg_content, re.IGNORECASE):
-        return False
+    검증을 먼저 통과한 SVG를 반환하며, 아직 받는 중인 후보는 다음 스트림 조각에서 닫아 취소합니다.
+    """
+    done = threading.Event()
+    progressed = set()  # 스트림이 SVG_HEDGE_CHARS자를 넘은 후보 번호
     
-    quality_score = 0
-    total_checks = len(expected_effects)
+    def request_candidate(index):
+        def on_delta(partial):
+            if done.is_set():
+                raise LLMRequestCancelled()
+            # 캐시 적중처럼 완성된 응답이 한 번에 오면 헤지하지 않음
+            if len(partial) >= SVG_HEDGE_CHARS and "</svg>" not in partial:
+                progressed.add(index)
+        
+        response = safe_openai_call(
+            messages=messages,
+            task="svg_generate",
+            temperature=svg_candidate_temperature(index),
+            on_delta=on_delta
+        )
+        if done.is_set() or not response or not response.choices:
+            return None
+        return extract_valid_svg(response.choices[0].message.content, selected_effects)
     
-    for effect in expected_effects:
-        if effect == "gradient":
-            if re.search(r'<linearGradient|<radialGradient', svg_content, re.IGNORECASE):
-                quality_score += 1
-        elif effect == "sparkles":
-            if re.search(r'<circle[^>]*r=["\']?[1-8]["\']?|<polygon', svg_content, re.IGNORECASE):
-                quality_score += 1
-        elif effect == "bokeh":
-            if re.search(r'<filter|feGaussianBlur', svg_content, re.IGNORECASE) and re.search(r'<circle', svg_content, re.IGNORECASE):
-                quality_score += 1
-        elif effect == "lines":
-            if re.search(r'<path[^>]*d=', svg_content, re.IGNORECASE):
-                quality_score += 1
-        elif effect == "abstract":
-            if re.search(r'<rect|<polygon|<circle', svg_content, re.IGNORECASE):
-                quality_score += 1
-    
-    if re.search(r'<text[^>]*>', svg_content, re.IGNORECASE):
-        quality_score -= 1
+    ctx = get_script_run_ctx()
+    
+    def attach_context():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+    
+    executor = ThreadPoolExecutor(max_workers=min(SVG_CANDIDATES, LLM_MAX_WORKERS), initializer=attach_context)
+    futures, pending = {}, set()
+    
+    def launch(reason=None):
+        if reason:
+            print(f"⏩ SVG 후보 {len(futures) + 1} 추가 요청 ({reason})")
+        future = executor.submit(request_candidate, len(futures))
+        futures[future] = len(futures)
+        pending.add(future)
+        return time.monotonic()
+    
+    try:
+        launched_at = launch()
+        while pending:
+            finished, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            failed = False
+            for future in finished:
+                pending.discard(future)
+                try:
+                    svg = future.result()
+                except LLMRequestCancelled:
+                    svg = None
+                except Exception as e:
+                    print(f"SVG 후보 {futures[future] + 1} 오류: {str(e)}")
+                    svg = None
+                if svg:
+                    done.set()
+                    print(f"✅ SVG 품질 검증 통과 (후보 {futures[future] + 1}/{len(futures)})")
+                    return svg
+                print(f"❌ SVG 품질 검증 실패 (후보 {futures[future] + 1}/{len(futures)})")
+                failed = True
+            
+            if len(futures) >= SVG_CANDIDATES:
+                continue
+            if failed and not pending:
+                launched_at = launch("이전 후보 실패")
+            elif len(futures) - 1 in progressed:
+                launched_at = launch(f"후보 {len(futures)} 스트리밍 {SVG_HEDGE_CHARS}자 경과")
+            elif time.monotonic() - launched_at >= SVG_HEDGE_DELAY:
+                launched_at = launch(f"응답 지연 {SVG_HEDGE_DELAY:g}초")
+        return None
+    finally:
+        # 남은 후보는 기다리지 않음 (다음 스트림 조각에서 취소되고 결과는 버려짐)
+        done.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+# 배경 SVG 변형 풀: (톤, 색상, 효과 조합)별로 품질 검증을 통과한 AI 생성 SVG를 최대 SVG_POOL_SIZE개 보관
+SVG_POOL_SIZE = int(os.getenv("EDM_SVG_POOL_SIZE", "3"))  # 0이면 풀 비활성화
+SVG_POOL_MAX_KEYS = int(os.getenv("EDM_SVG_POOL_MAX_KEYS", "64"))  # 초과 시 가장 오래 쓰이지 않은 조합부터 제거
+SVG_POOL_MAX_FILLS = int(os.getenv("EDM_SVG_POOL_MAX_FILLS", "2"))  # 프로세스 전체에서 동시에 진행하는 백그라운드 채우기 작업 수 상한
+# 시작 시 변형 풀을 미리 채울 브랜드 메인 컬러 (쉼표 구분, 예: "#354F9B")
+SVG_WARMUP_COLORS = [color.strip() for color in os.getenv("EDM_SVG_WARMUP", "").split(",") if color.strip()]
+
+@st.cache_resource(show_spinner=False)
+def get_svg_variant_pool():
+    """프로세스 전체에서 공유하는 배경 SVG 변형 풀 (LRU 순서 유지)"""
+    return {
+        "lock": threading.Lock(),
+        "pools": OrderedDict(),  # key -> {"variants": [svg, ...], "next_variant": int}
+        "filling": set(),
+        "stats": {"hits": 0, "misses": 0, "generated": 0, "failed": 0, "evictions": 0, "warmed": 0, "skipped_fills": 0}
+    }
+
+def make_svg_pool_key(tone, color1, color2, selected_effects):
+    return (tone, color1.lower(), color2.lower(), tuple(sorted(selected_effects)))
+
+def _svg_pool_entry(pool, key):
+    """조합의 풀 항목 반환 (없으면 생성, pool["lock"]을 잡은 상태에서 호출)
+    
+    변형 0번은 풀 미스 시 요청 스레드가 직접 생성하므로 백그라운드 채우기는 1번부터 시작
+    """
+    entry = pool["pools"].get(key)
+    if entry is None:
+        entry = pool["pools"][key] = {"variants": [], "next_variant": 1}
+    return entry
+
+def svg_pool_take(key, seed=None):
+    """풀에 변형이 있으면 하나를 골라 반환 (seed가 같으면 같은 변형), 없으면 None"""
+    pool = get_svg_variant_pool()
+    with pool["lock"]:
+        entry = pool["pools"].get(key)
+        if not entry or not entry["variants"]:
+            pool["stats"]["misses"] += 1
+            return None
+        pool["pools"].move_to_end(key)
+        pool["stats"]["hits"] += 1
+        rng = random.Random(seed) if seed is not None else random
+        return rng.choice(entry["variants"])
+
+def svg_pool_add(key, svg):
+    """검증된 SVG를 풀에 추가 (중복 제외, 조합 수가 상한을 넘으면 LRU 제거)"""
+    pool = get_svg_variant_pool()
+    with pool["lock"]:
+        entry = _svg_pool_entry(pool, key)
+        pool["pools"].move_to_end(key)
+        if svg not in entry["variants"] and len(entry["variants"]) < SVG_POOL_SIZE:
+            entry["variants"].append(svg)
+        while len(pool["pools"]) > SVG_POOL_MAX_KEYS:
+            pool["pools"].popitem(last=False)
+            pool["stats"]["evictions"] += 1
+
+def fill_svg_pool(key, tone, color1, color2, selected_effects):
+    """풀이 SVG_POOL_SIZE개가 될 때까지 변형 번호를 바꿔 AI 생성 - 작업을 시작했으면 True
+    
+    조합당 동시에 하나의 작업만 수행하고, 프로세스 전체의 동시 작업 수는 SVG_POOL_MAX_FILLS개로 제한
+    (상한에 걸린 조합은 다음 풀 미스 때 다시 예약됨)
+    """
+    pool = get_svg_variant_pool()
+    with pool["lock"]:
+        if key in pool["filling"]:
+            return False
+        if len(pool["filling"]) >= SVG_POOL_MAX_FILLS:
+            pool["stats"]["skipped_fills"] += 1
+            return False
+        pool["filling"].add(key)
+    try:
+        for _ in range(SVG_POOL_SIZE * 2):  # 검증 실패가 반복되어도 호출 수는 제한
+            with pool["lock"]:
+                entry = _svg_pool_entry(pool, key)
+                if len(entry["variants"]) >= SVG_POOL_SIZE:
+                    break
+                variant = entry["next_variant"]
+                entry["next_variant"] += 1
+            # 백그라운드 작업이므로 지연 시간보다 호출 수를 줄이는 순차 방식 사용
+            svg = generate_llm_banner_svg(tone, color1, color2, selected_effects, variant=variant, mode="sequential",
+                                          id_prefix=f"v{variant:x}")
+            with pool["lock"]:
+                pool["stats"]["generated" if svg else "failed"] += 1
+            if svg:
+                svg_pool_add(key, svg)
+    finally:
+        with pool["lock"]:
+            pool["filling"].discard(key)
+    return True
+
+def schedule_svg_pool_fill(key, tone, color1, color2, selected_effects):
+    """풀이 덜 찼으면 백그라운드 스레드에서 나머지 변형 생성 (현재 요청은 기다리지 않음)"""
+    if SVG_POOL_SIZE <= 0:
+        return
+    pool = get_svg_variant_pool()
+    with pool["lock"]:
+        entry = pool["pools"].get(key)
+        if key in pool["filling"] or (entry and len(entry["variants"]) >= SVG_POOL_SIZE):
+            return
+        if len(pool["filling"]) >= SVG_POOL_MAX_FILLS:
+            pool["stats"]["skipped_fills"] += 1
+            return
+    threading.Thread(target=fill_svg_pool, args=(key, tone, color1, color2, selected_effects), daemon=True).start()
+
+def get_svg_pool_stats():
+    """변형 풀 적중/미스, 생성/실패, 제거 횟수와 보관 중인 조합/변형 수 반환"""
+    pool = get_svg_variant_pool()
+    with pool["lock"]:
+        stats = dict(pool["stats"])
+        stats["keys"] = len(pool["pools"])
+        stats["variants"] = sum(len(entry["variants"]) for entry in pool["pools"].values())
+        stats["filling"] = len(pool["filling"])
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+@st.cache_resource(show_spinner=False)
+def start_svg_warmup(colors):
+    """표준 브랜드 컬러 x 기본 효과 조합의 변형 풀을 백그라운드에서 미리 채움 (프로세스당 1회)"""
+    def warm():
+        for color in colors:
+            for effects in ([], ["sparkles"], ["bokeh"], ["lines"], ["abstract"]):
+                bg_elements = [BG_EFFECT_LABELS[effect] for effect in effects]
+                tone = get_bg_tone(bg_elements)
+                color1, color2 = color, f"{color}aa"
+                selected_effects = parse_bg_effects(bg_elements)
+                try:
+                    if fill_svg_pool(make_svg_pool_key(tone, color1, color2, selected_effects),
+                                     tone, color1, color2, selected_effects):
+                        pool = get_svg_variant_pool()
+                        with pool["lock"]:
+                            pool["stats"]["warmed"] += 1
+                except Exception as e:
+                    print(f"배경 SVG 미리 생성 오류: {str(e)}")
+        print(f"배경 SVG 변형 풀 준비 완료: {get_svg_pool_stats()}")
     
-    return (quality_score / max(total_checks, 1)) >= 0.7
+    thread = threading.Thread(target=warm, name="svg-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def get_bg_tone(bg_elements):
+    """배경 효과에 따른 배너 톤 결정"""
+    if bg_elements:
+        if "sparkles" in str(bg_elements) or "bokeh-style dots" in str(bg_elements):
+            return "bright and fresh"
+        elif "soft lines" in str(bg_elements) or "abstract glowing shapes" in str(bg_elements):
+            return "tech-inspired"
+    return "clean and professional"
 
-def generate_fallback_svg(color1, color2, selected_effects):
-    """고품질 기본 SVG 생성 - 효과별 맞춤형"""
+@track_stage("generate_enhanced_banner_svg")
+def generate_enhanced_banner_svg(tone, color1, color2, bg_elements, seed=None):
+    """배너 SVG 반환 - 같은 톤/색상/효과 조합의 변형 풀에 있으면 즉시 제공, 없으면 AI 생성 (실패 시 절차적 생성)"""
+    selected_effects = parse_bg_effects(bg_elements)
+    svg = None
+    if SVG_POOL_SIZE > 0:
+        key = make_svg_pool_key(tone, color1, color2, selected_effects)
+        svg = svg_pool_take(key, seed)
+    if svg is None:
+        # 한 화면에 여러 EDM이 있어도 id가 겹치지 않도록 문서의 배경 시드로 접두어 지정
+        id_prefix = f"b{seed % 0xFF:x}" if seed is not None else "b"
+        svg = generate_llm_banner_svg(tone, color1, color2, selected_effects, id_prefix=id_prefix)
+        if svg and SVG_POOL_SIZE > 0:
+            svg_pool_add(key, svg)
+    if SVG_POOL_SIZE > 0:
+        schedule_svg_pool_fill(key, tone, color1, color2, selected_effects)
     
-    # 효과별 맞춤형 기본 SVG 템플릿
-    if "sparkles" in selected_effects:
-        return f"""<svg viewBox="0 0 700 200" xmlns="http://www.w3.org/2000/svg">
-            <defs>
-                <linearGradient id="grad1" x1="0%" y1="0%" x2="100%" y2="100%">
-                    <stop offset="0%" style="stop-color:{color1};stop-opacity:0.8" />
-                    <stop offset="100%" style="stop-color:{color2};stop-opacity:0.6" />
-                </linearGradient>
-            </defs>
-            <rect width="700" height="200" fill="url(#grad1)" />
-            <circle cx="100" cy="40" r="2" fill="white" opacity="0.8"/>
-            <circle cx="200" cy="80" r="1.5" fill="white" opacity="0.6"/>
-            <circle cx="350" cy="30" r="2.5" fill="white" opacity="0.7"/>
-            <circle cx="500" cy="60" r="1" fill="white" opacity="0.9"/>
-            <circle cx="600" cy="45" r="2" fill="white" opacity="0.5"/>
-            <polygon points="150,120 152,126 158,126 153,130 155,136 150,132 145,136 147,130 142,126 148,126" 
-                     fill="white" opacity="0.6" transform="scale(0.8)"/>
-            <polygon points="450,140 452,146 458,146 453,150 455,156 450,152 445,156 447,150 442,146 448,146" 
-                     fill="white" opacity="0.4" transform="scale(0.6)"/>
-        </svg>"""
-    
-    elif "bokeh" in selected_effects:
-        return f"""<svg viewBox="0 0 700 200" xmlns="http://www.w3.org/2000/svg">
-            <defs>
-                <linearGradient id="grad1" x1="0%" y1="0%" x2="100%" y2="0%">
-                    <stop offset="0%" style="stop-color:{color1};stop-opacity:1" />
-                    <stop offset="100%" style="stop-color:{color2};stop-opacity:1" />
-                </linearGradient>
-                <filter id="blur1">
-                    <feGaussianBlur stdDeviation="4"/>
-                </filter>
-                <filter id="blur2">
-                    <feGaussianBlur stdDeviation="6"/>
-                </filter>
-            </defs>
-            <rect width="700" height="200" fill="url(#grad1)" />
-            <circle cx="150" cy="60" r="30" fill="{color1}" opacity="0.3" filter="url(#blur1)"/>
-            <circle cx="400" cy="120" r="40" fill="{color2}" opacity="0.2" filter="url(#blur2)"/>
-            <circle cx="550" cy="50" r="25" fill="{color1}" opacity="0.25" filter="url(#blur1)"/>
-            <circle cx="80" cy="140" r="35" fill="{color2}" opacity="0.15" filter="url(#blur2)"/>
-        </svg>"""
-    
-    elif "lines" in selected_effects:
-        return f"""<svg viewBox="0 0 700 200" xmlns="http://www.w3.org/2000/svg">
-            <defs>
-                <linearGradient id="grad1" x1="0%" y1="0%" x2="100%" y2="0%">
-                    <stop offset="0%" style="stop-color:{color1};stop-opacity:1" />
-                    <stop offset="100%" style="stop-color:{color2};stop-opacity:1" />
-                </linearGradient>
-            </defs>
-            <rect width="700" height="200" fill="url(#grad1)" />
-            <path d="M0,100 Q175,60 350,100 T700,80" 
-                  stroke="white" stroke-width="2" fill="none" opacity="0.4" stroke-linecap="round"/>
-            <path d="M0,140 Q200,100 400,140 T700,120" 
-                  stroke="white" stroke-width="1.5" fill="none" opacity="0.3" stroke-linecap="round"/>
-            <path d="M0,60 Q150,20 300,60 T700,40" 
-                  stroke="white" stroke-width="1" fill="none" opacity="0.5" stroke-linecap="round"/>
-        </svg>"""
-    
-    elif "abstract" in selected_effects:
-        return f"""<svg viewBox="0 0 700 200" xmlns="http://www.w3.org/2000/svg">
-            <defs>
-                <linearGradient id="grad1" x1="0%" y1="0%" x2="100%" y2="100%">
-                    <stop offset="0%" style="stop-color:{color1};stop-opacity:1" />
-                    <stop offset="100%" style="stop-color:{color2};stop-opacity:1" />
-                </linearGradient>
-                <filter id="glow">
-                    <feGaussianBlur stdDeviation="2"/>
-                </filter>
-            </defs>
-            <rect width="700" height="200" fill="url(#grad1)" />
-            <rect x="500" y="30" width="100" height="60" rx="8" 
-                  fill="white" opacity="0.15" transform="rotate(12 550 60)" filter="url(#glow)"/>
-            <circle cx="150" cy="50" r="25" fill="white" opacity="0.1" filter="url(#glow)"/>
-            <polygon points="300,120 350,100 400,120 375,160 325,160" 
-                     fill="white" opacity="0.08" filter="url(#glow)"/>
-        </svg>"""
-    
-    else:  # 기본 그라데이션
-        return f"""<svg viewBox="0 0 700 200" xmlns="http://www.w3.org/2000/svg">
-            <defs>
-                <linearGradient id="grad1" x1="0%" y1="0%" x2="100%" y2="0%">
-                    <stop offset="0%" style="stop-color:{color1};stop-opacity:1" />
-                    <stop offset="50%" style="stop-color:{color1};stop-opacity:0.8" />
-                    <stop offset="100%" style="stop-color:{color2};stop-opacity:1" />
-                </linearGradient>
-                <radialGradient id="grad2" cx="70%" cy="30%">
-                    <stop offset="0%" style="stop-color:{color2};stop-opacity:0.3" />
-                    <stop offset="100%" style="stop-color:{color1};stop-opacity:0.1" />
-                </radialGradient>
-            </defs>
-            <rect width="700" height="200" fill="url(#grad1)" />
-            <rect width="700" height="200" fill="url(#grad2)" />
-        </svg>"""
+    # 고품질 기본 배너 반환 (효과별 맞춤형)
+    return svg or generate_fallback_svg(color1, color2, selected_effects, seed=seed)
 
-    """AI 학습 개선된 배너 SVG 생성 (배경 효과별 전문 프롬프트)"""
+def generate_llm_banner_svg(tone, color1, color2, selected_effects, variant=0, mode=None, id_prefix="s"):
+    """AI 학습 개선된 배너 SVG 생성 (배경 효과별 전문 프롬프트) - 품질 검증을 통과한 SVG 또는 None
+    
+    variant가 0이 아니면 구도를 달리하라는 지시를 추가 (변형별로 응답 캐시 키도 달라짐)
+    mode: 후보 생성 방식 (기본값 SVG_CANDIDATE_MODE)
+    id_prefix: 최적화 시 줄인 id의 접두어 (optimize_svg 참고)
+    """
     
     # 배경 효과별 전문 프롬프트 템플릿
     effect_templates = {
@@ -1501,24 +4116,6 @@ def generate_fallback_svg(color1, color2, selected_effects):
         }
     }
     
-    # 선택된 배경 효과 분석
-    selected_effects = []
-    for element in bg_elements:
-        if "gradient" in element.lower():
-            selected_effects.append("gradient")
-        elif "sparkles" in element.lower():
-            selected_effects.append("sparkles")
-        elif "bokeh" in element.lower():
-            selected_effects.append("bokeh")
-        elif "lines" in element.lower():
-            selected_effects.append("lines")
-        elif "abstract" in element.lower():
-            selected_effects.append("abstract")
-    
-    # 기본값 설정
-    if not selected_effects:
-        selected_effects = ["gradient"]
-    
     # 선택된 효과들의 상세 설명 조합
     combined_description = []
     combined_specs = []
@@ -1565,58 +4162,210 @@ QUALITY STANDARDS:
 - Elegant and minimalist approach
 
 Generate the complete SVG code now:"""
+    if variant:
+        prompt += f"\n\nVARIATION #{variant}: Use a clearly different composition and element placement from other variations."
 
+    messages = [
+        {"role": "system", "content": "You are a professional SVG designer with expertise in B2B marketing visuals. Focus on creating clean, elegant, and technically sound SVG code."},
+        {"role": "user", "content": prompt}
+    ]
+    
     try:
-        # 최대 3번 시도로 품질 향상
-        max_attempts = 3
-        best_svg = None
-        
-        for attempt in range(max_attempts):
-            response = safe_openai_call(
-                messages=[
-                    {"role": "system", "content": "You are a professional SVG designer with expertise in B2B marketing visuals. Focus on creating clean, elegant, and technically sound SVG code."},
-                    {"role": "user", "content": prompt}
-                ],
-                model="gpt-4",
-                max_tokens=1500,
-                temperature=0.3  # 낮은 temperature로 일관성 향상
-            )
-            
-            if response and response.choices:
-                svg_content = response.choices[0].message.content
-                
-                # 생성 로그 기록
-                print(f"SVG 생성 시도 {attempt + 1}: 효과={selected_effects}, 길이={len(svg_content)}")
-                
-                # SVG 품질 검증
-                if validate_svg_quality(svg_content, selected_effects):
-                    # 텍스트 요소 제거
-                    svg_content = re.sub(r'<text[^>]*>.*?</text>', '', svg_content, flags=re.IGNORECASE | re.DOTALL)
-                    svg_content = re.sub(r'your text here', '', svg_content, flags=re.IGNORECASE)
-                    
-                    svg_match = re.search(r"<svg[\s\S]*?</svg>", svg_content)
-                    if svg_match:
-                        best_svg = svg_match.group()
-                        print(f"✅ SVG 품질 검증 통과 (시도 {attempt + 1})")
-                        break  # 품질 검증 통과 시 즉시 반환
-                else:
-                    print(f"❌ SVG 품질 검증 실패 (시도 {attempt + 1})")
-                
-                # 재시도를 위한 프롬프트 개선
-                if attempt < max_attempts - 1:
-                    prompt += f"\n\nPREVIOUS ATTEMPT FAILED QUALITY CHECK. Please focus more on: {', '.join(selected_effects)} effects with higher precision."
+        mode = mode or SVG_CANDIDATE_MODE
+        if mode == "sequential":
+            best_svg = generate_svg_sequential(messages, selected_effects)
+        elif mode == "n":
+            best_svg = generate_svg_single_request(messages, selected_effects)
+        else:
+            best_svg = generate_svg_parallel(messages, selected_effects)
         
-        if best_svg:
-            return best_svg
+        if best_svg and SVG_OPTIMIZE_ENABLED:
+            best_svg = optimize_svg(best_svg, id_prefix=id_prefix)
+        return best_svg
             
     except Exception as e:
         print(f"배너 SVG 생성 오류: {str(e)}")
+        return None
+
+def validate_svg_quality(svg_content, expected_effects, analysis=None):
+    """SVG 품질 검증 - 요청된 효과가 제대로 구현되었는지 확인 (analyze_svg 결과 사용)"""
+    if not svg_content or len(svg_content.strip()) < 100:
+        return False
     
-    # 고품질 기본 배너 반환 (효과별 맞춤형)
-    return generate_fallback_svg(color1, color2, selected_effects)
+    analysis = analysis or analyze_svg(svg_content)
+    if not analysis["valid"]:
+        return False
+    
+    quality_score = sum(1 for effect in expected_effects if analysis["effects"].get(effect))
+    total_checks = len(expected_effects)
+    
+    if analysis["has_text"]:
+        quality_score -= 1
+    
+    return (quality_score / max(total_checks, 1)) >= 0.7
+
+def generate_fallback_svg(color1, color2, selected_effects, seed=None):
+    """고품질 기본 SVG 생성 - 효과별 맞춤형 (LLM 없이 절차적 생성)"""
+    return generate_procedural_svg(color1, color2, selected_effects, seed=seed)
+
+# 배경 SVG 생성 엔진 ("llm": AI 생성 후 실패 시 절차적 생성, "procedural": LLM 호출 없이 즉시 절차적 생성)
+SVG_ENGINE = os.getenv("EDM_SVG_ENGINE", "llm").lower()
+
+# 절차적 배경 생성 기본 파라미터 (효과별 개수는 density, 크기는 size_scale, 흐림은 blur 배율로 조정)
+PROCEDURAL_SVG_PARAMS = {
+    "density": 1.0,
+    "size_scale": 1.0,
+    "blur": 1.0,
+    "curve_count": 3,
+    "sparkle_count": 22,
+    "sparkle_radius": (0.8, 2.6),
+    "bokeh_count": 8,
+    "bokeh_radius": (14, 46),
+    "shape_count": 4
+}
+
+# 효과 키 -> 4단계 배경 효과 선택값
+BG_EFFECT_LABELS = {
+    "gradient": "a soft gradient background",
+    "sparkles": "sparkles",
+    "bokeh": "bokeh-style dots",
+    "lines": "soft lines",
+    "abstract": "abstract glowing shapes"
+}
+
+def parse_bg_effects(bg_elements):
+    """배경 효과 선택값("sparkles", "bokeh-style dots" 등)을 효과 키 목록으로 변환 (없으면 gradient)"""
+    selected_effects = []
+    for element in bg_elements or []:
+        for effect in ("gradient", "sparkles", "bokeh", "lines", "abstract"):
+            if effect in element.lower() and effect not in selected_effects:
+                selected_effects.append(effect)
+                break
+    return selected_effects or ["gradient"]
+
+def generate_procedural_svg(color1, color2, selected_effects, seed=None, width=700, height=200, **params):
+    """시드 기반 절차적 배경 SVG 생성 (같은 색상/효과/시드면 항상 같은 결과, LLM 호출 없음)
+    
+    params로 PROCEDURAL_SVG_PARAMS 항목(density, size_scale, blur, curve_count 등)을 덮어쓸 수 있습니다.
+    """
+    options = {**PROCEDURAL_SVG_PARAMS, **params}
+    if seed is None:
+        seed = int(hashlib.sha1(f"{color1}|{color2}|{','.join(selected_effects)}".encode("utf-8")).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    density, size_scale, blur = options["density"], options["size_scale"], options["blur"]
+    prefix = f"pg{seed % 0xFFFFF:x}"  # 한 페이지에 여러 SVG가 있어도 id가 겹치지 않도록
+    
+    def num(value):
+        return f"{value:.1f}".rstrip("0").rstrip(".")
+    
+    def count(base):
+        return max(int(round(base * density)), 1)
+    
+    def scatter(n, margin=0):
+        """가로로 n칸을 나눠 칸마다 하나씩 흩뿌림 (순수 무작위보다 고르게 분포)"""
+        cell = (width - 2 * margin) / n
+        points = [(margin + cell * (i + rng.random()), rng.uniform(margin, height - margin)) for i in range(n)]
+        rng.shuffle(points)
+        return points
+    
+    # 기본 배경: 각도가 다른 선형 그라데이션 + 빛 번짐(radial)
+    angle = rng.uniform(0, 35)
+    defs = [
+        f'<linearGradient id="{prefix}-base" x1="0%" y1="0%" x2="100%" y2="{num(angle / 45 * 100)}%">'
+        f'<stop offset="0%" stop-color="{color1}"/>'
+        f'<stop offset="{rng.randint(40, 60)}%" stop-color="{color1}" stop-opacity="0.9"/>'
+        f'<stop offset="100%" stop-color="{color2}"/></linearGradient>'
+    ]
+    layers = [f'<rect width="{width}" height="{height}" fill="url(#{prefix}-base)"/>']
+    
+    if "gradient" in selected_effects:
+        for index in range(rng.randint(1, 2)):
+            defs.append(
+                f'<radialGradient id="{prefix}-glow{index}" cx="{rng.randint(15, 85)}%" cy="{rng.randint(10, 60)}%" '
+                f'r="{rng.randint(40, 70)}%"><stop offset="0%" stop-color="#ffffff" stop-opacity="{num(rng.uniform(0.12, 0.25))}"/>'
+                f'<stop offset="100%" stop-color="{color2}" stop-opacity="0"/></radialGradient>'
+            )
+            layers.append(f'<rect width="{width}" height="{height}" fill="url(#{prefix}-glow{index})"/>')
+    
+    if "bokeh" in selected_effects:
+        defs.append(f'<filter id="{prefix}-bokeh" x="-50%" y="-50%" width="200%" height="200%">'
+                    f'<feGaussianBlur stdDeviation="{num(rng.uniform(4, 7) * blur)}"/></filter>')
+        low, high = options["bokeh_radius"]
+        for x, y in scatter(count(options["bokeh_count"])):
+            fill = rng.choice(("#ffffff", "#ffffff", color1, color2))
+            layers.append(f'<circle cx="{num(x)}" cy="{num(y)}" r="{num(rng.uniform(low, high) * size_scale)}" '
+                          f'fill="{fill}" opacity="{num(rng.uniform(0.1, 0.35))}" filter="url(#{prefix}-bokeh)"/>')
+    
+    if "lines" in selected_effects:
+        for _ in range(max(int(options["curve_count"]), 1)):
+            y0, y1 = rng.uniform(0.2, 0.8) * height, rng.uniform(0.2, 0.8) * height
+            c1 = (rng.uniform(0.15, 0.4) * width, rng.uniform(-0.2, 1.2) * height)
+            c2 = (rng.uniform(0.6, 0.85) * width, rng.uniform(-0.2, 1.2) * height)
+            layers.append(f'<path d="M0,{num(y0)} C{num(c1[0])},{num(c1[1])} {num(c2[0])},{num(c2[1])} {width},{num(y1)}" '
+                          f'stroke="#ffffff" stroke-width="{num(rng.uniform(1, 3) * size_scale)}" fill="none" '
+                          f'opacity="{num(rng.uniform(0.2, 0.5))}" stroke-linecap="round"/>')
+    
+    if "abstract" in selected_effects:
+        defs.append(f'<filter id="{prefix}-glow"><feGaussianBlur stdDeviation="{num(2 * blur)}"/></filter>')
+        for x, y in scatter(count(options["shape_count"]), margin=20):
+            size = rng.uniform(40, 110) * size_scale
+            opacity = num(rng.uniform(0.08, 0.2))
+            kind = rng.choice(("rect", "circle", "polygon"))
+            if kind == "rect":
+                layers.append(f'<rect x="{num(x - size / 2)}" y="{num(y - size / 3)}" width="{num(size)}" '
+                              f'height="{num(size * 0.6)}" rx="{num(size * 0.08)}" fill="#ffffff" opacity="{opacity}" '
+                              f'transform="rotate({rng.randint(-25, 25)} {num(x)} {num(y)})" filter="url(#{prefix}-glow)"/>')
+            elif kind == "circle":
+                layers.append(f'<circle cx="{num(x)}" cy="{num(y)}" r="{num(size / 3)}" fill="#ffffff" '
+                              f'opacity="{opacity}" filter="url(#{prefix}-glow)"/>')
+            else:
+                sides = rng.choice((3, 5, 6))
+                rotation = rng.uniform(0, 6.283)
+                points = " ".join(
+                    f"{num(x + size / 2 * math.cos(rotation + 6.283 * i / sides))},"
+                    f"{num(y + size / 2 * math.sin(rotation + 6.283 * i / sides))}"
+                    for i in range(sides)
+                )
+                layers.append(f'<polygon points="{points}" fill="#ffffff" opacity="{opacity}" filter="url(#{prefix}-glow)"/>')
+    
+    if "sparkles" in selected_effects:
+        low, high = options["sparkle_radius"]
+        for x, y in scatter(count(options["sparkle_count"])):
+            radius = rng.uniform(low, high) * size_scale
+            opacity = num(rng.uniform(0.45, 0.95))
+            if rng.random() < 0.25:
+                # 4갈래 별 모양 반짝이
+                arm, waist = radius * 3, radius * 0.7
+                points = (f"{num(x)},{num(y - arm)} {num(x + waist)},{num(y - waist)} {num(x + arm)},{num(y)} "
+                          f"{num(x + waist)},{num(y + waist)} {num(x)},{num(y + arm)} {num(x - waist)},{num(y + waist)} "
+                          f"{num(x - arm)},{num(y)} {num(x - waist)},{num(y - waist)}")
+                layers.append(f'<polygon points="{points}" fill="#ffffff" opacity="{opacity}"/>')
+            else:
+                layers.append(f'<circle cx="{num(x)}" cy="{num(y)}" r="{num(radius)}" fill="#ffffff" opacity="{opacity}"/>')
+    
+    return (f'<svg viewBox="0 0 {width} {height}" xmlns="http://www.w3.org/2000/svg">'
+            f'<defs>{"".join(defs)}</defs>{"".join(layers)}</svg>')
+
+def parse_partial_json_fields(text, fields):
+    """스트리밍 중인 JSON 텍스트에서 지금까지 나온 문자열 필드 값 추출 (끝나지 않은 값도 포함)"""
+    values = {}
+    for field in fields:
+        match = re.search(r'"%s"\s*:\s*"((?:[^"\\]|\\.)*)' % re.escape(field), text)
+        if not match:
+            continue
+        raw = match.group(1).rstrip("\\")
+        try:
+            values[field] = json.loads(f'"{raw}"')
+        except ValueError:
+            values[field] = raw
+    return values
 
-def generate_edm_content(edm_data, material_summary="", structured_pdf_content=None):
-    """EDM 콘텐츠 생성 함수 (구조화된 PDF 내용 활용)"""
+@track_stage("generate_edm_content")
+def generate_edm_content(edm_data, material_summary="", structured_pdf_content=None, on_update=None):
+    """EDM 콘텐츠 생성 함수 (구조화된 PDF 내용 활용)
+    
+    on_update(dict)를 주면 타이틀, 본문 등 필드가 생성되는 대로 부분 결과를 전달합니다 (미리보기 스트리밍).
+    """
     edm_type = edm_data.get('edm_type')
     core = edm_data.get('core')
     target = edm_data.get('target')
@@ -1657,7 +4406,7 @@ def generate_edm_content(edm_data, material_summary="", structured_pdf_content=N
         try:
             response = safe_openai_call(
                 messages=[{"role": "user", "content": title_refine_prompt}],
-                model="gpt-4"
+                task="title_refine"
             )
             if response:
                 refined_title = response.choices[0].message.content.strip().strip('"')
@@ -1667,6 +4416,9 @@ def generate_edm_content(edm_data, material_summary="", structured_pdf_content=N
                 refined_title = optimize_title_length(title_suggestion, 25)
         except:
             refined_title = optimize_title_length(title_suggestion, 25)
+        
+        if on_update:
+            on_update({"title": refined_title})
     
     
     # 메인 콘텐츠 생성
@@ -1706,12 +4458,32 @@ def generate_edm_content(edm_data, material_summary="", structured_pdf_content=N
 다음 형식으로 응답해주세요:
 {{"title": "제목", "highlight": "핵심 메시지", "body": "본문 내용", "closing": "마무리 멘트", "cta": "버튼 텍스트"}}"""
     
+    def stream_fields(partial_text):
+        partial = parse_partial_json_fields(partial_text, ["title", "highlight", "body", "closing", "cta"])
+        if partial:
+            on_update(partial)
+    
     try:
         response = safe_openai_call(
             messages=[{"role": "user", "content": prompt}],
-            model="gpt-4"
+            task="content_main",
+            on_delta=stream_fields if on_update else None
         )
         
+        # 출력 토큰 한도에서 잘린 JSON은 파싱할 수 없으므로 한도를 두 배로 늘려 한 번 재시도
+        if response and response.choices[0].finish_reason == "length":
+            max_tokens = get_model_route("content_main")["max_tokens"] or 2000
+            print(f"⚠️ 메인 콘텐츠 응답이 출력 한도({max_tokens} 토큰)에서 잘려 재시도합니다.")
+            retried = safe_openai_call(
+                messages=[{"role": "user", "content": prompt}],
+                task="content_main",
+                max_tokens=max_tokens * 2,
+                on_delta=stream_fields if on_update else None
+            )
+            response = retried or response
+            if response.choices[0].finish_reason == "length":
+                show_llm_notice("warning", "⚠️ 생성된 문구가 길어 일부가 잘렸을 수 있습니다. 결과를 확인해주세요.")
+        
         if response:
             j = re.search(r"\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}", response.choices[0].message.content, re.DOTALL)
             content = json.loads(j.group()) if j else {}
@@ -1739,6 +4511,194 @@ def generate_edm_content(edm_data, material_summary="", structured_pdf_content=N
             "cta": edm_data.get('cta', '자세히 보기')
         }
 
+# 단일 구조화 호출(enrichment) 모드: "single"이면 소개형 EDM의 문구/기능/기대효과를 한 번의 요청으로 생성
+EDM_ENRICHMENT_MODE = os.getenv("EDM_ENRICHMENT_MODE", "multi")
+
+EDM_ENRICHMENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "highlight": {"type": "string"},
+        "body": {"type": "string"},
+        "closing": {"type": "string"},
+        "cta": {"type": "string"},
+        "features": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "icon_key": {"type": "string", "enum": list(BOOTSTRAP_ICONS.keys())},
+                    "description": {"type": "string"}
+                },
+                "required": ["name", "icon_key", "description"]
+            }
+        },
+        "expected_effects": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["title", "highlight", "body", "closing", "cta", "features", "expected_effects"]
+}
+
+def validate_json_schema(data, schema):
+    """EDM_ENRICHMENT_SCHEMA에서 사용하는 JSON Schema 부분집합(object/array/string/enum/required) 검증"""
+    schema_type = schema.get("type")
+    
+    if schema_type == "object":
+        if not isinstance(data, dict):
+            return False
+        if any(key not in data for key in schema.get("required", [])):
+            return False
+        return all(
+            validate_json_schema(data[key], sub_schema)
+            for key, sub_schema in schema.get("properties", {}).items()
+            if key in data
+        )
+    
+    if schema_type == "array":
+        if not isinstance(data, list):
+            return False
+        item_schema = schema.get("items", {})
+        return all(validate_json_schema(item, item_schema) for item in data)
+    
+    if schema_type == "string":
+        if not isinstance(data, str):
+            return False
+        return "enum" not in schema or data in schema["enum"]
+    
+    return True
+
+def make_enrichment_key(features, expected_effects="", material_summary=""):
+    """enrichment를 만든 입력(기능 목록, 기대효과, 참고자료)의 해시 - 입력이 바뀌면 저장된 결과를 재사용하지 않음"""
+    payload = {
+        "features": [
+            [f['feature_name'].strip(), f.get('icon_keyword', '').strip(), f.get('feature_desc', '').strip()]
+            for f in (features or []) if f and f.get('feature_name', '').strip()
+        ],
+        "expected_effects": (expected_effects or "").strip(),
+        "material_summary": material_summary or ""
+    }
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+@track_stage("generate_edm_enrichment")
+def generate_edm_enrichment(edm_data, material_summary="", structured_pdf_content=None, features=None, expected_effects=""):
+    """소개형 EDM의 문구, 기능별 아이콘/설명, 기대효과를 단일 function-calling 요청으로 생성
+    
+    스키마 검증에 실패하면 None을 반환하며, 호출 측은 기존 필드별 생성 경로로 대체합니다.
+    """
+    features = [f for f in (features or []) if f and f.get('feature_name', '').strip()]
+    core = edm_data.get('core')
+    target = edm_data.get('target')
+    title_suggestion = edm_data.get('title_suggestion', '')
+    
+    pdf_hint = ""
+    if structured_pdf_content:
+        pdf_hint = f"""
+참고 PDF 정보:
+- 제품 설명: {structured_pdf_content.get('product_desc', '')}
+- 주요 기능: {structured_pdf_content.get('features', '')}
+- 기대 효과: {structured_pdf_content.get('benefits', '')}"""
+    
+    feature_lines = "\n".join(
+        f"{i + 1}. 기능명: {f['feature_name']} / 아이콘 키워드: {f.get('icon_keyword', '')} / 기본 설명: {f.get('feature_desc', '')}"
+        for i, f in enumerate(features)
+    ) or "(없음)"
+    
+    prompt = f"""다음 정보를 바탕으로 소개형 eDM 전체 구성을 한 번에 작성해주세요:
+타겟: {target}
+핵심: {core}
+정보: {edm_data.get('info', '')}
+타이틀 제안: {title_suggestion or '(없음)'}
+참고자료: {material_summary or '(없음)'}{pdf_hint}
+
+주요 기능 목록:
+{feature_lines}
+
+기본 기대효과:
+{expected_effects or '(없음)'}
+
+작성 규칙:
+- title: 타이틀 제안이 있으면 B2B 마케팅에 맞게 다듬어 20자 이내로, 없으면 핵심 메시지 기반으로 작성
+- highlight/body/closing/cta: 비즈니스 B2B 톤, 모든 문장은 완전하게 구성
+- body는 접속사(그리고, 또한, 더불어, 아울러 등)로 시작하지 않고 명사나 주어로 시작
+- features: 주요 기능 목록과 같은 순서·같은 개수로 작성하고 name은 기능명을 그대로 사용
+- features.icon_key: 허용된 아이콘 키워드 중 기능에 가장 적합한 것 하나
+- features.description: 50자 이내의 완성된 한 문장, 따옴표와 "기능명: 설명" 형식 사용 금지
+- expected_effects: 기본 기대효과 항목별로 "이모티콘 제목: 구체적인 설명." 형식의 완성형 문장 (기본 기대효과가 없으면 빈 배열)"""
+    
+    try:
+        response = safe_openai_call(
+            messages=[
+                {"role": "system", "content": "당신은 B2B 마케팅 eDM 전문 카피라이터입니다. 반드시 build_edm 함수를 호출해 응답하세요."},
+                {"role": "user", "content": prompt}
+            ],
+            task="enrichment",
+            tools=[{
+                "type": "function",
+                "function": {
+                    "name": "build_edm",
+                    "description": "소개형 eDM 문구, 기능별 아이콘과 설명, 기대효과를 구조화하여 반환",
+                    "parameters": EDM_ENRICHMENT_SCHEMA
+                }
+            }],
+            tool_choice={"type": "function", "function": {"name": "build_edm"}}
+        )
+        
+        if not response or not response.choices:
+            return None
+        
+        message = response.choices[0].message
+        if message.tool_calls:
+            arguments = message.tool_calls[0].function.arguments
+        else:
+            arguments = message.content or ""
+        data = json.loads(arguments)
+        
+        # 스키마 + 기능 목록 일치 여부 검증
+        if not validate_json_schema(data, EDM_ENRICHMENT_SCHEMA):
+            print("❌ enrichment 응답 스키마 검증 실패 - 필드별 생성으로 대체")
+            return None
+        # 기능은 입력 순서대로 대응 (모델이 기능명 표기를 바꿔도 개수만 맞으면 사용)
+        if len(data['features']) != len(features):
+            print("❌ enrichment 기능 개수 불일치 - 필드별 생성으로 대체")
+            return None
+        if expected_effects.strip() and not data['expected_effects']:
+            print("❌ enrichment 기대효과 누락 - 필드별 생성으로 대체")
+            return None
+        
+        title = data['title'].strip().strip('"')
+        if title_suggestion:
+            title = optimize_title_length(title, 25)
+        
+        content = {
+            "title": title,
+            "highlight": data['highlight'],
+            "body": data['body'],
+            "closing": data['closing'],
+            "cta": edm_data.get('cta') or data['cta']
+        }
+        
+        feature_enrichment = {}
+        for source, f in zip(features, data['features']):
+            description = f['description'].replace('"', '').replace("'", '').strip()
+            if ':' in description and description.count(':') == 1:
+                description = description.split(':', 1)[1].strip()
+            feature_enrichment[source['feature_name'].strip()] = {
+                "icon": BOOTSTRAP_ICONS[f['icon_key']],
+                "description": description
+            }
+        
+        print(f"✅ enrichment 단일 호출 완료: 기능 {len(feature_enrichment)}개")
+        return {
+            "content": content,
+            "features": feature_enrichment,
+            "expected_effects": format_expected_effects("\n".join(data['expected_effects'])) if expected_effects.strip() else "",
+            "inputs_key": make_enrichment_key(features, expected_effects, material_summary)
+        }
+        
+    except Exception as e:
+        print(f"enrichment 생성 오류: {str(e)}")
+        return None
+
 def create_logo_html(company_logo_b64, partner_logo_b64):
     """로고 위치 개선 - 회사 로고는 항상 우측, 솔루션 로고가 있으면 회사 로고는 좌측으로"""
     if partner_logo_b64:
@@ -2328,17 +5288,37 @@ def get_enhanced_css_styles(theme_color):
         }}
     </style>"""
 
+@track_stage("create_improved_html_edm")
 def create_improved_html_edm(content, edm_type, company_logo_light, company_logo_dark, 
                            partner_logo, cta_url, sessions=None, theme_color="#8EC5FC", 
                            bg_image_path=None, event_info=None, features_data=None, 
                            layout_option="자동", bg_svg_code=None, expected_effects="", 
-                           target_language="ko", material_summary="", footer_info=None):
-    """개선된 HTML EDM 생성 (Footer 개선 포함)"""
+                           target_language="ko", material_summary="", footer_info=None, enrichment=None,
+                           on_progress=None, bg_image=None):
+    """개선된 HTML EDM 생성 (Footer 개선 포함, enrichment가 있으면 기능/기대효과 AI 호출 생략)
+    
+    on_progress(dict)를 주면 기능({"features": [...]})과 기대효과({"expected_effects": 텍스트])가
+    준비되는 대로 부분 결과를 전달합니다 (미리보기 스트리밍).
+    bg_image는 prepare_background_image 결과이며, 없고 bg_image_path만 있으면 파일에서 준비합니다.
+    """
+    # 기능/기대효과 입력이 enrichment 생성 이후 바뀌었으면 저장된 설명·아이콘 대신 새로 생성
+    if enrichment and enrichment.get('inputs_key') != make_enrichment_key(features_data, expected_effects, material_summary):
+        print("ℹ️ 기능/기대효과 입력 변경 - 저장된 enrichment 대신 필드별 생성")
+        enrichment = None
+    enriched_features = (enrichment or {}).get('features', {})
+    
+    if bg_image is None and bg_image_path and os.path.exists(bg_image_path):
+        with open(bg_image_path, 'rb') as f:
+            bg_image = prepare_background_image(f.read(), theme_color)
+    if bg_image:
+        # 렌더링(수정·번역 포함)에 쓰이는 동안 저장소 원본이 정리되지 않도록 참조 갱신
+        touch_background_ref(bg_image["hash"])
     
     # 개선된 배경 분석 기반 로고 선택 (URL 기반)
     selected_logo_url = select_logo_by_background_analysis(
         theme_color, bg_svg_code, bg_image_path, 
-        company_logo_light, company_logo_dark
+        company_logo_light, company_logo_dark,
+        logo_position="left" if partner_logo else "right", bg_image=bg_image
     )
     company_logo_b64 = load_image_base64(selected_logo_url) if selected_logo_url else ""
     partner_logo_b64 = load_image_base64(partner_logo) if partner_logo else ""
@@ -2365,11 +5345,9 @@ def create_improved_html_edm(content, edm_type, company_logo_light, company_logo
                 </div>
             </div>
         </div>"""
-    elif bg_image_path and os.path.exists(bg_image_path):
-        with open(bg_image_path, 'rb') as f:
-            bg_b64 = base64.b64encode(f.read()).decode()
+    elif bg_image:
         header_section = f"""
-        <div class="hero-section hero-image" style="background-image:url(data:image/png;base64,{bg_b64});">
+        <div class="hero-section hero-image" style="background-image:url(data:{bg_image['mime']};base64,{bg_image['b64']});">
             <div class="hero-content">
                 <div class="logo-section">
                     {create_logo_html(company_logo_b64, partner_logo_b64)}
@@ -2409,16 +5387,17 @@ def create_improved_html_edm(content, edm_type, company_logo_light, company_logo
                 <h3 style="color: {theme_color}; margin-bottom: 20px;">{translated_fixed['주요 기능']}</h3>
                 <div class="features-grid" style="grid-template-columns: repeat({cols_per_row}, 1fr);">"""
             
-            for i, feature in enumerate(valid_features):
-                # Bootstrap Icon 선택
-                icon_class = select_bootstrap_icon(feature['icon_keyword'])
-                
-                # AI로 기능 설명 향상
-                enhanced_desc = generate_enhanced_feature_description(
-                    feature['feature_name'], 
-                    feature['feature_desc'], 
-                    material_summary
-                )
+            def describe_feature(feature):
+                # AI로 기능 설명 향상 (단일 enrichment 결과가 있으면 재사용)
+                enriched = enriched_features.get(feature['feature_name'].strip())
+                if enriched:
+                    enhanced_desc = enriched['description']
+                else:
+                    enhanced_desc = generate_enhanced_feature_description(
+                        feature['feature_name'], 
+                        feature['feature_desc'], 
+                        material_summary
+                    )
                 
                 # 다국어 번역
                 if target_language != "ko":
@@ -2430,6 +5409,34 @@ def create_improved_html_edm(content, edm_type, company_logo_light, company_logo
                 else:
                     feature_name = feature['feature_name']
                 
+                return enhanced_desc, feature_name
+            
+            # 기능별 아이콘 선택 + 설명 향상을 병렬 실행 (결과는 입력 순서대로 재조립)
+            feature_tasks = []
+            for feature in valid_features:
+                enriched = enriched_features.get(feature['feature_name'].strip())
+                if enriched:
+                    feature_tasks.append(lambda icon=enriched['icon']: icon)
+                else:
+                    feature_tasks.append(lambda feature=feature: select_bootstrap_icon(feature['icon_keyword']))
+                feature_tasks.append(lambda feature=feature: describe_feature(feature))
+            
+            # 기능 설명이 완성되는 대로 미리보기에 추가
+            described = {}
+            
+            def show_feature(index, result):
+                if on_progress and index % 2 == 1:
+                    described[index // 2] = result
+                    on_progress({"features": [
+                        {"name": described[i][1], "desc": described[i][0]} for i in sorted(described)
+                    ]})
+            
+            feature_results = run_concurrently(feature_tasks, on_result=show_feature)
+            
+            for i, feature in enumerate(valid_features):
+                icon_class = feature_results[2 * i]
+                enhanced_desc, feature_name = feature_results[2 * i + 1]
+                
                 features_html += f"""
                 <div class="feature-item">
                     <div class="feature-icon">
@@ -2444,8 +5451,16 @@ def create_improved_html_edm(content, edm_type, company_logo_light, company_logo
     # 5. 기대효과 섹션 생성 (주요 기능 다음에 위치)
     effects_html = ""
     if expected_effects and edm_type == "소개형":
-        # AI로 기대효과 향상
-        enhanced_effects = generate_enhanced_expected_effects(expected_effects, material_summary)
+        # AI로 기대효과 향상 (단일 enrichment 결과가 있으면 재사용)
+        if enrichment and enrichment.get('expected_effects'):
+            enhanced_effects = enrichment['expected_effects']
+        else:
+            enhanced_effects = generate_enhanced_expected_effects(
+                expected_effects, material_summary,
+                on_update=(lambda text: on_progress({"expected_effects": text})) if on_progress else None
+            )
+        if on_progress:
+            on_progress({"expected_effects": enhanced_effects})
         
         effects_list = [effect.strip() for effect in enhanced_effects.split('\n') if effect.strip()]
         effects_items = ""
@@ -2655,8 +5670,12 @@ def create_improved_html_edm(content, edm_type, company_logo_light, company_logo
 </body>
 </html>"""
 
-def translate_edm_content(html_content, target_language):
-    """생성된 EDM을 다른 언어로 완전 번역 - 모든 텍스트 포함"""
+@track_stage("translate_edm_content")
+def translate_edm_content(html_content, target_language, on_progress=None):
+    """생성된 EDM을 다른 언어로 완전 번역 - 모든 텍스트 포함
+    
+    on_progress(완료 수, 전체 수, 원문, 번역문)는 translate_segments로 전달되어 스트리밍 진행 표시에 사용됩니다.
+    """
     try:
         # HTML에서 텍스트 추출
         soup = BeautifulSoup(html_content, 'html.parser')
@@ -2769,15 +5788,65 @@ def translate_edm_content(html_content, target_language):
                     seen_texts.add(text)
                     sorted_elements.append(element)
         
-        # 기대효과 섹션 특별 처리 (구조 완전 보존)
         effects_section = soup.find('div', class_='effects-section')
+        
+        def in_effects_section(element):
+            """기대효과 섹션(또는 그 하위) 요소인지 확인 - 해당 섹션은 아래 특별 처리에서 번역"""
+            if effects_section is None:
+                return False
+            return element is effects_section or any(parent is effects_section for parent in element.parents)
+        
+        def split_effect_item(item):
+            """기대효과 항목을 (strong 텍스트, 나머지 텍스트)로 분리 (strong이 없으면 (None, 전체 텍스트))"""
+            strong_tag = item.find('strong')
+            if not strong_tag:
+                return None, item.get_text().strip()
+            
+            remaining_text = ""
+            for content in item.contents:
+                if hasattr(content, 'name') and content.name == 'strong':
+                    continue
+                elif isinstance(content, str):
+                    remaining_text += content.strip()
+            return strong_tag.get_text().strip(), remaining_text
+        
+        # 번역할 세그먼트를 먼저 모두 수집하여 일괄 번역 (요소별 순차 요청 제거)
+        segments = []
+        if effects_section:
+            section_title = effects_section.find('h3')
+            if section_title and section_title.get_text().strip():
+                segments.append(section_title.get_text().strip())
+            effects_list = effects_section.find('ul', class_='effects-list')
+            if effects_list:
+                for item in effects_list.find_all('li', class_='expected-effect-item'):
+                    strong_text, remaining_text = split_effect_item(item)
+                    segments.extend([strong_text, remaining_text] if strong_text is not None else [remaining_text])
+        
+        for element in sorted_elements:
+            if in_effects_section(element):
+                continue
+            text = element.get_text().strip()
+            if text and len(text) > 1 and '<' not in text and '>' not in text:
+                segments.append(text)
+        
+        batch_translations = translate_segments(segments, target_language, on_progress=on_progress)
+        
+        def translate_segment(text):
+            """일괄 번역 결과 조회 (수집되지 않은 텍스트만 개별 번역)"""
+            if not text or not text.strip():
+                return text
+            if text in batch_translations:
+                return batch_translations[text]
+            return translate_text(text, target_language)
+        
+        # 기대효과 섹션 특별 처리 (구조 완전 보존)
         if effects_section:
             try:
                 # 기대효과 섹션 제목 번역
                 section_title = effects_section.find('h3')
                 if section_title and section_title.get_text().strip():
                     title_text = section_title.get_text().strip()
-                    translated_title = translate_text(title_text, target_language)
+                    translated_title = translate_segment(title_text)
                     section_title.string = translated_title
                 
                 # effects-list 내의 모든 expected-effect-item 처리
@@ -2792,23 +5861,12 @@ def translate_edm_content(html_content, target_language):
                                 continue
                                 
                             # strong 태그 확인
-                            strong_tag = item.find('strong')
+                            strong_text, remaining_text = split_effect_item(item)
                             
-                            if strong_tag:
-                                # 기존 strong 태그가 있는 경우
-                                strong_text = strong_tag.get_text().strip()
-                                
-                                # strong 태그 이후의 텍스트 추출
-                                remaining_text = ""
-                                for content in item.contents:
-                                    if hasattr(content, 'name') and content.name == 'strong':
-                                        continue
-                                    elif isinstance(content, str):
-                                        remaining_text += content.strip()
-                                
-                                # 각각 번역
-                                translated_strong = translate_text(strong_text, target_language)
-                                translated_remaining = translate_text(remaining_text, target_language) if remaining_text else ""
+                            if strong_text is not None:
+                                # 기존 strong 태그가 있는 경우 - 각각 번역
+                                translated_strong = translate_segment(strong_text)
+                                translated_remaining = translate_segment(remaining_text) if remaining_text else ""
                                 
                                 # 구조 재구성
                                 item.clear()
@@ -2822,7 +5880,7 @@ def translate_edm_content(html_content, target_language):
                                     
                             else:
                                 # strong 태그가 없는 경우 - 새로 생성하되 최소한 띄어쓰기로 구분
-                                full_translated = translate_text(original_text, target_language)
+                                full_translated = translate_segment(original_text)
                                 
                                 # 콜론 기준 분리
                                 if ':' in full_translated:
@@ -2879,7 +5937,7 @@ def translate_edm_content(html_content, target_language):
                             # 오류 발생 시에도 최소한 띄어쓰기는 확보
                             try:
                                 original_text = item.get_text().strip()
-                                translated_text = translate_text(original_text, target_language)
+                                translated_text = translate_segment(original_text)
                                 
                                 # 최소한의 띄어쓰기 처리
                                 formatted_text = re.sub(r'([.!?])([A-Z가-힣])', r'\1 \2', translated_text)
@@ -2911,6 +5969,10 @@ def translate_edm_content(html_content, target_language):
         translated_texts = {}  # 번역 캐시
         
         for element in sorted_elements:
+            # 기대효과 섹션은 위에서 구조를 보존하며 번역 완료 (번역문 재번역 방지)
+            if in_effects_section(element):
+                continue
+            
             original_text = element.get_text().strip()
             if original_text and len(original_text) > 1:
                 try:
@@ -2922,7 +5984,7 @@ def translate_edm_content(html_content, target_language):
                     if original_text in translated_texts:
                         translated_text = translated_texts[original_text]
                     else:
-                        translated_text = translate_text(original_text, target_language)
+                        translated_text = translate_segment(original_text)
                         translated_texts[original_text] = translated_text
                     
                     # expected-effect-item 클래스를 가진 li 요소 특별 처리 (완전 개선)
@@ -2945,9 +6007,9 @@ def translate_edm_content(html_content, target_language):
                                         remaining_text += content.strip()
                                 
                                 # 각각 개별 번역
-                                translated_strong = translate_text(strong_text, target_language)
+                                translated_strong = translate_segment(strong_text)
                                 if remaining_text:
-                                    translated_remaining = translate_text(remaining_text, target_language)
+                                    translated_remaining = translate_segment(remaining_text)
                                 else:
                                     translated_remaining = ""
                                 
@@ -2966,7 +6028,7 @@ def translate_edm_content(html_content, target_language):
                                 
                             else:
                                 # strong 태그가 없는 경우 - 전체 번역 후 구조 생성
-                                full_translated = translate_text(original_text, target_language)
+                                full_translated = translate_segment(original_text)
                                 
                                 # 콜론을 기준으로 제목과 설명 분리
                                 if ':' in full_translated:
@@ -3044,6 +6106,32 @@ def translate_edm_content(html_content, target_language):
         print(f"번역 오류: {str(e)}")
         return html_content
 
+@track_stage("translate_edm_all_languages")
+def translate_edm_all_languages(html_content, languages=None, on_result=None):
+    """EDM을 여러 언어로 동시에 번역하여 {언어 코드: 번역 HTML} 반환
+    
+    on_result(language, translated_html)는 언어별 번역이 끝날 때마다 호출됩니다.
+    """
+    languages = list(languages or TRANSLATION_LANGUAGE_NAMES.keys())
+    
+    def report(index, translated_html):
+        if on_result:
+            on_result(languages[index], translated_html)
+    
+    results = run_concurrently(
+        [lambda language=language: translate_edm_content(html_content, language) for language in languages],
+        on_result=report
+    )
+    return dict(zip(languages, results))
+
+def build_translations_zip(translated_variants, edm_type="default"):
+    """언어별 번역 HTML을 하나의 ZIP 파일(bytes)로 묶기"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for language, translated_html in translated_variants.items():
+            zf.writestr(f"translated_edm_{edm_type}_{language}.html", translated_html)
+    return buffer.getvalue()
+
 def create_ai_edit_prompt(original_content, edit_request, target_language="ko"):
     """AI 수정 요청을 위한 프롬프트 생성"""
     language_prompts = {
@@ -3099,6 +6187,7 @@ Return the modified content in JSON format:
     
     return language_prompts.get(target_language, language_prompts["ko"])
 
+@track_stage("apply_ai_edits")
 def apply_ai_edits(content, edit_request, target_language="ko"):
     """AI를 사용하여 EDM 내용 수정 - 요청된 부분만 수정"""
     try:
@@ -3160,9 +6249,9 @@ def apply_ai_edits(content, edit_request, target_language="ko"):
                 {"role": "system", "content": "당신은 전문 마케팅 카피라이터입니다. 사용자의 요청에 따라 EDM의 특정 부분만 정확히 수정합니다. 요청되지 않은 부분은 절대 변경하지 않습니다."},
                 {"role": "user", "content": prompt}
             ],
-            model="gpt-4",
+            task="ai_edit",
             temperature=0.7,
-            max_tokens=1500
+            use_cache=False  # 같은 수정 요청을 다시 보내면 새로운 결과를 기대
         )
         
         if not response:
@@ -3206,6 +6295,104 @@ def apply_ai_edits(content, edit_request, target_language="ko"):
         print(f"AI 수정 오류: {str(e)}")
         return content
 
+def render_live_preview(slot, preview, theme_color="#354F9B"):
+    """생성 중 미리보기 (타이틀 -> 본문 -> 기능 -> 기대효과 순으로 채워지는 대로 표시)"""
+    parts = []
+    if preview.get('title'):
+        parts.append(f'<h2 style="color:{theme_color}; margin:0 0 10px 0;">{escape_html(preview["title"])}</h2>')
+    if preview.get('highlight'):
+        parts.append(f'<p style="font-weight:600; font-size:1.05em;">{escape_html(preview["highlight"])}</p>')
+    if preview.get('body'):
+        parts.append(f'<p style="line-height:1.6;">{escape_html(preview["body"])}</p>')
+    if preview.get('closing'):
+        parts.append(f'<p style="color:#555;">{escape_html(preview["closing"])}</p>')
+    if preview.get('features'):
+        items = "".join(
+            f'<li><b>{escape_html(feature["name"])}</b> - {escape_html(feature["desc"])}</li>'
+            for feature in preview['features']
+        )
+        parts.append(f'<h4 style="color:{theme_color}; margin-top:16px;">주요 기능</h4><ul>{items}</ul>')
+    if preview.get('expected_effects'):
+        items = "".join(
+            f'<li>{escape_html(line.strip())}</li>'
+            for line in preview['expected_effects'].split('\n') if line.strip()
+        )
+        parts.append(f'<h4 style="color:{theme_color}; margin-top:16px;">기대효과</h4><ul>{items}</ul>')
+    if preview.get('stage'):
+        parts.append(f'<p style="color:#888; font-size:0.85em; margin-top:12px;">⏳ {escape_html(preview["stage"])}</p>')
+    
+    if parts:
+        slot.markdown(
+            '<div style="border:1px solid #e0e0e0; border-radius:12px; padding:20px; background:#fff;">'
+            + "".join(parts) + '</div>',
+            unsafe_allow_html=True
+        )
+
+def render_metrics_panel():
+    """디버그 모드 성능 지표 패널 (단계별 소요 시간, 호출 함수별 LLM 요청/토큰/재시도)"""
+    snapshot = get_metrics_snapshot()
+    
+    with st.expander("📊 성능 지표 (디버그)", expanded=False):
+        stage_rows = [
+            {"단계": h["labels"].get("stage"), "횟수": h["count"], "평균(초)": round(h["avg"], 3), "합계(초)": round(h["sum"], 3)}
+            for h in snapshot["histograms"] if h["name"] == "edm_stage_duration_seconds"
+        ]
+        for row in stage_rows:
+            row["실패"] = sum(c["value"] for c in snapshot["counters"]
+                            if c["name"] == "edm_stage_failures_total" and c["labels"].get("stage") == row["단계"])
+        st.markdown("**파이프라인 단계별 소요 시간**")
+        if stage_rows:
+            st.dataframe(sorted(stage_rows, key=lambda row: -row["합계(초)"]), use_container_width=True)
+        else:
+            st.caption("아직 기록된 단계가 없습니다.")
+        
+        # 호출 함수(caller)별 LLM 요청 집계
+        callers = {}
+        for counter in snapshot["counters"]:
+            caller = counter["labels"].get("caller")
+            if not caller:
+                continue
+            row = callers.setdefault(caller, {"호출 함수": caller, "API 호출": 0, "캐시 적중": 0, "합치기": 0, "취소": 0,
+                                              "실패": 0, "재시도": 0, "입력 토큰": 0, "출력 토큰": 0, "평균(초)": 0.0})
+            if counter["name"] == "edm_llm_requests_total":
+                outcome_column = {"ok": "API 호출", "cache_hit": "캐시 적중", "coalesced": "합치기", "cancelled": "취소",
+                                  "error": "실패"}
+                row[outcome_column[counter["labels"]["outcome"]]] += counter["value"]
+            elif counter["name"] == "edm_llm_retries_total":
+                row["재시도"] += counter["value"]
+            elif counter["name"] == "edm_llm_tokens_total":
+                row["입력 토큰" if counter["labels"]["direction"] == "prompt" else "출력 토큰"] += counter["value"]
+        durations = {}
+        for histogram in snapshot["histograms"]:
+            if histogram["name"] == "edm_llm_request_duration_seconds":
+                total, count = durations.get(histogram["labels"]["caller"], (0.0, 0))
+                durations[histogram["labels"]["caller"]] = (total + histogram["sum"], count + histogram["count"])
+        for caller, (total, count) in durations.items():
+            if caller in callers and count:
+                callers[caller]["평균(초)"] = round(total / count, 3)
+        
+        st.markdown("**호출 함수별 LLM 요청**")
+        if callers:
+            st.dataframe(sorted(callers.values(), key=lambda row: -row["API 호출"]), use_container_width=True)
+        else:
+            st.caption("아직 기록된 LLM 요청이 없습니다.")
+        
+        st.markdown("**작업별 모델/지연 시간 · 캐시 · 레이트 리밋**")
+        st.json({key: snapshot[key] for key in ["tasks", "llm_cache", "rate_limiter", "coalescing", "translation_memory",
+                                                   "svg_pool", "svg_optimizer", "svg_raster", "logo_contrast", "logo_assets",
+                                                   "image_derivatives", "background_images", "background_store"]},
+                expanded=False)
+        
+        col_prom, col_json = st.columns(2)
+        with col_prom:
+            st.download_button("Prometheus 텍스트", render_prometheus_metrics(), file_name="edm_metrics.prom",
+                               mime="text/plain", key="download_metrics_prom", use_container_width=True)
+        with col_json:
+            st.download_button("JSON", json.dumps(snapshot, ensure_ascii=False, indent=2), file_name="edm_metrics.json",
+                               mime="application/json", key="download_metrics_json", use_container_width=True)
+        if METRICS_PORT:
+            st.caption(f"지표 엔드포인트: :{METRICS_PORT}/metrics, :{METRICS_PORT}/metrics.json")
+
 def main():
     # Session state 초기화
     if 'current_step' not in st.session_state:
@@ -3224,8 +6411,16 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
-    # 디버그 모드 기본값 설정 (사용자에게 노출되지 않음)
-    st.session_state.debug_mode = False
+    # 디버그 모드 (EDM_DEBUG=1 환경변수 또는 ?debug=1 쿼리 파라미터로 활성화)
+    st.session_state.debug_mode = DEBUG_MODE or (DEBUG_QUERY_ENABLED and st.query_params.get("debug") == "1")
+    
+    # 지표 HTTP 서버 (EDM_METRICS_PORT 설정 시, 프로세스당 1회 시작)
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+    
+    # 표준 브랜드 컬러의 배경 SVG 변형 풀 미리 채우기 (EDM_SVG_WARMUP 설정 시, 프로세스당 1회 시작)
+    if SVG_WARMUP_COLORS and SVG_POOL_SIZE > 0:
+        start_svg_warmup(tuple(SVG_WARMUP_COLORS))
     
     # 진행 상황 표시
     # 진행상황 바 제거됨
@@ -3541,38 +6736,38 @@ def main():
             bg_elements = []
             with cols[0]:
                 if st.checkbox("그라데이션", key="bg_grad"):
-                    bg_elements.append("a soft gradient background")
+                    bg_elements.append(BG_EFFECT_LABELS["gradient"])
             with cols[1]:
                 if st.checkbox("반짝이", key="bg_spark"):
-                    bg_elements.append("sparkles")
+                    bg_elements.append(BG_EFFECT_LABELS["sparkles"])
             with cols[2]:
                 if st.checkbox("빛망울", key="bg_bokeh"):
-                    bg_elements.append("bokeh-style dots")
+                    bg_elements.append(BG_EFFECT_LABELS["bokeh"])
             with cols[3]:
                 if st.checkbox("곡선", key="bg_lines"):
-                    bg_elements.append("soft lines")
+                    bg_elements.append(BG_EFFECT_LABELS["lines"])
             with cols[4]:
                 if st.checkbox("추상", key="bg_shapes"):
-                    bg_elements.append("abstract glowing shapes")
+                    bg_elements.append(BG_EFFECT_LABELS["abstract"])
+            
+            # 배경 생성 방식 (절차적 생성은 LLM 호출 없이 즉시 생성, 미리보기와 결과가 동일)
+            if "bg_seed" not in st.session_state:
+                st.session_state.bg_seed = random.randrange(1 << 30)
+            engine_labels = {"llm": "AI 생성", "procedural": "즉시 생성 (절차적)"}
+            bg_engine = st.radio(
+                "배경 생성 방식", list(engine_labels), format_func=engine_labels.get, horizontal=True,
+                index=1 if SVG_ENGINE == "procedural" else 0, key="bg_engine",
+                help="즉시 생성은 AI 호출 없이 선택한 효과로 배경을 바로 만들어 EDM 생성 시간이 짧아집니다."
+            )
             
             # 실시간 미리보기
             if bg_elements:
                 st.markdown("**🎨 배경 효과 미리보기**")
-                selected_effects = []
-                for element in bg_elements:
-                    if "gradient" in element.lower():
-                        selected_effects.append("gradient")
-                    elif "sparkles" in element.lower():
-                        selected_effects.append("sparkles")
-                    elif "bokeh" in element.lower():
-                        selected_effects.append("bokeh")
-                    elif "lines" in element.lower():
-                        selected_effects.append("lines")
-                    elif "abstract" in element.lower():
-                        selected_effects.append("abstract")
-                
-                # 미리보기 SVG 생성 (기본 템플릿 사용)
-                preview_svg = generate_fallback_svg(bg_main_color, f"{bg_main_color}aa", selected_effects)
+                selected_effects = parse_bg_effects(bg_elements)
+                
+                # 미리보기 SVG 생성 (절차적 생성, 같은 배치 번호면 같은 결과)
+                preview_svg = generate_procedural_svg(bg_main_color, f"{bg_main_color}aa", selected_effects,
+                                                      seed=st.session_state.bg_seed)
                 
                 # 미리보기 표시
                 st.markdown(f"""
@@ -3581,7 +6776,13 @@ def main():
                 </div>
                 """, unsafe_allow_html=True)
                 
-                st.info(f"💡 선택된 효과: {', '.join(selected_effects)}")
+                col_effects, col_shuffle = st.columns([3, 1])
+                with col_effects:
+                    st.info(f"💡 선택된 효과: {', '.join(selected_effects)}")
+                with col_shuffle:
+                    if st.button("🎲 다른 배치", key="bg_shuffle", help="같은 효과로 요소 배치를 새로 만듭니다."):
+                        st.session_state.bg_seed = random.randrange(1 << 30)
+                        st.rerun()
             
             uploaded_bg = st.file_uploader("배경 이미지 업로드 (선택)", type=["png", "jpg", "jpeg"])
             
@@ -3593,8 +6794,8 @@ def main():
         with st.expander("🏷️ 5단계: 로고(CI/BI) 설정", expanded=True):
             
             # 기본 웅진IT 로고 URL 설정
-            company_logo_light_url = "https://raw.githubusercontent.com/Gina-cloud/edm-generator/main/woongjinit_logo1.png"  # 어두운 배경용 (밝은 로고)
-            company_logo_dark_url = "https://raw.githubusercontent.com/Gina-cloud/edm-generator/main/woongjinit_logo2.png"   # 밝은 배경용 (어두운 로고)
+            company_logo_light_url = COMPANY_LOGO_LIGHT_URL  # 어두운 배경용 (밝은 로고)
+            company_logo_dark_url = COMPANY_LOGO_DARK_URL    # 밝은 배경용 (어두운 로고)
             
             st.markdown("**회사 로고 (웅진IT 기본 설정)**")
             st.info("✅ 웅진IT 로고가 자동으로 설정되어 배경에 따라 최적의 로고가 선택됩니다.")
@@ -3603,9 +6804,9 @@ def main():
             st.markdown("**로고 미리보기:**")
             cols = st.columns(2)
             with cols[0]:
-                st.image(company_logo_light_url, caption="밝은 로고 (어두운 배경용)", width=120)
+                st.image(resolve_logo_bytes(company_logo_light_url) or company_logo_light_url, caption="밝은 로고 (어두운 배경용)", width=120)
             with cols[1]:
-                st.image(company_logo_dark_url, caption="어두운 로고 (밝은 배경용)", width=120)
+                st.image(resolve_logo_bytes(company_logo_dark_url) or company_logo_dark_url, caption="어두운 로고 (밝은 배경용)", width=120)
             
             # 솔루션 로고 (선택사항)
             partner_logo = st.file_uploader("솔루션 로고 (선택)", type=["png", "jpg", "jpeg"])
@@ -3617,15 +6818,20 @@ def main():
                 # 임시 배경 분석
                 temp_brightness = 128
                 if uploaded_bg:
-                    st.info("📸 업로드된 이미지의 명도를 분석하여 최적의 로고를 선택합니다.")
+                    try:
+                        temp_brightness = prepare_background_image(uploaded_bg.getvalue(), bg_main_color)["brightness"]
+                        st.info(f"📸 업로드된 이미지 명도 {temp_brightness:.0f} → 로고 영역 대비를 분석하여 최적의 로고를 선택합니다.")
+                    except Exception:
+                        st.info("📸 업로드된 이미지의 명도를 분석하여 최적의 로고를 선택합니다.")
                 elif bg_elements:
-                    # 선택된 효과 기반 예상 명도
-                    if any("sparkles" in str(e) or "bokeh" in str(e) for e in bg_elements):
-                        temp_brightness = 180  # 밝은 효과
-                        st.info("✨ 밝은 배경 효과 감지 → 어두운 로고가 선택됩니다.")
+                    # 미리보기 배경의 면적 가중 명도
+                    temp_brightness = analyze_svg_brightness(generate_procedural_svg(
+                        bg_main_color, f"{bg_main_color}aa", parse_bg_effects(bg_elements), seed=st.session_state.bg_seed
+                    ))
+                    if temp_brightness >= 140:
+                        st.info(f"✨ 밝은 배경 감지 (명도 {temp_brightness:.0f}) → 어두운 로고가 선택됩니다.")
                     else:
-                        temp_brightness = 100  # 어두운 효과
-                        st.info("🌙 어두운 배경 효과 감지 → 밝은 로고가 선택됩니다.")
+                        st.info(f"🌙 어두운 배경 감지 (명도 {temp_brightness:.0f}) → 밝은 로고가 선택됩니다.")
                 
                 # 예상 로고 선택 표시
                 if temp_brightness >= 140:
@@ -3637,7 +6843,7 @@ def main():
                 
                 col_preview, col_desc = st.columns([1, 2])
                 with col_preview:
-                    st.image(recommended_logo_url, caption="선택될 로고", width=80)
+                    st.image(resolve_logo_bytes(recommended_logo_url) or recommended_logo_url, caption="선택될 로고", width=80)
                 with col_desc:
                     st.markdown(f"""
                     **{logo_desc}**  
@@ -3723,6 +6929,9 @@ def main():
             </style>
             """, unsafe_allow_html=True)
         
+        # 생성 중 스트리밍 미리보기 자리 (생성 단계에서 채움)
+        live_preview_slot = st.empty()
+        
         if 'html_content' in st.session_state and st.session_state.html_content:
             # 한국어 EDM 미리보기 창
             st.components.v1.html(st.session_state.html_content, height=600, scrolling=True)
@@ -3734,9 +6943,8 @@ def main():
             with col_lang:
                 translate_language = st.selectbox(
                     "번역할 언어 선택",
-                    ["en", "ja", "zh", "es", "fr", "ms"],
-                    format_func=lambda x: {"en": "English", "ja": "일본어", "zh": "중국어", 
-                                          "es": "스페인어", "fr": "프랑스어", "ms": "말레이시아어"}[x],
+                    list(TRANSLATION_LANGUAGE_LABELS.keys()),
+                    format_func=lambda x: TRANSLATION_LANGUAGE_LABELS[x],
                     key="translate_lang"
                 )
             
@@ -3744,11 +6952,24 @@ def main():
                 st.markdown("<br>", unsafe_allow_html=True)
                 translate_btn = st.button("번역하기", key="translate_btn", use_container_width=True)
             
+            translate_all_btn = st.button("🌐 전체 언어 동시 번역", key="translate_all_btn", use_container_width=True)
+            
             # 번역 실행
             if translate_btn:
+                # 번역 스트리밍 표시: 세그먼트가 완성되는 대로 진행률과 최근 번역문 갱신
+                translate_progress = st.progress(0.0, text="번역 중...")
+                translate_preview_slot = st.empty()
+                recent_translations = []
+                
+                def show_translation_progress(done, total, source, translated):
+                    recent_translations.append(translated)
+                    translate_progress.progress(min(done / max(total, 1), 1.0), text=f"번역 중... ({done}/{total})")
+                    translate_preview_slot.markdown("\n".join(f"- {escape_html(text)}" for text in recent_translations[-5:]))
+                
                 with st.spinner("번역 중..."):
                     try:
-                        translated_html = translate_edm_content(st.session_state.html_content, translate_language)
+                        translated_html = translate_edm_content(st.session_state.html_content, translate_language,
+                                                                on_progress=show_translation_progress)
                         st.session_state.translated_html = translated_html
                         st.session_state.translated_language = translate_language
                         st.session_state.show_multilang_preview = True
@@ -3758,6 +6979,75 @@ def main():
                     except Exception as e:
                         st.error(f"번역 중 오류가 발생했습니다: {str(e)}")
             
+            # 전체 언어 동시 번역 실행 (언어별 진행 상황 표시)
+            if translate_all_btn:
+                languages = list(TRANSLATION_LANGUAGE_LABELS.keys())
+                progress_bar = st.progress(0.0, text=f"전체 언어 번역 중... (0/{len(languages)})")
+                status_slots = {}
+                for language in languages:
+                    status_slots[language] = st.empty()
+                    status_slots[language].markdown(f"⏳ {TRANSLATION_LANGUAGE_LABELS[language]} 번역 중...")
+                
+                completed = []
+                
+                def show_language_done(language, translated_html):
+                    completed.append(language)
+                    status_slots[language].markdown(f"✅ {TRANSLATION_LANGUAGE_LABELS[language]} 번역 완료")
+                    progress_bar.progress(len(completed) / len(languages),
+                                          text=f"전체 언어 번역 중... ({len(completed)}/{len(languages)})")
+                
+                try:
+                    translated_variants = translate_edm_all_languages(
+                        st.session_state.html_content, languages, on_result=show_language_done
+                    )
+                    st.session_state.translated_variants = translated_variants
+                    st.session_state.translated_html = translated_variants[languages[0]]
+                    st.session_state.translated_language = languages[0]
+                    st.session_state.show_multilang_preview = True
+                    st.rerun()
+                    
+                except Exception as e:
+                    st.error(f"전체 언어 번역 중 오류가 발생했습니다: {str(e)}")
+            
+            # 전체 언어 번역 결과 다운로드
+            if st.session_state.get('translated_variants'):
+                translated_variants = st.session_state.translated_variants
+                st.markdown("#### 🌐 전체 언어 번역 결과")
+                
+                preview_language = st.selectbox(
+                    "미리보기 언어",
+                    list(translated_variants.keys()),
+                    index=list(translated_variants.keys()).index(st.session_state.get('translated_language'))
+                    if st.session_state.get('translated_language') in translated_variants else 0,
+                    format_func=lambda x: TRANSLATION_LANGUAGE_LABELS.get(x, x),
+                    key="variant_preview_lang"
+                )
+                if preview_language != st.session_state.get('translated_language'):
+                    st.session_state.translated_html = translated_variants[preview_language]
+                    st.session_state.translated_language = preview_language
+                    st.session_state.show_multilang_preview = True
+                
+                download_cols = st.columns(len(translated_variants))
+                for col, (language, translated_html) in zip(download_cols, translated_variants.items()):
+                    with col:
+                        st.download_button(
+                            TRANSLATION_LANGUAGE_LABELS.get(language, language),
+                            translated_html,
+                            file_name=f"translated_edm_{language}.html",
+                            mime="text/html",
+                            key=f"download_variant_{language}",
+                            use_container_width=True
+                        )
+                
+                st.download_button(
+                    "📦 전체 언어 HTML 다운로드 (ZIP)",
+                    build_translations_zip(translated_variants, st.session_state.get('edm_type', 'default')),
+                    file_name=f"translated_edm_{st.session_state.get('edm_type', 'default')}_all.zip",
+                    mime="application/zip",
+                    key="download_all_variants",
+                    use_container_width=True
+                )
+            
             # AI 수정 요청 프롬프트 입력창
             st.markdown("#### ⚙️ AI 수정 요청")
             korean_edit_request = st.text_area(
@@ -3791,11 +7081,14 @@ def main():
                                 st.session_state.get('expected_effects', ''),
                                 "ko",
                                 st.session_state.get('material_summary', ''),
-                                st.session_state.get('footer_info')
+                                st.session_state.get('footer_info'),
+                                enrichment=st.session_state.get('enrichment'),
+                                bg_image=st.session_state.get('bg_image')
                             )
                             
                             # 수정된 내용으로 업데이트
                             st.session_state.html_content = edited_html
+                            st.session_state.pop('translated_variants', None)
                             st.session_state.original_content = edited_content
                             
                             st.success("한국어 EDM AI 수정이 완료되었습니다!")
@@ -3862,7 +7155,9 @@ def main():
                                 st.session_state.get('expected_effects', ''),
                                 "ko",
                                 st.session_state.get('material_summary', ''),
-                                st.session_state.get('footer_info')
+                                st.session_state.get('footer_info'),
+                                enrichment=st.session_state.get('enrichment'),
+                                bg_image=st.session_state.get('bg_image')
                             )
                             
                             # 수정된 HTML을 번역
@@ -3903,6 +7198,12 @@ def main():
                 st.error("❌ 제품/서비스 설명을 입력해주세요.")
                 st.stop()
         
+        # OpenAI 연결 상태 확인 (최근 결과가 있으면 네트워크 요청 없음)
+        api_ok, api_message = check_openai_health()
+        if not api_ok:
+            st.error(api_message)
+            st.stop()
+        
         # 버튼 클릭 즉시 생성 진행 상황 플래그 설정
         st.session_state.edm_generating = True
         
@@ -3939,36 +7240,62 @@ def main():
                 material_summary = st.session_state.get('material_summary', '')
                 structured_pdf_content = st.session_state.get('structured_pdf_content', None)
                 
-                # 콘텐츠 생성
-                content = generate_edm_content(edm_data, material_summary, structured_pdf_content)
+                # 스트리밍 미리보기: 응답이 오는 대로 타이틀 -> 본문 -> 기능 -> 기대효과 순으로 표시
+                live_preview = {"stage": "문구 생성 중..."}
+                
+                def update_live_preview(partial, stage=None):
+                    live_preview.update(partial)
+                    if stage:
+                        live_preview["stage"] = stage
+                    render_live_preview(live_preview_slot, live_preview, bg_main_color)
+                
+                update_live_preview({})
+                
+                # 콘텐츠 생성 (단일 enrichment 모드면 한 번의 구조화 호출, 실패 시 기존 필드별 경로)
+                enrichment = None
+                if EDM_ENRICHMENT_MODE == "single" and edm_type == "소개형":
+                    enrichment = generate_edm_enrichment(
+                        edm_data, material_summary, structured_pdf_content,
+                        st.session_state.get('features_data'), expected_effects
+                    )
+                
+                if enrichment:
+                    content = enrichment['content']
+                else:
+                    content = generate_edm_content(edm_data, material_summary, structured_pdf_content,
+                                                   on_update=update_live_preview)
+                st.session_state.enrichment = enrichment
+                update_live_preview(content, stage="배경 이미지 생성 중...")
                 
                 # session_state에 원본 콘텐츠 저장 (AI 수정용)
                 st.session_state.original_content = content
                 st.session_state.edm_type = edm_type
                 
-                # 배경 이미지 처리
+                # 배경 이미지 처리 (업로드 이미지는 메모리에서 헤더 크기로 준비, 렌더링·수정·번역에서 재사용)
+                bg_image = None
                 bg_image_path = None
                 bg_svg_code = None
                 
                 if uploaded_bg:
-                    bg_path = f"images/uploaded_bg_{uploaded_bg.name}"
-                    with open(bg_path, "wb") as f:
-                        f.write(uploaded_bg.read())
-                    bg_image_path = bg_path
-                else:
+                    try:
+                        bg_data = uploaded_bg.getvalue()
+                        bg_image = prepare_background_image(bg_data, bg_main_color)
+                        # 원본은 내용 해시 이름으로 저장 (세션 간 덮어쓰기 없음, 용량·기간 기준 자동 정리)
+                        bg_image_path = store_background_asset(bg_data, bg_image["hash"])
+                    except Exception as e:
+                        print(f"배경 이미지 처리 오류: {str(e)}")
+                        st.warning("⚠️ 배경 이미지를 읽을 수 없어 기본 배경을 사용합니다.")
+                if bg_image is None:
                     # 배경 효과에 따른 톤 결정
-                    if bg_elements:
-                        if "sparkles" in str(bg_elements) or "bokeh-style dots" in str(bg_elements):
-                            tone = "bright and fresh"
-                        elif "soft lines" in str(bg_elements) or "abstract glowing shapes" in str(bg_elements):
-                            tone = "tech-inspired"
-                        else:
-                            tone = "clean and professional"
-                    else:
-                        tone = "clean and professional"
+                    tone = get_bg_tone(bg_elements)
                     
                     color1, color2 = bg_main_color, f"{bg_main_color}aa"
-                    bg_svg_code = generate_enhanced_banner_svg(tone, color1, color2, bg_elements)
+                    if bg_engine == "procedural":
+                        bg_svg_code = generate_procedural_svg(color1, color2, parse_bg_effects(bg_elements),
+                                                              seed=st.session_state.bg_seed)
+                    else:
+                        bg_svg_code = generate_enhanced_banner_svg(tone, color1, color2, bg_elements,
+                                                                   seed=st.session_state.bg_seed)
                 
                 # 초청형 행사 정보 준비
                 event_info_dict = None
@@ -3993,6 +7320,7 @@ def main():
                 st.session_state.sessions = sessions if edm_type == "초청형" else None
                 st.session_state.bg_main_color = bg_main_color
                 st.session_state.bg_image_path = bg_image_path
+                st.session_state.bg_image = bg_image
                 st.session_state.features_data = features_data
                 st.session_state.layout_option = layout_option
                 st.session_state.bg_svg_code = bg_svg_code
@@ -4000,20 +7328,27 @@ def main():
                 st.session_state.footer_info = footer_info
                 
                 # HTML EDM 생성 (최종 개선된 함수 사용)
+                update_live_preview({}, stage="기능/기대효과 작성 및 EDM 구성 중...")
                 html_content = create_improved_html_edm(
                     content, edm_type, company_logo_light, company_logo_dark, partner_logo, cta_url,
                     sessions if edm_type == "초청형" else None,
-                    bg_main_color, bg_image_path, event_info_dict, features_data, layout_option, bg_svg_code,
-                    expected_effects if edm_type == "소개형" else "", target_language, material_summary, footer_info
+                    bg_main_color, None, event_info_dict, features_data, layout_option, bg_svg_code,
+                    expected_effects if edm_type == "소개형" else "", target_language, material_summary, footer_info,
+                    enrichment=enrichment,
+                    on_progress=update_live_preview,
+                    bg_image=bg_image
                 )
                 
                 # 로고 선택 결과 디버깅 정보 (개발 모드에서만 표시)
                 if st.session_state.get('debug_mode', False):
                     with st.expander("🔍 로고 선택 디버깅 정보"):
                         st.write("**배경 분석 결과:**")
-                        if bg_image_path:
+                        if bg_image:
                             st.write(f"- 배경 유형: 업로드된 이미지")
-                            st.write(f"- 이미지 경로: {bg_image_path}")
+                            st.write(f"- 이미지: {bg_image['size'][0]}x{bg_image['size'][1]} {bg_image['mime']}, "
+                                     f"{bg_image['source_bytes'] / 1024:.0f}KB -> {len(bg_image['data']) / 1024:.0f}KB, "
+                                     f"명도 {bg_image['brightness']:.0f}")
+                            st.write(f"- 원본 경로: {bg_image_path}")
                         elif bg_svg_code:
                             st.write(f"- 배경 유형: AI 생성 SVG")
                             st.write(f"- 선택된 효과: {bg_elements}")
@@ -4023,6 +7358,7 @@ def main():
                 
                 # session_state에 HTML 저장 (상시 미리보기용)
                 st.session_state.html_content = html_content
+                st.session_state.pop('translated_variants', None)
                 
                 # EDM 생성 완료 - 로딩 스피너 제거
                 st.session_state.edm_generating = False
@@ -4039,6 +7375,9 @@ def main():
             # 오류 발생 시에도 로딩 스피너 제거
             st.session_state.edm_generating = False
     
+    if st.session_state.get('debug_mode', False):
+        render_metrics_panel()
+    
     # 메인 함수 종료
 
 if __name__ == "__main__":
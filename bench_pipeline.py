@@ -0,0 +1,166 @@
+"""
+로컬 LLM 대역 서버로 main() 전체 파이프라인을 오프라인 벤치마크
+
+mock_llm_server를 같은 프로세스에서 띄우고, Streamlit AppTest로 app.py를 실행하여
+"AI EDM 생성하기" -> "전체 언어 동시 번역" 흐름의 소요 시간을 반복 측정합니다.
+같은 --seed와 옵션이면 응답과 지연 시간이 같으므로 변경 전후 비교에 사용할 수 있습니다.
+
+사용법:
+    python bench_pipeline.py --runs 3 --edm-type 소개형 --latency-mean 0.5 --rate-429 0.05
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import mock_llm_server
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="오프라인 EDM 생성 파이프라인 벤치마크")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--edm-type", choices=["소개형", "초청형"], default="소개형")
+    parser.add_argument("--skip-translation", action="store_true", help="전체 언어 번역 단계 생략")
+    parser.add_argument("--warm-cache", action="store_true", help="실행 간 LLM 응답 캐시/번역 메모리 유지")
+    parser.add_argument("--timeout", type=float, default=600, help="AppTest 1회 실행 제한 시간(초)")
+    parser.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    # 대역 서버 설정 (mock_llm_server.py와 동일)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-mean", type=float, default=0.5)
+    parser.add_argument("--latency-jitter", type=float, default=0.2)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--rate-timeout", type=float, default=0.0)
+    parser.add_argument("--timeout-seconds", type=float, default=30.0)
+    parser.add_argument("--rate-500", type=float, default=0.0)
+    return parser.parse_args()
+
+
+def fill_inputs(at, edm_type):
+    """필수 입력값 채우기"""
+    for radio in at.radio:
+        if radio.label == "EDM 유형":
+            radio.set_value(edm_type)
+    for text_area in at.text_area:
+        if text_area.label == "핵심 메시지 (필수)":
+            text_area.input("AI 기반 물류 자동화로 운영 비용을 절감하세요")
+    at.run()
+
+    if edm_type == "소개형":
+        for text_area in at.text_area:
+            if text_area.label == "제품/서비스 설명":
+                text_area.input("실시간 재고 관리와 자동 발주를 지원하는 클라우드 WMS 솔루션입니다.")
+            elif text_area.label == "기대효과 설명":
+                text_area.input("재고 비용 절감, 출고 리드타임 단축, 운영 인력 효율화")
+        for i, (keyword, name, desc) in enumerate([
+            ("실시간", "실시간 재고 현황", "창고별 재고를 실시간으로 확인"),
+            ("자동화", "자동 발주", "안전 재고 기준 자동 발주"),
+            ("분석", "물류 분석 리포트", "출고/입고 추이 분석")
+        ]):
+            for text_input in at.text_input:
+                if text_input.key == f"table_icon_{i}":
+                    text_input.input(keyword)
+                elif text_input.key == f"table_name_{i}":
+                    text_input.input(name)
+                elif text_input.key == f"table_desc_{i}":
+                    text_input.input(desc)
+    else:
+        for text_area in at.text_area:
+            if text_area.label == "초청의 글":
+                text_area.input("물류 혁신 세미나에 여러분을 초대합니다.")
+    at.run()
+
+
+def click(at, label=None, key=None):
+    for button in at.button:
+        if (label and button.label == label) or (key and button.key == key):
+            button.click()
+            return at.run()
+    raise RuntimeError(f"버튼을 찾을 수 없습니다: {label or key}")
+
+
+def run_once(args):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file("app.py", default_timeout=args.timeout)
+    at.run()
+    fill_inputs(at, args.edm_type)
+
+    timings = {}
+    started = time.perf_counter()
+    click(at, label="🚀 AI EDM 생성하기")
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    timings["generate"] = time.perf_counter() - started
+    if not at.session_state["html_content"]:
+        raise RuntimeError("EDM이 생성되지 않았습니다.")
+
+    if not args.skip_translation:
+        started = time.perf_counter()
+        click(at, key="translate_all_btn")
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+        timings["translate_all"] = time.perf_counter() - started
+
+    timings["total"] = sum(timings.values())
+    return timings
+
+
+def main():
+    args = parse_args()
+
+    server_args = mock_llm_server.parse_args([
+        "--port", "0", "--quiet", "--seed", str(args.seed),
+        "--latency", args.latency, "--latency-mean", str(args.latency_mean),
+        "--latency-jitter", str(args.latency_jitter),
+        "--rate-429", str(args.rate_429), "--retry-after", str(args.retry_after),
+        "--rate-timeout", str(args.rate_timeout), "--timeout-seconds", str(args.timeout_seconds),
+        "--rate-500", str(args.rate_500)
+    ])
+    server = mock_llm_server.create_server(server_args)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ["EDM_LLM_BACKEND"] = "local"
+    os.environ["EDM_LLM_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+
+    results = []
+    with tempfile.TemporaryDirectory() as cache_root:
+        for run in range(args.runs):
+            # 기본적으로 매 실행마다 빈 캐시에서 시작 (콜드 측정)
+            cache_dir = cache_root if args.warm_cache else os.path.join(cache_root, str(run))
+            os.environ["EDM_CACHE_DIR"] = cache_dir
+            if not args.warm_cache:
+                # 프로세스 공용 리소스(캐시 연결, 레이트 리미터, 통계)도 실행마다 초기화
+                import streamlit as st
+                st.cache_resource.clear()
+            timings = run_once(args)
+            results.append(timings)
+            if not args.json:
+                print(f"run {run + 1}: " + ", ".join(f"{k}={v:.2f}s" for k, v in timings.items()))
+
+    server.shutdown()
+    server_stats = dict(server.mock_state.stats)
+
+    summary = {
+        stage: {
+            "median": round(statistics.median(r[stage] for r in results), 3),
+            "min": round(min(r[stage] for r in results), 3),
+            "max": round(max(r[stage] for r in results), 3)
+        }
+        for stage in results[0]
+    }
+    if args.json:
+        print(json.dumps({"runs": results, "summary": summary, "server": server_stats}, ensure_ascii=False, indent=2))
+    else:
+        for stage, values in summary.items():
+            print(f"{stage}: median={values['median']:.2f}s min={values['min']:.2f}s max={values['max']:.2f}s")
+        print("server: " + ", ".join(f"{k}={v}" for k, v in server_stats.items()))
+
+
+if __name__ == "__main__":
+    main()
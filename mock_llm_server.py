@@ -0,0 +1,433 @@
+"""
+chat-completions 호환 로컬 LLM 대역 서버 (오프라인 벤치마크 / 부하 테스트용)
+
+OpenAI API 대신 프롬프트 유형에 맞는 결정적(deterministic) 응답을 돌려줍니다.
+같은 요청 본문과 같은 --seed이면 항상 같은 응답과 같은 지연 시간이 나옵니다.
+
+사용법:
+    python mock_llm_server.py --port 8765 --latency lognormal --latency-mean 0.8 --rate-429 0.05
+    EDM_LLM_BACKEND=local streamlit run app.py
+
+응답 유형:
+    - tools 요청 (build_edm 등): 함수 parameters 스키마를 따르는 tool_call 인자 생성
+      (프롬프트에 "N. 기능명: ..." 목록이 있으면 features를 같은 개수·같은 기능명으로 작성)
+    - 배경 SVG: 요청된 효과(gradient/sparkles/bokeh/lines/abstract)와 색상을 반영한 SVG
+    - 일괄 번역: id가 같은 JSON 배열, 개별 번역: "[언어] 원문"
+    - 아이콘 선택: 프롬프트에 나열된 아이콘 키워드 중 하나
+    - 응답 형식 JSON 예시가 있는 프롬프트: 같은 키를 가진 JSON
+    - 그 외: 짧은 한국어 문장
+    - n > 1 요청은 선택지마다 다른 응답 (스트리밍 제외)
+    - stream=true 요청은 SSE 조각으로 나눠 전송 (전체 지연은 같고 첫 조각이 먼저 도착)
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 번역 프롬프트의 언어명 -> 응답 접두어
+LANGUAGE_TAGS = {
+    "영어": "EN",
+    "일본어": "JA",
+    "중국어": "ZH",
+    "스페인어": "ES",
+    "프랑스어": "FR",
+    "말레이시아어": "MS"
+}
+
+MODELS = ["gpt-4", "gpt-4o", "gpt-4o-mini"]
+
+
+def estimate_tokens(text):
+    """응답 usage 계산용 대략적인 토큰 수 (한글 기준 2글자당 1토큰)"""
+    return max(1, len(text) // 2)
+
+
+def extract_json_template(prompt):
+    """프롬프트 안의 응답 형식 JSON 예시 중 마지막 객체 반환 (없으면 None)"""
+    decoder = json.JSONDecoder()
+    template = None
+    for match in re.finditer(r"\{", prompt):
+        try:
+            value, _ = decoder.raw_decode(prompt[match.start():])
+        except ValueError:
+            continue
+        if isinstance(value, dict) and value:
+            template = value
+    return template
+
+
+def fill_json_template(template, rng):
+    """JSON 예시와 같은 키 구조로 샘플 값 채우기"""
+    if isinstance(template, dict):
+        return {key: fill_json_template(value, rng) for key, value in template.items()}
+    if isinstance(template, list):
+        return [fill_json_template(value, rng) for value in template]
+    if isinstance(template, str):
+        return f"샘플 {template} {rng.randint(1, 99)}"
+    return template
+
+
+def generate_from_schema(schema, rng, name="value"):
+    """JSON 스키마(parameters)를 만족하는 샘플 데이터 생성"""
+    schema_type = schema.get("type")
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    if schema_type == "object":
+        properties = schema.get("properties", {})
+        return {key: generate_from_schema(value, rng, key) for key, value in properties.items()}
+    if schema_type == "array":
+        count = max(schema.get("minItems", 1), min(schema.get("maxItems", 3), 3))
+        return [generate_from_schema(schema.get("items", {}), rng, name) for _ in range(count)]
+    if schema_type == "integer":
+        return rng.randint(schema.get("minimum", 0), schema.get("maximum", 100))
+    if schema_type == "number":
+        return round(rng.uniform(schema.get("minimum", 0), schema.get("maximum", 1)), 3)
+    if schema_type == "boolean":
+        return rng.random() < 0.5
+
+    text = f"샘플 {name} 문장입니다 {rng.randint(1, 99)}"
+    if "maxLength" in schema:
+        text = text[:schema["maxLength"]]
+    return text
+
+
+def generate_svg(prompt, rng):
+    """배경 SVG 프롬프트에서 색상/효과를 읽어 700x200 SVG 생성"""
+    colors = re.findall(r"#[0-9a-fA-F]{6}", prompt) or ["#354F9B", "#667eea"]
+    color1, color2 = colors[0], colors[1] if len(colors) > 1 else colors[0]
+    effects_match = re.search(r"Effects requested:\s*([^\n]*)", prompt)
+    effects = [e.strip() for e in effects_match.group(1).split(",")] if effects_match else ["gradient"]
+
+    defs = [
+        f'<linearGradient id="bg" x1="0%" y1="0%" x2="100%" y2="100%">'
+        f'<stop offset="0%" stop-color="{color1}"/><stop offset="100%" stop-color="{color2}"/></linearGradient>'
+    ]
+    shapes = ['<rect width="700" height="200" fill="url(#bg)"/>']
+
+    if "sparkles" in effects:
+        for _ in range(12):
+            shapes.append(f'<circle cx="{rng.randint(0, 700)}" cy="{rng.randint(0, 200)}" r="{rng.randint(1, 3)}" '
+                          f'fill="#ffffff" opacity="{rng.uniform(0.4, 0.9):.2f}"/>')
+    if "bokeh" in effects:
+        defs.append('<filter id="blur"><feGaussianBlur stdDeviation="8"/></filter>')
+        for _ in range(6):
+            shapes.append(f'<circle cx="{rng.randint(0, 700)}" cy="{rng.randint(0, 200)}" r="{rng.randint(15, 40)}" '
+                          f'fill="#ffffff" opacity="{rng.uniform(0.1, 0.3):.2f}" filter="url(#blur)"/>')
+    if "lines" in effects:
+        for _ in range(3):
+            y = rng.randint(40, 160)
+            shapes.append(f'<path d="M0,{y} Q350,{y + rng.randint(-60, 60)} 700,{y}" stroke="#ffffff" '
+                          f'stroke-width="2" fill="none" opacity="0.3"/>')
+    if "abstract" in effects:
+        for _ in range(3):
+            x, y = rng.randint(0, 650), rng.randint(0, 150)
+            shapes.append(f'<polygon points="{x},{y} {x + 50},{y + 10} {x + 25},{y + 50}" '
+                          f'fill="{color2}" opacity="0.25"/>')
+
+    return ('<svg width="700" height="200" viewBox="0 0 700 200" xmlns="http://www.w3.org/2000/svg">'
+            f'<defs>{"".join(defs)}</defs>{"".join(shapes)}</svg>')
+
+
+def generate_content(body, rng):
+    """요청 본문(messages, tools)에 맞는 응답 메시지 생성 -> (content, tool_calls)"""
+    messages = body.get("messages", [])
+    prompt = messages[-1].get("content", "") if messages else ""
+    if not isinstance(prompt, str):
+        prompt = json.dumps(prompt, ensure_ascii=False)
+    system = " ".join(m.get("content", "") for m in messages if m.get("role") == "system")
+
+    tools = body.get("tools")
+    if tools:
+        function = tools[0].get("function", {})
+        parameters = function.get("parameters", {"type": "object"})
+        arguments = generate_from_schema(parameters, rng)
+        feature_names = re.findall(r"^\d+\. 기능명: (.*?) / ", prompt, re.M)
+        if isinstance(arguments, dict) and "features" in arguments:
+            item_schema = parameters["properties"]["features"].get("items", {})
+            arguments["features"] = [{**generate_from_schema(item_schema, rng, "feature"), "name": name}
+                                     for name in feature_names]
+        return None, [{
+            "id": f"call_{uuid.UUID(int=rng.getrandbits(128)).hex[:24]}",
+            "type": "function",
+            "function": {"name": function.get("name", "tool"), "arguments": json.dumps(arguments, ensure_ascii=False)}
+        }]
+
+    if "SVG" in prompt or "SVG" in system:
+        return generate_svg(prompt, rng), None
+
+    language = next((tag for name, tag in LANGUAGE_TAGS.items() if f"{name}로 번역" in prompt), None)
+    if language:
+        array_match = re.search(r"\n(\[\{.*\}\])\s*$", prompt, re.S)
+        if array_match:
+            items = json.loads(array_match.group(1))
+            return json.dumps([{"id": item["id"], "text": f"[{language}] {item['text']}"} for item in items],
+                              ensure_ascii=False), None
+        source_match = re.search(r"원문:\s*(.*?)\n\s*\n", prompt, re.S)
+        source = source_match.group(1).strip() if source_match else prompt[:50]
+        return f"[{language}] {source}", None
+
+    icons_match = re.search(r"사용 가능한 아이콘 키워드들:\s*\n([^\n]+)", prompt)
+    if icons_match:
+        return rng.choice([icon.strip() for icon in icons_match.group(1).split(",")]), None
+
+    template = extract_json_template(prompt)
+    if template:
+        return json.dumps(fill_json_template(template, rng), ensure_ascii=False), None
+
+    if "기대효과" in prompt:
+        return "\n".join(f"📈 샘플 효과 {i}: 업무 효율을 {rng.randint(10, 40)}% 높일 수 있습니다." for i in range(1, 4)), None
+
+    return f"샘플 응답 문장입니다 {rng.randint(1, 999)}.", None
+
+
+class MockState:
+    """서버 설정, 오류 주입용 난수, 요청 통계"""
+
+    def __init__(self, args):
+        self.args = args
+        self.lock = threading.Lock()
+        self.error_rng = random.Random(args.seed)
+        self.stats = {"requests": 0, "completions": 0, "rate_limited": 0, "timeouts": 0, "server_errors": 0}
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def draw_fault(self):
+        """요청 순서 기준 결정적 오류 주입 ("429" / "timeout" / "500" / None)"""
+        with self.lock:
+            roll = self.error_rng.random()
+        if roll < self.args.rate_429:
+            return "429"
+        roll -= self.args.rate_429
+        if roll < self.args.rate_timeout:
+            return "timeout"
+        roll -= self.args.rate_timeout
+        if roll < self.args.rate_500:
+            return "500"
+        return None
+
+    def sample_latency(self, rng):
+        """설정된 분포에서 응답 지연 시간(초) 추출"""
+        mean, jitter = self.args.latency_mean, self.args.latency_jitter
+        if self.args.latency == "fixed" or mean <= 0:
+            return max(mean, 0.0)
+        if self.args.latency == "uniform":
+            return max(0.0, rng.uniform(mean - jitter, mean + jitter))
+        # lognormal: 평균이 mean, 표준편차가 대략 jitter가 되도록 파라미터 설정
+        sigma = math.sqrt(math.log(1 + (jitter / mean) ** 2)) if jitter > 0 else 0.0
+        return rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+
+
+def make_handler(state):
+    class MockLLMHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            if not state.args.quiet:
+                super().log_message(format, *args)
+
+        def send_json(self, status, payload, headers=None):
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def send_error_json(self, status, message, error_type, code, headers=None):
+            self.send_json(status, {"error": {"message": message, "type": error_type, "param": None, "code": code}}, headers)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/v1/models":
+                self.send_json(200, {"object": "list", "data": [
+                    {"id": model, "object": "model", "created": 0, "owned_by": "mock"} for model in MODELS
+                ]})
+            elif self.path.startswith("/v1/models/"):
+                model = self.path.rsplit("/", 1)[-1]
+                self.send_json(200, {"id": model, "object": "model", "created": 0, "owned_by": "mock"})
+            elif self.path.rstrip("/") == "/stats":
+                with state.lock:
+                    stats = dict(state.stats)
+                self.send_json(200, stats)
+            else:
+                self.send_error_json(404, f"Unknown path: {self.path}", "invalid_request_error", "not_found")
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            raw = self.rfile.read(length)
+            if self.path.rstrip("/") != "/v1/chat/completions":
+                self.send_error_json(404, f"Unknown path: {self.path}", "invalid_request_error", "not_found")
+                return
+
+            state.count("requests")
+            try:
+                body = json.loads(raw or b"{}")
+            except ValueError:
+                self.send_error_json(400, "Invalid JSON body", "invalid_request_error", None)
+                return
+
+            # 같은 요청 본문 + 같은 seed면 같은 응답/지연 시간
+            digest = hashlib.sha256(raw).hexdigest()
+            rng = random.Random(f"{state.args.seed}:{digest}")
+
+            fault = state.draw_fault()
+            if fault == "429":
+                state.count("rate_limited")
+                self.send_error_json(429, "Rate limit reached for requests (mock)", "requests", "rate_limit_exceeded",
+                                     {"Retry-After": str(state.args.retry_after)})
+                return
+            if fault == "timeout":
+                state.count("timeouts")
+                time.sleep(state.args.timeout_seconds)
+                self.send_error_json(504, "Upstream timeout (mock)", "server_error", "timeout")
+                return
+            if fault == "500":
+                state.count("server_errors")
+                self.send_error_json(500, "Internal server error (mock)", "server_error", None)
+                return
+
+            latency = state.sample_latency(rng)
+            content, tool_calls = generate_content(body, rng)
+
+            prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in body.get("messages", []))
+            completion_tokens = estimate_tokens(content or json.dumps(tool_calls, ensure_ascii=False))
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+
+            state.count("completions")
+            if body.get("stream") and not tool_calls:
+                self.send_stream(body, digest, content, latency, usage)
+                return
+
+            # n > 1이면 선택지마다 다른 시드로 추가 생성 (지연 시간은 한 번)
+            generated = [(content, tool_calls)] + [
+                generate_content(body, random.Random(f"{state.args.seed}:{digest}:{index}"))
+                for index in range(1, max(int(body.get("n") or 1), 1))
+            ]
+            choices = []
+            for index, (choice_content, choice_tool_calls) in enumerate(generated):
+                message = {"role": "assistant", "content": choice_content}
+                if choice_tool_calls:
+                    message["tool_calls"] = choice_tool_calls
+                choices.append({
+                    "index": index,
+                    "message": message,
+                    "finish_reason": "tool_calls" if choice_tool_calls else "stop"
+                })
+            if len(generated) > 1:
+                usage["completion_tokens"] = sum(
+                    estimate_tokens(c or json.dumps(t, ensure_ascii=False)) for c, t in generated
+                )
+                usage["total_tokens"] = prompt_tokens + usage["completion_tokens"]
+
+            time.sleep(latency)
+            self.send_json(200, {
+                "id": f"chatcmpl-mock-{digest[:24]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "gpt-4"),
+                "choices": choices,
+                "usage": usage
+            })
+
+        def send_stream(self, body, digest, content, latency, usage):
+            """SSE 스트리밍 응답 (첫 토큰까지 지연의 일부, 나머지는 조각마다 나눠서 전송 -> 전체 소요 시간은 동일)"""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+
+            base = {
+                "id": f"chatcmpl-mock-{digest[:24]}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "gpt-4")
+            }
+
+            def send_event(payload):
+                self.wfile.write(f"data: {payload}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            pieces = [content[i:i + state.args.stream_chunk_chars]
+                      for i in range(0, len(content), state.args.stream_chunk_chars)] or [""]
+            first_token_delay = latency * state.args.first_token_ratio
+            piece_delay = (latency - first_token_delay) / len(pieces)
+
+            try:
+                time.sleep(first_token_delay)
+                for index, piece in enumerate(pieces):
+                    delta = {"role": "assistant", "content": piece} if index == 0 else {"content": piece}
+                    send_event(json.dumps({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]},
+                                          ensure_ascii=False))
+                    time.sleep(piece_delay)
+                send_event(json.dumps({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}))
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    send_event(json.dumps({**base, "choices": [], "usage": usage}))
+                send_event("[DONE]")
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    return MockLLMHandler
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="chat-completions 호환 로컬 LLM 대역 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0, help="응답/지연/오류 주입 난수 seed")
+    parser.add_argument("--latency", choices=["fixed", "uniform", "lognormal"], default="lognormal",
+                        help="응답 지연 분포")
+    parser.add_argument("--latency-mean", type=float, default=0.5, help="평균 지연 시간(초)")
+    parser.add_argument("--latency-jitter", type=float, default=0.2, help="지연 시간 편차(초)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="429 응답 비율 (0~1)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429 응답의 Retry-After(초)")
+    parser.add_argument("--rate-timeout", type=float, default=0.0, help="타임아웃(지연 후 504) 비율 (0~1)")
+    parser.add_argument("--timeout-seconds", type=float, default=30.0, help="타임아웃 주입 시 지연 시간(초)")
+    parser.add_argument("--rate-500", type=float, default=0.0, help="500 응답 비율 (0~1)")
+    parser.add_argument("--first-token-ratio", type=float, default=0.2,
+                        help="스트리밍 시 전체 지연 중 첫 조각까지의 비율 (0~1)")
+    parser.add_argument("--stream-chunk-chars", type=int, default=4, help="스트리밍 조각당 글자 수")
+    parser.add_argument("--quiet", action="store_true", help="요청 로그 출력 안 함")
+    return parser.parse_args(argv)
+
+
+def create_server(args):
+    """설정에 맞는 서버 생성 (테스트/벤치마크 스크립트에서 직접 띄울 때 사용)"""
+    state = MockState(args)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    server.daemon_threads = True
+    server.mock_state = state
+    return server
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = create_server(args)
+    print(f"Mock LLM server: http://{args.host}:{server.server_port}/v1 "
+          f"(latency={args.latency} mean={args.latency_mean}s, 429={args.rate_429}, "
+          f"timeout={args.rate_timeout}, 500={args.rate_500}, seed={args.seed})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()